@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from pdf_engine import find_pdf_files
+
+# Files checked at once; checking is mostly waiting on file reads
+INGEST_THREADS = 8
+
+# Files are handed to the GUI in batches of this size, or sooner when a
+# batch has been waiting this long
+INGEST_BATCH_SIZE = 200
+INGEST_BATCH_SECONDS = 0.1
+
+
+class IngestWorker(QThread):
+    """Finds the PDFs among dropped files and folders and checks them on a thread pool.
+    
+    Results reach the GUI in batches, so a list can take thousands of files
+    without a layout pass per item. check(path) should return whatever the
+    window needs to list the file and raise if the file cannot be used.
+    """
+    # Paths in order, as soon as they are found and before they are checked
+    files_found = pyqtSignal(list)
+    # (path, result of check, error message or "") in the same order
+    files_checked = pyqtSignal(list)
+    
+    def __init__(self, paths, check, parent=None):
+        super().__init__(parent)
+        self.paths = list(paths)
+        self.check = check
+    
+    def run(self):
+        found = []
+        for path in find_pdf_files(self.paths):
+            if self.isInterruptionRequested():
+                return
+            found.append(path)
+            if len(found) % INGEST_BATCH_SIZE == 0:
+                self.files_found.emit(found[-INGEST_BATCH_SIZE:])
+        if len(found) % INGEST_BATCH_SIZE:
+            self.files_found.emit(found[-(len(found) % INGEST_BATCH_SIZE):])
+        
+        with ThreadPoolExecutor(max_workers=INGEST_THREADS) as executor:
+            batch = []
+            batch_started = time.monotonic()
+            for result in executor.map(self._check_file, found):
+                if self.isInterruptionRequested():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return
+                
+                batch.append(result)
+                if (len(batch) >= INGEST_BATCH_SIZE
+                        or time.monotonic() - batch_started >= INGEST_BATCH_SECONDS):
+                    self.files_checked.emit(batch)
+                    batch = []
+                    batch_started = time.monotonic()
+            if batch:
+                self.files_checked.emit(batch)
+    
+    def _check_file(self, path):
+        try:
+            return path, self.check(path), ""
+        except Exception as e:
+            return path, None, str(e) or e.__class__.__name__
+
+
+def describe_failures(failures, limit=10):
+    """List (path, error) pairs of failed files for a summary message"""
+    lines = [f"{os.path.basename(path)}: {error}" for path, error in failures[:limit]]
+    if len(failures) > limit:
+        lines.append(f"... and {len(failures) - limit} more")
+    return "\n".join(lines)
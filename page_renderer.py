@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QApplication
+
+from utils import fitz_pixmap_to_qimage, fitz_pixmap_to_qpixmap, samples_to_qimage
+from pdf_engine import LRUCache, open_document, render_page, render_page_samples
+
+# Memory budget for rendered pages kept for quick navigation
+PAGE_CACHE_BYTES = 256 * 1024 * 1024
+
+# Heavy pages first appear at this fraction of their full resolution
+PREVIEW_FRACTION = 0.25
+
+# Pages larger than this many pixels are rendered as tiles of the
+# visible area instead of one pixmap
+TILED_RENDER_PIXELS = 16 * 1024 * 1024
+TILE_SIZE = 512
+
+# Pixel budget of the overview drawn under tiles that are still rendering
+TILE_OVERVIEW_PIXELS = 2 * 1024 * 1024
+
+# PyMuPDF holds the GIL while rasterizing, so renders run in processes
+RENDER_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Scale of the bridge benchmark's render, about 4K wide for an A4 page
+BRIDGE_BENCH_SCALE = 6.0
+BRIDGE_BENCH_ROUNDS = 10
+
+
+def pixmap_size_in_bytes(pixmap):
+    """Approximate memory used by a QPixmap"""
+    return pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+
+
+# Rendered pages shared by the viewer and the full-screen viewer
+page_cache = LRUCache(PAGE_CACHE_BYTES, size_of=pixmap_size_in_bytes)
+
+
+def document_key(doc):
+    """Identify a document in cache keys.
+    
+    Documents opened from a file are keyed by path, size and modification
+    time, so reopening an unchanged file reuses its cached pages.
+    """
+    path = doc.name
+    if path and os.path.isfile(path):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_size, stat.st_mtime)
+    return ("memory", id(doc))
+
+
+def page_cache_key(doc, page_idx, scale, tile=None):
+    """Cache key for a page, or one (column, row) tile of it, rendered at the given scale"""
+    key = (document_key(doc), page_idx, round(scale, 4), doc[page_idx].rotation)
+    if tile is not None:
+        key += (tile,)
+    return key
+
+
+def get_cached_page_pixmap(doc, page_idx, scale, tile=None):
+    """Return the cached QPixmap of a page or tile, or None if it has not been rendered"""
+    return page_cache.get(page_cache_key(doc, page_idx, scale, tile))
+
+
+def preview_scale(scale):
+    """Scale of the quick low-resolution pass shown before a full render"""
+    return scale * PREVIEW_FRACTION
+
+
+def page_pixel_size(doc, page_idx, scale):
+    """Size (width, height) in pixels of a page rendered at the given scale"""
+    rect = doc[page_idx].rect
+    return int(rect.width * scale), int(rect.height * scale)
+
+
+def needs_tiling(doc, page_idx, scale):
+    """Whether a page at this scale is too large to render as one pixmap"""
+    width, height = page_pixel_size(doc, page_idx, scale)
+    return width * height > TILED_RENDER_PIXELS
+
+
+def overview_scale(doc, page_idx, scale):
+    """Scale of the low-resolution overview of a tiled page"""
+    rect = doc[page_idx].rect
+    return min(preview_scale(scale), (TILE_OVERVIEW_PIXELS / (rect.width * rect.height)) ** 0.5)
+
+
+def tile_rect(tile, page_size):
+    """Pixel rectangle (x, y, width, height) covered by a (column, row) tile"""
+    column, row = tile
+    x, y = column * TILE_SIZE, row * TILE_SIZE
+    return x, y, min(TILE_SIZE, page_size[0] - x), min(TILE_SIZE, page_size[1] - y)
+
+
+def tiles_in_rect(x, y, width, height, page_size):
+    """(column, row) tiles overlapping a pixel rectangle of the page"""
+    last_column = min(x + width, page_size[0]) - 1
+    last_row = min(y + height, page_size[1]) - 1
+    return [(column, row)
+            for row in range(max(0, y) // TILE_SIZE, last_row // TILE_SIZE + 1)
+            for column in range(max(0, x) // TILE_SIZE, last_column // TILE_SIZE + 1)]
+
+
+def get_page_pixmap(doc, page_idx, scale):
+    """Return a QPixmap of a page, rendering it on this thread if it is not cached"""
+    key = page_cache_key(doc, page_idx, scale)
+    
+    pixmap = page_cache.get(key)
+    if pixmap is None:
+        pixmap = fitz_pixmap_to_qpixmap(render_page(doc[page_idx], scale))
+        page_cache.put(key, pixmap)
+    return pixmap
+
+
+class RenderWorkerPool(QObject):
+    """Renders pages in worker processes and delivers them as cached QPixmaps.
+    
+    Each owner (a viewer window) declares which pages it still wants with
+    retain(); requests for anything else are dropped before they start,
+    and results that arrive for them are discarded.
+    """
+    # Emitted in the GUI thread with the cache key and the rendered page
+    page_ready = pyqtSignal(object, QPixmap)
+    
+    # Emitted in the GUI thread with the cache key and an error message when
+    # a render fails, so the owner can render the page itself or report it
+    render_failed = pyqtSignal(object, str)
+    
+    # Internal: carries finished renders from the executor's thread
+    _render_finished = pyqtSignal(object, object)
+    
+    def __init__(self, workers=RENDER_WORKERS, parent=None):
+        super().__init__(parent)
+        self.workers = workers
+        self.executor = None
+        self.pending = {}  # owner -> {key: future}
+        # Queued even from the GUI thread, so a render that finishes inside
+        # request() is delivered after the caller has noted its key
+        self._render_finished.connect(self._on_render_finished, Qt.QueuedConnection)
+    
+    def request(self, owner, doc, page_idx, scale, tile=None):
+        """Queue a page or (column, row) tile render and return its cache key.
+        
+        Returns None for documents that are not backed by a file; those
+        must be rendered with get_page_pixmap() instead.
+        """
+        if not doc.name or not os.path.isfile(doc.name):
+            return None
+        
+        key = page_cache_key(doc, page_idx, scale, tile)
+        owner_pending = self.pending.setdefault(owner, {})
+        if key in owner_pending:
+            return key
+        
+        clip = None
+        if tile is not None:
+            x, y, width, height = tile_rect(tile, page_pixel_size(doc, page_idx, scale))
+            clip = (x / scale, y / scale, (x + width) / scale, (y + height) / scale)
+        
+        args = (render_page_samples, os.path.abspath(doc.name), page_idx, scale, clip)
+        try:
+            future = self._executor().submit(*args)
+        except BrokenProcessPool:
+            # A worker process died (e.g. killed for memory); its pool cannot
+            # be used again, so start a new one
+            self._discard_executor()
+            future = self._executor().submit(*args)
+        # Registered first: a future that is already done runs its callback at once
+        owner_pending[key] = future
+        future.add_done_callback(lambda done, key=key: self._render_finished.emit(key, done))
+        return key
+    
+    def retain(self, owner, keys):
+        """Drop every request of owner whose key is not in keys"""
+        keys = set(keys)
+        owner_pending = self.pending.get(owner, {})
+        for key in [key for key in owner_pending if key not in keys]:
+            owner_pending.pop(key).cancel()
+        if not owner_pending:
+            self.pending.pop(owner, None)
+    
+    def cancel_all(self, owner):
+        self.retain(owner, ())
+    
+    def shutdown(self):
+        """Stop the worker processes without waiting for queued renders"""
+        self.pending = {}
+        self._discard_executor()
+    
+    def _executor(self):
+        if self.executor is None:
+            # Spawned workers do not inherit the GUI process's Qt threads
+            self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+    
+    def _discard_executor(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+    
+    def _on_render_finished(self, key, future):
+        # Only deliver results that some owner is still waiting for
+        waiting = [owner_pending for owner_pending in self.pending.values()
+                   if owner_pending.get(key) is future]
+        if not waiting or future.cancelled():
+            return
+        for owner_pending in waiting:
+            del owner_pending[key]
+        
+        try:
+            width, height, stride, samples = future.result()
+        except Exception as e:
+            self.render_failed.emit(key, str(e) or type(e).__name__)
+            return
+        
+        # The samples were copied into bytes when the worker sent them, so
+        # wrap them as they are; fromImage makes the pixmap's one copy here
+        pixmap = QPixmap.fromImage(samples_to_qimage(samples, width, height, stride))
+        page_cache.put(key, pixmap)
+        self.page_ready.emit(key, pixmap)
+
+
+_render_pool = None
+
+
+def render_pool():
+    """Return the render worker pool shared by all viewer windows"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = RenderWorkerPool()
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(_render_pool.shutdown)
+    return _render_pool
+
+
+def bench_bridge(input_path):
+    """Compare copying fitz samples into a QImage with the zero-copy bridge.
+    
+    The last row is the render pool's path, which wraps the bytes a worker
+    returned the same way.
+    
+    Run by "pdf_cli.py bench bridge", with the offscreen platform unless
+    QT_QPA_PLATFORM says otherwise. Returns rows like the benchmarks in
+    pdf_engine.bench.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([])
+    
+    with open_document(input_path) as doc:
+        pix = render_page(doc[0], BRIDGE_BENCH_SCALE)
+    sample_bytes = len(pix.samples_mv)
+    
+    def copy_samples():
+        qimg = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
+        return QPixmap.fromImage(qimg)
+    
+    def bridge():
+        return QPixmap.fromImage(fitz_pixmap_to_qimage(pix))
+    
+    # What the render pool receives; the worker's copy into bytes and the
+    # pickling are not timed
+    worker_samples = pix.samples
+    
+    def worker_result():
+        return QPixmap.fromImage(samples_to_qimage(worker_samples, pix.width, pix.height,
+                                                   pix.stride))
+    
+    rows = []
+    for name, func, copies in (("samples copy + fromImage", copy_samples, 2),
+                               ("samples_mv bridge + fromImage", bridge, 1),
+                               ("worker samples + fromImage", worker_result, 1)):
+        start = time.perf_counter()
+        for _ in range(BRIDGE_BENCH_ROUNDS):
+            func()
+        rows.append({
+            "name": name,
+            "seconds": (time.perf_counter() - start) / BRIDGE_BENCH_ROUNDS,
+            "copies": copies,
+            "bytes": copies * sample_bytes,
+        })
+    return rows
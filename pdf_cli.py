@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Command-line interface for Ultimate PDF Tools.
+
+Runs the same engines as the GUI without importing PyQt5, e.g.:
+
+    python pdf_cli.py merge -o merged.pdf a.pdf b.pdf
+    python pdf_cli.py split --mode every_n -n 2 -d out/ input.pdf
+    python pdf_cli.py render --pages 1-3 --dpi 150 -d out/ input.pdf
+    python pdf_cli.py info input.pdf
+    python pdf_cli.py bench burst input.pdf
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from pdf_engine import (MERGE_ENGINES, ENGINE_PYPDF2, SPLIT_MODES, SPLIT_RANGES,
+                        INPUT_MODES, INPUT_FILE, MergeCancelled, merge_pdfs, split_pdfs,
+                        parse_page_ranges, render_pages_to_png, get_pdf_info,
+                        megabytes_per_second, SplitManifest, default_split_manifest_path,
+                        merge_pdfs_incremental, COMPRESSION_LEVELS)
+from pdf_engine.bench import BENCHMARKS
+
+# Benchmarks of the viewer's Qt code in page_renderer, which is only
+# imported when one of them runs so the other commands work without PyQt5
+VIEWER_BENCHMARKS = ("bridge",)
+
+
+def log(args, message):
+    """Print a progress message to stderr unless --quiet was given"""
+    if not args.quiet:
+        print(message, file=sys.stderr)
+
+
+def cmd_merge(args):
+    def on_bytes(bytes_written):
+        log(args, f"Written {bytes_written / (1024 * 1024):.1f} MB")
+
+    def on_written(bytes_written, seconds):
+        log(args, f"Wrote {bytes_written / (1024 * 1024):.1f} MB in {seconds:.2f} s "
+                  f"({megabytes_per_second(bytes_written, seconds):.1f} MB/s)")
+
+    def on_deduped(result):
+        log(args, f"Removed {result.streams_removed} duplicate streams, "
+                  f"saving {result.bytes_saved / (1024 * 1024):.1f} MB")
+
+    if args.incremental:
+        result = merge_pdfs_incremental(args.inputs, args.output, engine=args.engine,
+                                        on_bytes=on_bytes, input_mode=args.input_mode,
+                                        fsync=args.fsync, on_written=on_written,
+                                        dedupe=args.dedupe, on_deduped=on_deduped)
+        log(args, f"Reused {result.segments_reused} cached segments, built {result.segments_built}"
+                  + (", updated the output in place" if result.updated_in_place else ""))
+        page_count = result.page_count
+    else:
+        page_count = merge_pdfs(args.inputs, args.output, engine=args.engine, on_bytes=on_bytes,
+                                input_mode=args.input_mode, fsync=args.fsync, on_written=on_written,
+                                dedupe=args.dedupe, on_deduped=on_deduped, compact=args.compact,
+                                compression_level=args.compression_level, linearize=args.linearize)
+    log(args, f"Merged {len(args.inputs)} files ({page_count} pages) into {args.output}")
+    return 0
+
+
+def cmd_split(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    def on_file_done(files_done, input_path):
+        log(args, f"[{files_done}/{len(args.inputs)}] {os.path.basename(input_path)}")
+
+    manifest = None
+    if args.resume:
+        manifest = SplitManifest(default_split_manifest_path(args.output_dir))
+
+    start = time.perf_counter()
+    success_count, generated_files, error_messages = split_pdfs(
+        args.inputs, args.output_dir, args.base_name, args.mode,
+        range_text=args.ranges, pages_per_file=args.pages_per_file,
+        on_file_done=on_file_done, workers=args.jobs, input_mode=args.input_mode,
+        fsync=args.fsync, manifest=manifest, compact=args.compact,
+        compression_level=args.compression_level, linearize=args.linearize)
+    seconds = time.perf_counter() - start
+
+    for message in error_messages:
+        print(message, file=sys.stderr)
+    if manifest is not None and manifest.resumed:
+        log(args, f"Skipped {len(manifest.resumed)} PDFs already split by an earlier run")
+    # Files kept from an earlier run were not written this time
+    kept_files = set()
+    if manifest is not None:
+        kept_files.update(*manifest.resumed.values())
+    bytes_written = sum(os.path.getsize(path) for path in generated_files if path not in kept_files)
+    log(args, f"Split {success_count} PDFs into {len(generated_files)} files "
+              f"({bytes_written / (1024 * 1024):.1f} MB, "
+              f"{megabytes_per_second(bytes_written, seconds):.1f} MB/s)")
+    return 0 if not error_messages else 1
+
+
+def cmd_render(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    base_name = args.base_name or os.path.splitext(os.path.basename(args.input))[0]
+
+    page_numbers = None
+    if args.pages:
+        page_numbers = parse_page_ranges(args.pages, get_pdf_info(args.input)["page_count"])
+        if not page_numbers:
+            print(f"Page range {args.pages} selects no pages", file=sys.stderr)
+            return 1
+
+    generated_files = render_pages_to_png(args.input, args.output_dir, base_name,
+                                          page_numbers, dpi=args.dpi)
+    log(args, f"Rendered {len(generated_files)} pages to {args.output_dir}")
+    return 0
+
+
+def cmd_info(args):
+    infos = [get_pdf_info(path) for path in args.inputs]
+
+    if args.json:
+        print(json.dumps(infos, indent=2))
+        return 0
+
+    for info in infos:
+        print(info["path"])
+        print(f"  Size:      {info['file_size']} bytes")
+        print(f"  Pages:     {info['page_count']}")
+        print(f"  Version:   {info['pdf_version']}")
+        print(f"  Encrypted: {'yes' if info['encrypted'] else 'no'}")
+        print(f"  Outline:   {'yes' if info['has_outline'] else 'no'}")
+        print(f"  Linearized: {'yes' if info['linearized'] else 'no'}")
+        for problem in info.get("linearization_problems", []):
+            print(f"    {problem}")
+        if "first_page_size" in info:
+            width, height = info["first_page_size"]
+            print(f"  Page 1:    {width} x {height} pt")
+        for key, value in info["metadata"].items():
+            print(f"  {key}: {value}")
+    return 0
+
+
+def cmd_bench(args):
+    if args.benchmark in VIEWER_BENCHMARKS:
+        import page_renderer
+        benchmark = getattr(page_renderer, f"bench_{args.benchmark}")
+    else:
+        benchmark = BENCHMARKS[args.benchmark]
+    rows = benchmark(args.input)
+    columns = [key for key in rows[0] if key != "name"]
+
+    print(f"{'engine':<32}" + "".join(f"{column:>14}" for column in columns))
+    for row in rows:
+        cells = "".join(f"{row[column]:>14.3f}" if isinstance(row[column], float)
+                        else f"{row[column]:>14}" for column in columns)
+        print(f"{row['name']:<32}{cells}")
+    return 0
+
+
+def run_profiled(args):
+    """Run the selected command under cProfile and print stats to stderr"""
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(args.func, args)
+    stats = pstats.Stats(profiler, stream=sys.stderr)
+    stats.sort_stats("cumulative").print_stats(25)
+    return result
+
+
+def add_input_mode_argument(parser):
+    parser.add_argument("--input-mode", choices=INPUT_MODES, default=INPUT_FILE,
+                        help="how source files are read: mmap avoids a system call per "
+                             "seek, readahead uses large reads for slow network mounts")
+
+
+def add_fsync_argument(parser):
+    parser.add_argument("--fsync", action="store_true",
+                        help="flush output files to disk before moving them into place")
+
+
+def add_output_format_arguments(parser):
+    parser.add_argument("--compact", action="store_true",
+                        help="write object streams and a cross-reference stream (PDF 1.5), "
+                             "which makes files with many small objects much smaller")
+    parser.add_argument("--compression-level", type=int, choices=COMPRESSION_LEVELS,
+                        help="recompress all streams at this zlib level, 0-9 (implies --compact)")
+    parser.add_argument("--linearize", action="store_true",
+                        help="write linearized (fast web view) files whose first page can be "
+                             "shown before the whole file has been downloaded")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="pdf_cli.py",
+        description="Merge, split, render and inspect PDF files without the GUI.")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print errors")
+    parser.add_argument("--profile", action="store_true",
+                        help="run the command under cProfile and print the hottest calls")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    merge_parser = subparsers.add_parser("merge", help="merge PDF files into one")
+    merge_parser.add_argument("inputs", nargs="+", help="PDF files in merge order")
+    merge_parser.add_argument("-o", "--output", required=True, help="merged PDF file")
+    merge_parser.add_argument("--engine", choices=MERGE_ENGINES, default=ENGINE_PYPDF2,
+                              help="merge engine (pikepdf uses less memory on large merges)")
+    add_input_mode_argument(merge_parser)
+    add_fsync_argument(merge_parser)
+    merge_parser.add_argument("--incremental", action="store_true",
+                              help="cache merged groups of inputs next to the output and only "
+                                   "redo the groups whose files changed since the last run")
+    merge_parser.add_argument("--dedupe", action="store_true",
+                              help="store identical fonts, images and other streams only once")
+    add_output_format_arguments(merge_parser)
+    merge_parser.set_defaults(func=cmd_merge)
+
+    split_parser = subparsers.add_parser("split", help="split PDF files")
+    split_parser.add_argument("inputs", nargs="+", help="PDF files to split")
+    split_parser.add_argument("-d", "--output-dir", default=".", help="output directory")
+    split_parser.add_argument("-b", "--base-name", default="split_output",
+                              help="base name for output files")
+    split_parser.add_argument("--mode", choices=SPLIT_MODES, default=SPLIT_RANGES,
+                              help="split by page ranges, every N pages or into single pages")
+    split_parser.add_argument("-r", "--ranges", default="",
+                              help="page ranges for --mode ranges in the order to write them, "
+                                   "e.g. 1-3,5,7-9 or 1,end-2 or odd:reverse")
+    split_parser.add_argument("-n", "--pages-per-file", type=int, default=1,
+                              help="pages per output file for --mode every_n")
+    split_parser.add_argument("-j", "--jobs", type=int, default=1,
+                              help="number of worker processes splitting files in parallel")
+    add_input_mode_argument(split_parser)
+    add_fsync_argument(split_parser)
+    split_parser.add_argument("--resume", action="store_true",
+                              help="record finished files in a manifest in the output "
+                                   "directory and skip them when the job is run again")
+    add_output_format_arguments(split_parser)
+    split_parser.set_defaults(func=cmd_split)
+
+    render_parser = subparsers.add_parser("render", help="render pages to PNG images")
+    render_parser.add_argument("input", help="PDF file to render")
+    render_parser.add_argument("-d", "--output-dir", default=".", help="output directory")
+    render_parser.add_argument("-b", "--base-name", help="base name for image files")
+    render_parser.add_argument("-p", "--pages",
+                               help="page ranges to render as for split -r, default all")
+    render_parser.add_argument("--dpi", type=float, default=150, help="resolution in DPI")
+    render_parser.set_defaults(func=cmd_render)
+
+    info_parser = subparsers.add_parser("info", help="show information about PDF files")
+    info_parser.add_argument("inputs", nargs="+", help="PDF files to inspect")
+    info_parser.add_argument("--json", action="store_true", help="print JSON output")
+    info_parser.set_defaults(func=cmd_info)
+
+    bench_parser = subparsers.add_parser("bench", help="benchmark engine implementations")
+    bench_parser.add_argument("benchmark", choices=sorted([*BENCHMARKS, *VIEWER_BENCHMARKS]),
+                              help="benchmark to run")
+    bench_parser.add_argument("input", help="PDF file to benchmark with")
+    bench_parser.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if getattr(args, "pages_per_file", 1) < 1:
+        parser.error("--pages-per-file must be at least 1")
+    if getattr(args, "jobs", 1) < 1:
+        parser.error("--jobs must be at least 1")
+    if getattr(args, "compression_level", None) is not None:
+        args.compact = True
+    if getattr(args, "incremental", False) and args.compact:
+        # Updates are appended after a cross-reference table, not a stream
+        parser.error("--compact cannot be combined with --incremental")
+    if getattr(args, "incremental", False) and args.linearize:
+        # An appended update would undo the linearization
+        parser.error("--linearize cannot be combined with --incremental")
+
+    try:
+        if args.profile:
+            return run_profiled(args)
+        return args.func(args)
+    except MergeCancelled:
+        print("Cancelled", file=sys.stderr)
+        return 130
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        return 130
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
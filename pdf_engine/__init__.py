@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""PDF processing engines that do not depend on PyQt5.
+
+The GUI windows, the command-line interface and any scripts can share
+these functions directly.
+"""
+
+from .merge import (MERGE_ENGINES, ENGINE_PYPDF2, ENGINE_PIKEPDF,
+                    MergeCancelled, ProgressWriter, merge_pdfs)
+from .ranges import (InvalidPageRange, PageRanges, PageSelection, compile_page_ranges,
+                     parse_page_ranges)
+from .extract import count_pages, extract_pages
+from .split import (SPLIT_MODES, SPLIT_RANGES, SPLIT_EVERY_N, SPLIT_INDIVIDUAL,
+                    SplitResult, output_base_name, split_pdf, split_pdfs)
+from .render import (SCREEN_SCALE, open_document, render_page, render_page_samples,
+                     render_pages_to_png)
+from .info import check_linearization, find_pdf_files, get_pdf_info, probe_pdf, validate_pdf
+from .cache import LRUCache
+from .handles import DocumentPool, default_pool, open_reader
+from .inputs import (INPUT_MODES, INPUT_FILE, INPUT_MMAP, INPUT_READAHEAD,
+                     open_input, open_pikepdf)
+from .outputs import (OUTPUT_BUFFER_SIZE, COMPRESSION_LEVELS, AtomicOutput, megabytes_per_second,
+                      check_compression_level, save_pikepdf, write_pypdf2)
+from .manifest import SplitManifest, default_split_manifest_path
+from .dedup import DedupResult, dedupe_pikepdf, dedupe_pypdf2_writer
+from .incremental import IncrementalMergeResult, default_segment_dir, merge_pdfs_incremental
+from .index import MetadataIndex, default_index, default_index_path, file_hash, read_pdf_metadata
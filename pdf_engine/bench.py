@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Micro-benchmarks for the PDF engines.
+
+Each benchmark returns a list of result rows (dicts with at least "name"
+and "seconds") so they can be printed by the CLI or compared in scripts.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import PyPDF2
+import pikepdf
+
+try:
+    import resource  # Unix only; page faults are not reported elsewhere
+except ImportError:
+    resource = None
+
+from . import inputs
+from .merge import ENGINE_PYPDF2, ENGINE_PIKEPDF, merge_pdfs
+from .outputs import AtomicOutput, megabytes_per_second, save_pikepdf, write_pypdf2
+from .split import burst_pdf
+from .extract import count_pages, extract_pages
+
+# Copies of the document written by each method of the outputs benchmark
+OUTPUT_BENCH_FILES = 5
+
+# zlib levels compared by the compact benchmark, besides qpdf's default
+COMPACT_BENCH_LEVELS = (1, 6, 9)
+
+# Numbers of pages taken from the input by the extract benchmark
+EXTRACT_BENCH_PAGES = (1, 10, 100, 1000)
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def _timed(name, func, output_dir):
+    """Run func(output_dir) in a fresh directory and describe what it wrote"""
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    
+    start = time.perf_counter()
+    func(output_dir)
+    seconds = time.perf_counter() - start
+    
+    return {
+        "name": name,
+        "seconds": seconds,
+        "files": len(os.listdir(output_dir)),
+        "bytes": _dir_size(output_dir),
+    }
+
+
+def _burst_with_pypdf2_writers(input_path, output_dir, base_name):
+    """The original individual-pages split: a fresh PdfWriter for every page"""
+    with open(input_path, 'rb') as f:
+        pdf = PyPDF2.PdfReader(f)
+        page_count = len(pdf.pages)
+        page_format = f"{{:0{len(str(page_count))}d}}"
+        
+        for page_num in range(page_count):
+            output_path = os.path.join(output_dir, f"{base_name}_page{page_format.format(page_num + 1)}.pdf")
+            writer = PyPDF2.PdfWriter()
+            writer.add_page(pdf.pages[page_num])
+            with open(output_path, 'wb') as output_file:
+                writer.write(output_file)
+
+
+def bench_burst(input_path):
+    """Compare the per-page PdfWriter split with the single-pass burst_pdf"""
+    work_dir = tempfile.mkdtemp(prefix="pdf_bench_")
+    try:
+        return [
+            _timed("PyPDF2 writer per page",
+                   lambda out: _burst_with_pypdf2_writers(input_path, out, "page"),
+                   os.path.join(work_dir, "pypdf2")),
+            _timed("pikepdf burst_pdf",
+                   lambda out: burst_pdf(input_path, out, "page"),
+                   os.path.join(work_dir, "pikepdf")),
+        ]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class _CountingFileIO(io.FileIO):
+    """FileIO that counts the read and seek system calls made through it"""
+    reads = 0
+    seeks = 0
+    
+    def readinto(self, buffer):
+        _CountingFileIO.reads += 1
+        return super().readinto(buffer)
+    
+    def readall(self):
+        _CountingFileIO.reads += 1
+        return super().readall()
+    
+    def seek(self, *args):
+        _CountingFileIO.seeks += 1
+        return super().seek(*args)
+
+
+def _major_faults():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_majflt if resource else 0
+
+
+def bench_inputs(input_path):
+    """Compare the input modes by merging a file with itself in both engines.
+    
+    Read and seek calls are counted for the streams the engines open in
+    Python; qpdf reads files itself in the file and mmap modes, so those
+    counts are blank. Major page faults show mmap reads from disk. Run it
+    with an input on a network mount to see the effect of slow I/O.
+    """
+    work_dir = tempfile.mkdtemp(prefix="pdf_bench_")
+    rows = []
+    try:
+        for engine in (ENGINE_PYPDF2, ENGINE_PIKEPDF):
+            for input_mode in inputs.INPUT_MODES:
+                _CountingFileIO.reads = _CountingFileIO.seeks = 0
+                inputs._open_raw = _CountingFileIO
+                faults_before = _major_faults()
+                try:
+                    row = _timed(f"{engine} {input_mode}",
+                                 lambda out: merge_pdfs([input_path] * 2, os.path.join(out, "merged.pdf"),
+                                                        engine=engine, input_mode=input_mode),
+                                 os.path.join(work_dir, f"{engine}_{input_mode}"))
+                finally:
+                    inputs._open_raw = io.FileIO
+                
+                counted = engine == ENGINE_PYPDF2 or input_mode == inputs.INPUT_READAHEAD
+                row["reads"] = _CountingFileIO.reads if counted else ""
+                row["seeks"] = _CountingFileIO.seeks if counted else ""
+                row["major_faults"] = _major_faults() - faults_before if resource else ""
+                rows.append(row)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return rows
+
+
+def bench_outputs(input_path):
+    """Compare writing a PyPDF2 document with open() and with AtomicOutput.
+    
+    The document holds every page of the input and is written to a few
+    files with each method; PyPDF2 issues many small writes, which the
+    large AtomicOutput buffer turns into few system calls.
+    """
+    with open(input_path, 'rb') as f:
+        writer = PyPDF2.PdfWriter()
+        writer.append(PyPDF2.PdfReader(f))
+        
+        def write_plain(out):
+            for i in range(OUTPUT_BENCH_FILES):
+                with open(os.path.join(out, f"{i}.pdf"), 'wb') as output_file:
+                    writer.write(output_file)
+        
+        def write_atomic(out, fsync=False):
+            for i in range(OUTPUT_BENCH_FILES):
+                with AtomicOutput(os.path.join(out, f"{i}.pdf"), fsync) as output_file:
+                    writer.write(output_file)
+        
+        work_dir = tempfile.mkdtemp(prefix="pdf_bench_")
+        rows = []
+        try:
+            for name, func in (("open() 8 KB buffer", write_plain),
+                               ("AtomicOutput 1 MB buffer", write_atomic),
+                               ("AtomicOutput + fsync", lambda out: write_atomic(out, True))):
+                row = _timed(name, func, os.path.join(work_dir, str(len(rows))))
+                row["MB/s"] = megabytes_per_second(row["bytes"], row["seconds"])
+                rows.append(row)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return rows
+
+
+def bench_compact(input_path):
+    """Compare write time and size of classic and compact outputs.
+    
+    The input is parsed once by each library and only the writes are
+    timed: PyPDF2 and qpdf with cross-reference tables, then compact
+    files with object streams at qpdf's default level (existing streams
+    kept as they are) and recompressed at several zlib levels.
+    """
+    work_dir = tempfile.mkdtemp(prefix="pdf_bench_")
+    rows = []
+    try:
+        with open(input_path, 'rb') as f, pikepdf.open(input_path) as pdf:
+            writer = PyPDF2.PdfWriter()
+            writer.append(PyPDF2.PdfReader(f))
+            
+            def write_with(write):
+                def func(out):
+                    with AtomicOutput(os.path.join(out, "output.pdf")) as output_file:
+                        write(output_file)
+                return func
+            
+            variants = [
+                ("PyPDF2 xref table", lambda stream: write_pypdf2(writer, stream)),
+                ("qpdf xref table", lambda stream: save_pikepdf(pdf, stream)),
+                ("PyPDF2 compact", lambda stream: write_pypdf2(writer, stream, True)),
+                ("qpdf compact", lambda stream: save_pikepdf(pdf, stream, True)),
+            ]
+            for level in COMPACT_BENCH_LEVELS:
+                variants.append((f"qpdf compact level {level}",
+                                 lambda stream, level=level: save_pikepdf(pdf, stream, True, level)))
+            
+            for name, write in variants:
+                row = _timed(name, write_with(write), os.path.join(work_dir, str(len(rows))))
+                del row["files"]
+                rows.append(row)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return rows
+
+
+def _extract_with_pypdf2_pages(input_path, output_path, page_numbers):
+    """The original range split: add_page() of reader.pages, which loads every page"""
+    with open(input_path, 'rb') as f:
+        pdf = PyPDF2.PdfReader(f)
+        writer = PyPDF2.PdfWriter()
+        for page_num in page_numbers:
+            writer.add_page(pdf.pages[page_num - 1])
+        with open(output_path, 'wb') as output_file:
+            writer.write(output_file)
+
+
+def _extract_with_page_tree(input_path, output_path, page_numbers):
+    with open(input_path, 'rb') as f:
+        writer = extract_pages(PyPDF2.PdfReader(f), page_numbers)
+        with open(output_path, 'wb') as output_file:
+            writer.write(output_file)
+
+
+def bench_extract(input_path):
+    """Time extracting growing numbers of pages, spread evenly over the input.
+    
+    extract_pages() should cost about the same for one page of a large
+    document as of a small one, and grow with the pages extracted; the
+    reader.pages version pays for every page of the input each time.
+    """
+    with open(input_path, 'rb') as f:
+        page_count = count_pages(PyPDF2.PdfReader(f))
+    
+    work_dir = tempfile.mkdtemp(prefix="pdf_bench_")
+    rows = []
+    try:
+        for count in EXTRACT_BENCH_PAGES:
+            if count > page_count:
+                break
+            page_numbers = [1 + i * page_count // count for i in range(count)]
+            for name, extract in (("PyPDF2 reader.pages", _extract_with_pypdf2_pages),
+                                  ("extract_pages", _extract_with_page_tree)):
+                row = _timed(f"{name} {count} pages",
+                             lambda out: extract(input_path, os.path.join(out, "extract.pdf"),
+                                                 page_numbers),
+                             os.path.join(work_dir, str(len(rows))))
+                del row["files"]
+                row["ms/page"] = row["seconds"] * 1000 / count
+                rows.append(row)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return rows
+
+
+# Benchmarks available from the command line
+BENCHMARKS = {
+    "burst": bench_burst,
+    "compact": bench_compact,
+    "extract": bench_extract,
+    "inputs": bench_inputs,
+    "outputs": bench_outputs,
+}
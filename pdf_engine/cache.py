@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by the total size of its values.
+    
+    size_of(value) returns the cost of a value in bytes. Values larger than
+    the whole budget are not cached. All methods are thread-safe.
+    """
+    def __init__(self, max_bytes, size_of=len):
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size), oldest first
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        return key in self._entries
+    
+    def get(self, key, default=None):
+        """Return the cached value and mark it as most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def put(self, key, value):
+        """Cache a value, evicting least recently used entries to stay in budget"""
+        size = self.size_of(value)
+        
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+    
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+    
+    def discard_where(self, predicate):
+        """Remove every entry whose key matches predicate(key)"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+    
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import hashlib
+from collections import namedtuple
+import pikepdf
+from PyPDF2.generic import (ArrayObject, DictionaryObject, IndirectObject, NullObject,
+                            StreamObject)
+
+
+# Result of a deduplication pass: duplicate streams dropped and the stream
+# bytes they would have taken in the output
+DedupResult = namedtuple("DedupResult", ["streams_removed", "bytes_saved"])
+
+
+def dedupe_pypdf2_writer(writer):
+    """Collapse identical streams of a PyPDF2.PdfWriter into one shared object.
+    
+    Merging documents made from the same template copies every embedded
+    font, image and form once per document. Streams with the same
+    dictionary and the same (still encoded) data are identical, so every
+    reference to a duplicate is pointed at the first copy and the
+    duplicate's slot is left as a null object. Returns a DedupResult.
+    """
+    objects = writer._objects
+    streams = [idnum for idnum, obj in enumerate(objects, 1) if isinstance(obj, StreamObject)]
+    digests = {}  # idnum -> SHA-256 of the stream data, hashed once for all passes
+    
+    def fingerprint(idnum, duplicates):
+        stream = objects[idnum - 1]
+        if idnum not in digests:
+            digests[idnum] = hashlib.sha256(stream._data).digest()
+        return _pypdf2_fingerprint(stream, digests[idnum], duplicates)
+    
+    def same_data(idnum, canonical):
+        return objects[idnum - 1]._data == objects[canonical - 1]._data
+    
+    duplicates = _find_duplicates(streams, fingerprint, same_data)
+    if not duplicates:
+        return DedupResult(0, 0)
+    
+    bytes_saved = 0
+    for idnum in duplicates:
+        bytes_saved += len(objects[idnum - 1]._data)
+        # PdfWriter numbers objects by position, so the slot has to stay
+        objects[idnum - 1] = NullObject()
+    
+    for obj in objects:
+        _redirect_pypdf2(obj, duplicates, writer)
+    return DedupResult(len(duplicates), bytes_saved)
+
+
+def dedupe_pikepdf(pdf):
+    """Collapse identical streams of a pikepdf.Pdf into one shared object.
+    
+    Like dedupe_pypdf2_writer(): references to duplicates are pointed at
+    the first copy. qpdf only saves objects reachable from the trailer,
+    so the duplicates are left out of the output. Returns a DedupResult.
+    
+    Only the hash and length of each stream are kept, so memory does not
+    grow with the size of the streams; the data of two streams is read
+    again to confirm that they match.
+    """
+    streams = {obj.objgen: obj for obj in pdf.objects if isinstance(obj, pikepdf.Stream)}
+    digests = {}  # objgen -> (SHA-256, length) of the raw stream data
+    
+    def fingerprint(objgen, duplicates):
+        if objgen not in digests:
+            raw_data = streams[objgen].read_raw_bytes()
+            digests[objgen] = (hashlib.sha256(raw_data).digest(), len(raw_data))
+        return _pikepdf_fingerprint(streams[objgen], digests[objgen], duplicates)
+    
+    def same_data(objgen, canonical):
+        return streams[objgen].read_raw_bytes() == streams[canonical].read_raw_bytes()
+    
+    duplicates = _find_duplicates(list(streams), fingerprint, same_data)
+    if not duplicates:
+        return DedupResult(0, 0)
+    
+    targets = {objgen: streams[canonical] for objgen, canonical in duplicates.items()}
+    for obj in pdf.objects:
+        if isinstance(obj, (pikepdf.Dictionary, pikepdf.Array, pikepdf.Stream)):
+            _redirect_pikepdf(obj, targets)
+    
+    bytes_saved = sum(digests[objgen][1] for objgen in duplicates)
+    return DedupResult(len(duplicates), bytes_saved)
+
+
+def _find_duplicates(keys, fingerprint, same_data):
+    """Map each key whose fingerprint matches an earlier key's to that key.
+    
+    A stream can refer to other streams (an image to its soft mask, a form
+    to its resources), and two such streams only match once the streams
+    they refer to have been collapsed, so the remaining keys are compared
+    again until a pass finds nothing new. fingerprint sees the duplicates
+    found so far as fingerprint(key, duplicates). Keys with the same
+    fingerprint are only taken as duplicates if same_data(key, first key)
+    confirms that their data matches.
+    """
+    duplicates = {}
+    remaining = keys
+    
+    while remaining:
+        seen = {}
+        found = False
+        for key in remaining:
+            canonical = seen.setdefault(fingerprint(key, duplicates), key)
+            if canonical != key and same_data(key, canonical):
+                duplicates[key] = canonical
+                found = True
+        if not found:
+            break
+        remaining = [key for key in remaining if key not in duplicates]
+    
+    # A first copy may itself turn out to duplicate an earlier one later on
+    for key, canonical in duplicates.items():
+        while canonical in duplicates:
+            canonical = duplicates[canonical]
+        duplicates[key] = canonical
+    return duplicates
+
+
+def _pypdf2_fingerprint(stream, digest, duplicates):
+    buffer = io.BytesIO()
+    for key in sorted(dict.keys(stream)):
+        if key != "/Length":
+            buffer.write(key.encode('utf-8'))
+            _write_canonical(dict.__getitem__(stream, key), duplicates, buffer)
+    return (type(stream).__name__, digest, buffer.getvalue())
+
+
+def _write_canonical(obj, duplicates, buffer):
+    """Serialize obj with references to duplicates replaced by the first copy"""
+    if isinstance(obj, IndirectObject):
+        buffer.write(f" {duplicates.get(obj.idnum, obj.idnum)} R".encode('ascii'))
+    elif isinstance(obj, DictionaryObject):
+        buffer.write(b"<<")
+        for key in sorted(dict.keys(obj)):
+            buffer.write(key.encode('utf-8'))
+            _write_canonical(dict.__getitem__(obj, key), duplicates, buffer)
+        buffer.write(b">>")
+    elif isinstance(obj, ArrayObject):
+        buffer.write(b"[")
+        for value in obj:
+            _write_canonical(value, duplicates, buffer)
+        buffer.write(b"]")
+    else:
+        buffer.write(b" ")
+        obj.write_to_stream(buffer, None)
+
+
+def _redirect_pypdf2(obj, duplicates, writer):
+    """Point references to duplicates inside obj at the first copy"""
+    if isinstance(obj, DictionaryObject):
+        for key, value in dict.items(obj):
+            if isinstance(value, IndirectObject):
+                if value.idnum in duplicates:
+                    dict.__setitem__(obj, key, IndirectObject(duplicates[value.idnum], 0, writer))
+            else:
+                _redirect_pypdf2(value, duplicates, writer)
+    elif isinstance(obj, ArrayObject):
+        for i, value in enumerate(obj):
+            if isinstance(value, IndirectObject):
+                if value.idnum in duplicates:
+                    obj[i] = IndirectObject(duplicates[value.idnum], 0, writer)
+            else:
+                _redirect_pypdf2(value, duplicates, writer)
+
+
+def _pikepdf_fingerprint(stream, digest, duplicates):
+    dictionary = tuple(sorted((key, _pikepdf_canonical(value, duplicates))
+                              for key, value in stream.stream_dict.items() if key != "/Length"))
+    return (digest, dictionary)
+
+
+def _pikepdf_canonical(obj, duplicates):
+    """Hashable form of obj with references to duplicates replaced by the first copy"""
+    if not isinstance(obj, pikepdf.Object):
+        return (type(obj).__name__, obj)  # numbers and booleans come back as Python values
+    if obj.is_indirect:
+        objgen = obj.objgen
+        return duplicates.get(objgen, objgen)
+    if isinstance(obj, pikepdf.Dictionary):
+        return tuple(sorted((key, _pikepdf_canonical(value, duplicates)) for key, value in obj.items()))
+    if isinstance(obj, pikepdf.Array):
+        return tuple(_pikepdf_canonical(value, duplicates) for value in obj)
+    return obj.unparse()
+
+
+def _redirect_pikepdf(obj, targets):
+    """Point references to duplicates inside obj at the first copy"""
+    if isinstance(obj, pikepdf.Stream):
+        obj = obj.stream_dict
+    if isinstance(obj, pikepdf.Dictionary):
+        items = list(obj.items())
+    else:
+        items = list(enumerate(obj))
+    
+    for key, value in items:
+        if not isinstance(value, pikepdf.Object):
+            continue
+        if value.is_indirect:
+            if value.objgen in targets:
+                obj[key] = targets[value.objgen]
+        elif isinstance(value, (pikepdf.Dictionary, pikepdf.Array)):
+            _redirect_pikepdf(value, targets)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import PyPDF2
+from PyPDF2.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject, NullObject,
+                            NumberObject)
+
+from .objects import clone_object, resolve
+
+
+# Page attributes a page can inherit from the page tree nodes above it
+_INHERITABLE_KEYS = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+# Deepest page tree followed; real trees are a few levels deep
+_MAX_TREE_DEPTH = 64
+
+
+def count_pages(reader):
+    """Page count of a PyPDF2.PdfReader, read from its page tree root.
+    
+    Unlike len(reader.pages), this does not load every page object.
+    """
+    return int(reader.trailer["/Root"]["/Pages"]["/Count"])
+
+
+def extract_pages(reader, page_numbers):
+    """Copy the given 1-based pages of a PyPDF2.PdfReader, in order, into a new PdfWriter.
+    
+    Each page is found by descending the page tree along the /Count of
+    its nodes, and only the objects reachable from the selected pages are
+    read and copied, so the cost grows with the pages extracted rather
+    than with the size of the document; reader.pages would load every
+    page first. Links and annotations pointing at pages that are not
+    extracted become null. A page listed twice is copied twice.
+    """
+    writer = PyPDF2.PdfWriter()
+    pages_root = reader.trailer["/Root"]["/Pages"]
+    page_count = int(pages_root["/Count"])
+    
+    selected = []
+    for page_number in page_numbers:
+        if not 1 <= page_number <= page_count:
+            raise IndexError(f"Page {page_number} is out of range (1-{page_count})")
+        selected.append(_find_page(pages_root, page_number - 1))
+    
+    # Pages get their numbers first, so links between extracted pages are kept
+    copies = {}  # source object number -> reference in writer
+    page_refs = []
+    for page_ref, _ in selected:
+        new_ref = writer._add_object(NullObject())
+        page_refs.append(new_ref)
+        if isinstance(page_ref, IndirectObject):
+            copies.setdefault(page_ref.idnum, new_ref)
+    pending = []
+    
+    def reference(ref):
+        if ref.idnum not in copies:
+            obj = ref.get_object()
+            if isinstance(obj, DictionaryObject) and obj.get("/Type") in ("/Page", "/Pages"):
+                return NullObject()  # another page, or the source page tree
+            copies[ref.idnum] = writer._add_object(NullObject())
+            pending.append((copies[ref.idnum], obj))
+        return copies[ref.idnum]
+    
+    for new_ref, (page_ref, inherited) in zip(page_refs, selected):
+        page = resolve(page_ref)
+        copy = DictionaryObject({key: clone_object(value, reference)
+                                 for key, value in dict.items(page) if key != "/Parent"})
+        for key, value in inherited.items():
+            if key not in copy:
+                copy[NameObject(key)] = clone_object(value, reference)
+        copy[NameObject("/Parent")] = writer._pages
+        writer._objects[new_ref.idnum - 1] = copy
+    
+    while pending:
+        new_ref, obj = pending.pop()
+        writer._objects[new_ref.idnum - 1] = clone_object(obj, reference)
+    
+    pages = writer._pages.get_object()
+    pages[NameObject("/Kids")] = ArrayObject(page_refs)
+    pages[NameObject("/Count")] = NumberObject(len(page_refs))
+    return writer
+
+
+def _find_page(pages_root, index):
+    """Return (reference, inherited attributes) of the 0-based page index below pages_root"""
+    node = pages_root
+    inherited = {}
+    
+    for _ in range(_MAX_TREE_DEPTH):
+        for key in _INHERITABLE_KEYS:
+            if key in node:
+                inherited[key] = dict.__getitem__(node, key)
+        kids = resolve(dict.__getitem__(node, "/Kids"))
+        
+        # A node with as many kids as pages has only pages as kids, which
+        # saves reading every kid before the wanted one in flat trees
+        if node.get("/Count") == len(kids) and not _is_tree_node(resolve(kids[index])):
+            return kids[index], inherited
+        
+        for kid_ref in kids:
+            kid = resolve(kid_ref)
+            kid_count = int(kid.get("/Count", 0)) if _is_tree_node(kid) else 1
+            if index < kid_count:
+                break
+            index -= kid_count
+        else:
+            raise ValueError("The page tree holds fewer pages than its /Count")
+        
+        if not _is_tree_node(kid):
+            return kid_ref, inherited
+        node = kid
+    
+    raise ValueError("The page tree is too deep or contains a loop")
+
+
+def _is_tree_node(obj):
+    return obj.get("/Type") == "/Pages" or "/Kids" in obj
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import PyPDF2
+
+from .inputs import INPUT_FILE, open_input
+
+
+# Parsed documents kept open by the shared pool
+DEFAULT_MAX_OPEN = 16
+
+
+class _PoolEntry:
+    def __init__(self, path, input_mode):
+        self.file = open_input(path, input_mode)
+        self.reader = PyPDF2.PdfReader(self.file)
+        self.lock = threading.RLock()  # a reader is used by one thread at a time
+        self.users = 0
+    
+    def close(self):
+        self.file.close()
+
+
+class DocumentPool:
+    """Keeps recently used PDFs parsed, closing the least recently used.
+    
+    Readers are keyed by path, size and modification time, so a file that
+    changed on disk is parsed again. At most max_open documents stay open
+    unless more than that are in use at once. Files are read in input_mode
+    (see pdf_engine.inputs).
+    """
+    def __init__(self, max_open=DEFAULT_MAX_OPEN, input_mode=INPUT_FILE):
+        self.max_open = max_open
+        self.input_mode = input_mode
+        self._entries = OrderedDict()  # key -> _PoolEntry, least recent first
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    @contextmanager
+    def reader(self, path):
+        """Context manager giving the PyPDF2.PdfReader of path for exclusive use"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.users += 1
+        
+        if entry is None:
+            # Parse outside the pool lock so other documents are not held up
+            entry = _PoolEntry(path, self.input_mode)
+            entry.users = 1
+            with self._lock:
+                existing = self._entries.get(key)
+                if existing is not None:
+                    # Another thread opened it meanwhile; use theirs
+                    entry.close()
+                    entry = existing
+                    entry.users += 1
+                else:
+                    self._entries[key] = entry
+                    self._drop_stale(path, key)
+        
+        try:
+            with entry.lock:
+                yield entry.reader
+        finally:
+            with self._lock:
+                entry.users -= 1
+                self._evict()
+    
+    def _drop_stale(self, path, key):
+        # Older versions of a file that changed on disk will not be asked for again
+        for other_key in [other for other in self._entries if other[0] == path and other != key]:
+            if self._entries[other_key].users == 0:
+                self._entries.pop(other_key).close()
+    
+    def _evict(self):
+        # Documents in use are skipped and closed on a later release
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_open:
+                break
+            if self._entries[key].users == 0:
+                self._entries.pop(key).close()
+    
+    def close_all(self):
+        """Close every document that is not in use"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.users == 0]:
+                self._entries.pop(key).close()
+
+
+@contextmanager
+def open_reader(path, pool=None, input_mode=INPUT_FILE):
+    """Context manager giving a PdfReader of path, from pool when one is given"""
+    if pool is not None:
+        with pool.reader(path) as reader:
+            yield reader
+    else:
+        with open_input(path, input_mode) as f:
+            yield PyPDF2.PdfReader(f)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool():
+    """Return the document pool shared within this process"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DocumentPool()
+        return _default_pool
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import shutil
+import hashlib
+from collections import namedtuple
+import PyPDF2
+import pikepdf
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+
+from .merge import ENGINE_PYPDF2, merge_pdfs, _check_cancel, _write_output
+from .inputs import INPUT_FILE, INPUT_MMAP, open_input
+from .outputs import OUTPUT_BUFFER_SIZE
+from .info import PROBE_TAIL_BYTES, _STARTXREF
+from .manifest import MERGE_MANIFEST_NAME, MergeManifest
+from .objects import clone_object, resolve
+
+# The input list is cut into segments of about this many files on average,
+# and never more than INCREMENTAL_SEGMENT_MAX
+INCREMENTAL_SEGMENT_AVERAGE = 16
+INCREMENTAL_SEGMENT_MAX = 64
+
+# Updates are appended to the previous output until it has grown to this
+# many times its size after the last full write; then it is written afresh
+INCREMENTAL_COMPACT_RATIO = 2.0
+
+# Page attributes a page tree node can pass on to the pages below it; new
+# pages are added to a root that has none, so they need not inherit any
+_INHERITABLE_KEYS = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+# Result of merge_pdfs_incremental()
+IncrementalMergeResult = namedtuple("IncrementalMergeResult",
+                                    ["page_count", "segments_reused", "segments_built",
+                                     "updated_in_place"])
+
+
+def default_segment_dir(output_path):
+    """Directory next to output_path where its incremental merge segments are kept"""
+    directory, name = os.path.split(os.path.abspath(output_path))
+    return os.path.join(directory, f".{name}.segments")
+
+
+def merge_pdfs_incremental(pdf_paths, output_path, engine=ENGINE_PYPDF2, segment_dir=None,
+                           on_pages=None, on_bytes=None, should_cancel=None,
+                           input_mode=INPUT_FILE, fsync=False, on_written=None, dedupe=False,
+                           on_deduped=None):
+    """Merge like merge_pdfs(), redoing only the work for inputs that changed.
+    
+    The inputs are grouped into segments which are merged separately and
+    kept in segment_dir (default_segment_dir() by default), together with
+    a manifest of input hashes. A segment is named by the hashes of its
+    inputs, so only segments containing changed, added or removed files
+    are built again. Boundaries depend on file contents rather than
+    positions, so inserting a file does not shift every later segment.
+    
+    If output_path is still the file the last merge wrote, the changed
+    segments are appended to it as a PDF incremental update: the file is
+    copied and only the new pages, the page tree and the outline are
+    written after it. Otherwise, and once updates have doubled the file,
+    the cached segments are joined into a new file with engine.
+    dedupe applies to the segments and the join as in merge_pdfs(), but
+    streams in an appended update are not shared with the earlier file.
+    Returns an IncrementalMergeResult.
+    """
+    pdf_paths = list(pdf_paths)
+    segment_dir = segment_dir or default_segment_dir(output_path)
+    os.makedirs(segment_dir, exist_ok=True)
+    manifest = MergeManifest(os.path.join(segment_dir, MERGE_MANIFEST_NAME))
+    previous = manifest.output_layout(output_path)
+    
+    # Only files whose size or mtime changed are read to hash them
+    input_hashes = manifest.input_hashes(pdf_paths)
+    
+    segments = []  # [key, page_count, outline_items] in output order
+    segment_paths = []
+    pages_done = 0
+    bytes_read = 0
+    built = 0
+    
+    for paths, hashes in _content_defined_segments(pdf_paths, input_hashes):
+        _check_cancel(should_cancel)
+        key = hashlib.sha256("\n".join(hashes).encode('ascii')).hexdigest()
+        segment_path = os.path.join(segment_dir, f"{key}.pdf")
+        
+        info = manifest.segment_info(key, segment_path)
+        if info is None:
+            # Progress within the segment is offset by the segments before it
+            on_segment_pages = None
+            if on_pages:
+                on_segment_pages = (lambda pages, read, offset=(pages_done, bytes_read):
+                                    on_pages(offset[0] + pages, offset[1] + read))
+            page_count = merge_pdfs(paths, segment_path, engine=engine, on_pages=on_segment_pages,
+                                    should_cancel=should_cancel, input_mode=input_mode,
+                                    dedupe=dedupe)
+            info = (page_count, _outline_item_count(segment_path))
+            manifest.record_segment(key, segment_path, *info)
+            built += 1
+        
+        pages_done += info[0]
+        bytes_read += sum(os.path.getsize(path) for path in paths)
+        if on_pages:
+            on_pages(pages_done, bytes_read)
+        
+        segments.append([key, info[0], info[1]])
+        segment_paths.append(segment_path)
+    
+    updated = False
+    if previous is not None:
+        previous_segments, base_size = previous
+        if os.path.getsize(output_path) < INCREMENTAL_COMPACT_RATIO * base_size:
+            updated = _update_output(output_path, previous_segments, segments, segment_paths,
+                                     on_bytes, should_cancel, fsync, on_written)
+    
+    if updated:
+        page_count = pages_done
+    else:
+        page_count = merge_pdfs(segment_paths, output_path, engine=engine, on_bytes=on_bytes,
+                                should_cancel=should_cancel, fsync=fsync, on_written=on_written,
+                                dedupe=dedupe, on_deduped=on_deduped)
+        base_size = os.path.getsize(output_path)
+    
+    manifest.record_output(output_path, segments, base_size)
+    manifest.prune(pdf_paths, [key for key, _, _ in segments], segment_dir)
+    
+    return IncrementalMergeResult(page_count, len(segments) - built, built, updated)
+
+
+def _content_defined_segments(pdf_paths, input_hashes):
+    """Yield (paths, hashes) groups, cutting after inputs whose hash picks a boundary"""
+    start = 0
+    for i, input_hash in enumerate(input_hashes):
+        at_boundary = int(input_hash[:8], 16) % INCREMENTAL_SEGMENT_AVERAGE == 0
+        if at_boundary or i + 1 - start >= INCREMENTAL_SEGMENT_MAX or i + 1 == len(input_hashes):
+            yield pdf_paths[start:i + 1], input_hashes[start:i + 1]
+            start = i + 1
+
+
+def _outline_item_count(path):
+    """Number of top-level outline items, which the merged output keeps as they are"""
+    with pikepdf.open(path) as pdf:
+        if pikepdf.Name.Outlines not in pdf.Root:
+            return 0
+        with pdf.open_outline() as outline:
+            return len(outline.root)
+
+
+def _match_segments(previous_segments, segments):
+    """Position in previous_segments of each segment kept in order, or None if it is new"""
+    previous_keys = [key for key, _, _ in previous_segments]
+    matches = []
+    start = 0
+    
+    for key, _, _ in segments:
+        try:
+            index = previous_keys.index(key, start)
+        except ValueError:
+            matches.append(None)
+        else:
+            matches.append(index)
+            start = index + 1
+    return matches
+
+
+def _update_output(output_path, previous_segments, segments, segment_paths,
+                   on_bytes, should_cancel, fsync, on_written):
+    """Rewrite output_path as itself plus an incremental update to the new segments.
+    
+    The update holds the pages and outline items of new segments, the page
+    tree root, the outline root and the outline items whose neighbours
+    changed; pages of dropped segments are simply no longer referenced.
+    Returns False without touching output_path when it cannot be updated
+    that way, e.g. when no segment was kept or its page tree is nested.
+    """
+    matches = _match_segments(previous_segments, segments)
+    if all(match is None for match in matches):
+        return False
+    if matches == list(range(len(previous_segments))):
+        return True  # nothing changed, the output is already up to date
+    
+    previous_xref = _previous_xref(output_path)
+    if previous_xref is None:
+        return False
+    
+    with open_input(output_path, INPUT_MMAP) as output_file:
+        output = _Document(PyPDF2.PdfReader(output_file))
+        if not output.flat or len(output.pages) != sum(pages for _, pages, _ in previous_segments):
+            return False
+        if len(output.outline) != sum(items for _, _, items in previous_segments):
+            return False  # not the file the manifest describes
+        
+        update = _Update(output)
+        pages = []
+        outline = []
+        page_start = item_start = 0
+        old_ranges = []
+        for _, page_count, outline_items in previous_segments:
+            old_ranges.append((page_start, item_start))
+            page_start += page_count
+            item_start += outline_items
+        
+        for (_, page_count, outline_items), segment_path, match in zip(segments, segment_paths, matches):
+            _check_cancel(should_cancel)
+            if match is not None:
+                first_page, first_item = old_ranges[match]
+                pages.extend(output.pages[first_page:first_page + page_count])
+                outline.extend(output.outline[first_item:first_item + outline_items])
+                continue
+            
+            with open_input(segment_path, INPUT_MMAP) as segment_file:
+                segment = _Document(PyPDF2.PdfReader(segment_file))
+                if not segment.flat:
+                    return False
+                new_pages, new_items = update.copy_segment(segment)
+            pages.extend(new_pages)
+            outline.extend(new_items)
+        
+        update.set_pages(pages)
+        update.set_outline(outline)
+        data = update.serialize(os.path.getsize(output_path), previous_xref)
+    
+    def write(stream):
+        with open(output_path, 'rb') as previous_file:
+            shutil.copyfileobj(previous_file, stream, OUTPUT_BUFFER_SIZE)
+        stream.write(data)
+    
+    _write_output(output_path, write, on_bytes, should_cancel, fsync, on_written)
+    return True
+
+
+def _previous_xref(path):
+    """Offset of the last cross-reference table of path, or None for xref streams"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.seek(max(0, size - PROBE_TAIL_BYTES))
+        trailers = list(_STARTXREF.finditer(f.read()))
+        if not trailers:
+            return None
+        
+        # A table is followed by a classic trailer the update can chain to
+        offset = int(trailers[-1].group(1))
+        f.seek(offset)
+        if f.read(4) != b"xref":
+            return None
+    return offset
+
+
+class _Document:
+    """References to the catalog, page tree root, pages and top-level outline items.
+    
+    Only these objects are parsed; the pages and items themselves stay
+    unread references.
+    """
+    def __init__(self, reader):
+        self.reader = reader
+        self.trailer = reader.trailer
+        self.catalog_ref = self.trailer.raw_get("/Root")
+        self.catalog = resolve(self.catalog_ref)
+        self.pages_ref = self.catalog.raw_get("/Pages")
+        self.pages_root = resolve(self.pages_ref)
+        self.pages = list(resolve(self.pages_root.raw_get("/Kids")))
+        
+        # A root with all pages as kids, and nothing for them to inherit
+        self.flat = (isinstance(self.pages_ref, IndirectObject)
+                     and self.pages_root.get("/Count") == len(self.pages)
+                     and not any(key in self.pages_root for key in _INHERITABLE_KEYS))
+        
+        # Top-level outline items, following /Next until it ends or loops
+        self.outline_ref = dict.get(self.catalog, "/Outlines")
+        self.outline = []
+        if self.outline_ref is not None:
+            item = dict.get(resolve(self.outline_ref), "/First")
+            seen = set()
+            while isinstance(item, IndirectObject) and item.idnum not in seen:
+                seen.add(item.idnum)
+                self.outline.append(item)
+                item = dict.get(item.get_object(), "/Next")
+
+
+class _Update:
+    """Objects added to or changed in a document, written as an incremental update"""
+    def __init__(self, document):
+        self.document = document
+        self.next_id = document.trailer["/Size"]
+        self.objects = {}  # (idnum, generation) -> object to write
+        
+        # Items of new segments hang off the existing outline root, or a new one
+        self.outline_ref = document.outline_ref
+        if self.outline_ref is None:
+            self.outline_ref = self._allocate()
+            self.objects[(self.outline_ref.idnum, 0)] = DictionaryObject(
+                {NameObject("/Type"): NameObject("/Outlines")})
+            catalog = DictionaryObject(document.catalog)
+            catalog[NameObject("/Outlines")] = self.outline_ref
+            self._put(document.catalog_ref, catalog)
+    
+    def _allocate(self):
+        ref = IndirectObject(self.next_id, 0, None)
+        self.next_id += 1
+        return ref
+    
+    def _put(self, ref, obj):
+        self.objects[(ref.idnum, ref.generation)] = obj
+    
+    def _current(self, ref):
+        """The object ref points to after the update, as a copy that may be changed"""
+        obj = self.objects.get((ref.idnum, ref.generation))
+        if obj is None:
+            obj = DictionaryObject(ref.get_object())
+            self._put(ref, obj)
+        return obj
+    
+    def copy_segment(self, segment):
+        """Copy the pages and outline items of segment; return references to both.
+        
+        Objects are cloned with new numbers. The segment's page tree root
+        and outline root are mapped to the output's, so the copied pages
+        and top-level items point at their new parents.
+        """
+        numbers = {segment.pages_ref.idnum: self.document.pages_ref}
+        if segment.outline_ref is not None:
+            numbers[segment.outline_ref.idnum] = self.outline_ref
+        pending = []
+        
+        def reference(ref):
+            if ref.idnum not in numbers:
+                numbers[ref.idnum] = self._allocate()
+                pending.append((numbers[ref.idnum], ref))
+            return numbers[ref.idnum]
+        
+        pages = [reference(page) for page in segment.pages]
+        items = [reference(item) for item in segment.outline]
+        while pending:
+            new_ref, ref = pending.pop()
+            self._put(new_ref, clone_object(ref.get_object(), reference))
+        return pages, items
+    
+    def set_pages(self, pages):
+        pages_root = self._current(self.document.pages_ref)
+        pages_root[NameObject("/Kids")] = ArrayObject(pages)
+        pages_root[NameObject("/Count")] = NumberObject(len(pages))
+    
+    def set_outline(self, items):
+        """Chain items as the top-level outline, rewriting those whose neighbours changed"""
+        count = 0
+        for i, ref in enumerate(items):
+            item = self.objects.get((ref.idnum, ref.generation)) or ref.get_object()
+            links = {
+                "/Parent": self.outline_ref,
+                "/Prev": items[i - 1] if i > 0 else None,
+                "/Next": items[i + 1] if i + 1 < len(items) else None,
+            }
+            
+            # Kept items are only written again if their neighbours changed
+            if any(_reference_key(dict.get(item, name)) != _reference_key(link)
+                   for name, link in links.items()):
+                item = self._current(ref)
+                for name, link in links.items():
+                    if link is None:
+                        item.pop(NameObject(name), None)
+                    else:
+                        item[NameObject(name)] = link
+            
+            # Open items count their visible descendants as well
+            count += 1 + max(int(item.get("/Count", 0)), 0)
+        
+        outline_root = self._current(self.outline_ref)
+        for name in ("/First", "/Last"):
+            outline_root.pop(NameObject(name), None)
+        if items:
+            outline_root[NameObject("/First")] = items[0]
+            outline_root[NameObject("/Last")] = items[-1]
+        outline_root[NameObject("/Count")] = NumberObject(count)
+    
+    def serialize(self, base_offset, previous_xref):
+        """Bytes of the update, to be appended to a file of base_offset bytes"""
+        buffer = io.BytesIO()
+        buffer.write(b"\n")
+        offsets = {}
+        
+        keys = sorted(self.objects)
+        for key in keys:
+            offsets[key] = base_offset + buffer.tell()
+            buffer.write(f"{key[0]} {key[1]} obj\n".encode('ascii'))
+            self.objects[key].write_to_stream(buffer, None)
+            buffer.write(b"\nendobj\n")
+        
+        # One xref subsection per run of consecutive object numbers
+        xref_offset = base_offset + buffer.tell()
+        buffer.write(b"xref\n")
+        start = 0
+        for i in range(1, len(keys) + 1):
+            if i == len(keys) or keys[i][0] != keys[i - 1][0] + 1:
+                buffer.write(f"{keys[start][0]} {i - start}\n".encode('ascii'))
+                for key in keys[start:i]:
+                    buffer.write(f"{offsets[key]:010d} {key[1]:05d} n \n".encode('ascii'))
+                start = i
+        
+        trailer = DictionaryObject({
+            NameObject("/Size"): NumberObject(self.next_id),
+            NameObject("/Root"): self.document.catalog_ref,
+            NameObject("/Prev"): NumberObject(previous_xref),
+        })
+        for name in ("/Info", "/ID"):
+            if name in self.document.trailer:
+                trailer[NameObject(name)] = self.document.trailer.raw_get(name)
+        buffer.write(b"trailer\n")
+        trailer.write_to_stream(buffer, None)
+        buffer.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode('ascii'))
+        
+        return buffer.getvalue()
+
+
+def _reference_key(obj):
+    return (obj.idnum, obj.generation) if isinstance(obj, IndirectObject) else None
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from .handles import open_reader
+
+
+# Bump when the table layout or the meaning of a column changes
+INDEX_SCHEMA_VERSION = 1
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def default_index_path():
+    """Location of the metadata index shared by the GUI windows"""
+    if sys.platform == 'win32':
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ultimate_pdf_tools", "metadata.sqlite")
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents as a hex string"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_pdf_metadata(path, pool=None):
+    """Parse a PDF with PyPDF2 and return the metadata kept in the index.
+    
+    The parsed document comes from pool (a DocumentPool) when one is given,
+    and stays there for later operations on the same file. Raises an
+    exception describing the problem if the file is not a readable PDF,
+    like validate_pdf().
+    """
+    with open_reader(path, pool) as pdf:
+        encrypted = pdf.is_encrypted
+        page_sizes = [(round(float(page.mediabox.width), 2), round(float(page.mediabox.height), 2))
+                      for page in pdf.pages]
+        has_outline = bool(pdf.outline)
+    
+    return {
+        "page_count": len(page_sizes),
+        "page_sizes": page_sizes,
+        "encrypted": encrypted,
+        "has_outline": has_outline,
+        "content_hash": file_hash(path),
+    }
+
+
+class MetadataIndex:
+    """Persistent SQLite index of PDF metadata keyed by path, size and mtime.
+    
+    A file that has not changed since it was indexed costs a stat() and a
+    lookup instead of a parse. Safe to use from several threads.
+    """
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_index_path()
+        self._lock = threading.Lock()
+        
+        try:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._create_schema()
+        except (OSError, sqlite3.Error) as e:
+            # The index only saves time, so carry on without persisting it
+            logger.warning("Metadata index unavailable at %s: %s", self.db_path, e)
+            self._db = sqlite3.connect(":memory:", check_same_thread=False)
+            self._create_schema()
+    
+    def _create_schema(self):
+        # A lost write only means a file is parsed again, so skip the
+        # fsync on every commit
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version != INDEX_SCHEMA_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS files")
+            self._db.execute(f"PRAGMA user_version = {INDEX_SCHEMA_VERSION}")
+        
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                page_count INTEGER NOT NULL,
+                page_sizes TEXT NOT NULL,
+                encrypted INTEGER NOT NULL,
+                has_outline INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            )
+        """)
+        self._db.commit()
+    
+    def lookup(self, path):
+        """Return the indexed metadata of path, or None if it is missing or stale"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        
+        with self._lock:
+            row = self._db.execute(
+                "SELECT page_count, page_sizes, encrypted, has_outline, content_hash FROM files "
+                "WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)).fetchone()
+        if row is None:
+            return None
+        
+        page_count, page_sizes, encrypted, has_outline, content_hash = row
+        return {
+            "page_count": page_count,
+            "page_sizes": [tuple(size) for size in json.loads(page_sizes)],
+            "encrypted": bool(encrypted),
+            "has_outline": bool(has_outline),
+            "content_hash": content_hash,
+        }
+    
+    def get(self, path, pool=None):
+        """Return the metadata of path, parsing and indexing it if needed"""
+        metadata = self.lookup(path)
+        if metadata is None:
+            metadata = self.index_file(path, pool)
+        return metadata
+    
+    def index_file(self, path, pool=None):
+        """Parse path (through pool, if given) and store its metadata, replacing any older entry"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        metadata = read_pdf_metadata(path, pool)
+        
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, metadata["page_count"],
+                 json.dumps(metadata["page_sizes"]), int(metadata["encrypted"]),
+                 int(metadata["has_outline"]), metadata["content_hash"]))
+            self._db.commit()
+        return metadata
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def default_index():
+    """Return the metadata index at default_index_path(), opened on first use"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = MetadataIndex()
+        return _default_index
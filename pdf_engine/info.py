@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import io
+from typing import Any, Dict, Optional
+import fitz  # PyMuPDF
+import PyPDF2
+import pikepdf
+
+
+# Bytes read from the start and the end of a file by probe_pdf()
+PROBE_HEAD_BYTES = 1024
+PROBE_TAIL_BYTES = 4096
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)\s+%%EOF")
+_XREF_SECTION = re.compile(rb"\s*(xref|\d+\s+\d+\s+obj)")
+
+# The first object of a linearized file is its linearization dictionary
+_FIRST_OBJECT = re.compile(rb"%PDF-\d\.\d[^\n\r]*[\r\n]+(?:%[^\n\r]*[\r\n]+)*"
+                           rb"\s*\d+\s+\d+\s+obj\s*<<(.*?)>>", re.S)
+_LINEARIZATION_ENTRY = re.compile(rb"/(Linearized|L|H|O|E|N|T)\s*(\[[^\]]*\]|[\d.]+)")
+
+
+def find_pdf_files(paths):
+    """Yield the PDF files among paths, walking directories in name order"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith('.pdf'):
+                        yield os.path.join(root, name)
+        elif os.path.isfile(path) and path.lower().endswith('.pdf'):
+            yield path
+
+
+def probe_pdf(path):
+    """Cheaply check that a file looks like a complete PDF and return its header version.
+    
+    Only the header, the startxref pointer in the trailer and the start of
+    the cross-reference section it points to are read, so the cost does not
+    depend on the size of the file. Raises ValueError describing the problem.
+    """
+    size = os.path.getsize(path)
+    
+    with open(path, 'rb') as f:
+        head = f.read(PROBE_HEAD_BYTES)
+        header = head.find(b"%PDF-")
+        if header < 0:
+            raise ValueError("No PDF header found")
+        version = head[header + 5:header + 8].decode('ascii', 'replace')
+        
+        f.seek(max(0, size - PROBE_TAIL_BYTES))
+        trailers = list(_STARTXREF.finditer(f.read()))
+        if not trailers:
+            raise ValueError("No startxref/%%EOF trailer found, the file may be truncated")
+        
+        # The last trailer wins after incremental updates; offsets count from
+        # the header when the file has junk in front of it
+        offset = int(trailers[-1].group(1))
+        for start in sorted({offset, header + offset}):
+            if start < size:
+                f.seek(start)
+                if _XREF_SECTION.match(f.read(32)):
+                    return version
+    
+    raise ValueError("startxref does not point to a cross-reference table or stream")
+
+
+def validate_pdf(path: str, fast: bool = False) -> Optional[int]:
+    """Check that a file is a readable PDF.
+    
+    By default the PDF is parsed with PyPDF2 and its page count returned.
+    With fast=True a file that passes probe_pdf() is accepted without
+    parsing and None is returned; files that fail the probe still get the
+    full parse, which can often recover damaged cross-reference data.
+    
+    Raises an exception describing the problem if the file is not a
+    readable PDF.
+    """
+    if fast:
+        try:
+            probe_pdf(path)
+            return None
+        except ValueError:
+            pass
+    
+    with open(path, 'rb') as f:
+        pdf = PyPDF2.PdfReader(f)
+        return len(pdf.pages)
+
+
+def check_linearization(path, page_count=None):
+    """Check that path is a correctly linearized ("fast web view") file.
+    
+    Returns None if the file has no linearization dictionary, an empty
+    list if it is linearized correctly, and otherwise a list of problems.
+    The dictionary must start the file and its /L, /N, /O, /E, /T and /H
+    entries must describe the file; a file changed after linearization,
+    e.g. by an incremental update, no longer matches its /L. qpdf then
+    checks the hint tables against the objects of the first page.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(PROBE_HEAD_BYTES)
+    
+    match = _FIRST_OBJECT.match(head)
+    if match is None:
+        return None
+    entries = {key.decode('ascii'): value for key, value in _LINEARIZATION_ENTRY.findall(match.group(1))}
+    if "Linearized" not in entries:
+        return None
+    
+    problems = []
+    for key in ("L", "H", "O", "E", "N", "T"):
+        if key not in entries:
+            problems.append(f"/{key} is missing from the linearization dictionary")
+    if "L" in entries and int(entries["L"]) != size:
+        problems.append(f"/L is {int(entries['L'])} but the file is {size} bytes; "
+                        f"it was changed after it was linearized")
+    if "N" in entries and page_count is not None and int(entries["N"]) != page_count:
+        problems.append(f"/N is {int(entries['N'])} but the file has {page_count} pages")
+    for key in ("E", "T"):
+        if key in entries and not 0 < int(entries[key]) <= size:
+            problems.append(f"/{key} points outside the file")
+    if problems:
+        return problems
+    
+    report = io.StringIO()
+    try:
+        with pikepdf.open(path) as pdf:
+            if not pdf.check_linearization(report):
+                # qpdf prints the details of the error to stderr itself
+                problems.append(report.getvalue().strip() or "the hint tables do not match the file")
+    except (pikepdf.PdfError, RuntimeError) as e:
+        problems.append(f"qpdf: {e}")
+    return problems
+
+
+def get_pdf_info(path: str) -> Dict[str, Any]:
+    """Return a dict describing a PDF file (size, pages, encryption, metadata)"""
+    with fitz.open(path) as doc:
+        info = {
+            "path": os.path.abspath(path),
+            "file_size": os.path.getsize(path),
+            "page_count": len(doc),
+            "encrypted": bool(doc.is_encrypted or doc.needs_pass),
+            "has_outline": bool(doc.get_toc()) if not doc.needs_pass else False,
+            "pdf_version": doc.metadata.get("format", "") if doc.metadata else "",
+            "metadata": {key: value for key, value in (doc.metadata or {}).items()
+                         if value and key != "format"},
+        }
+        
+        if len(doc) > 0 and not doc.needs_pass:
+            first_page = doc[0].rect
+            info["first_page_size"] = (round(first_page.width, 2), round(first_page.height, 2))
+    
+    problems = check_linearization(path, info["page_count"]) if not info["encrypted"] else None
+    info["linearized"] = problems == []
+    if problems:
+        info["linearization_problems"] = problems
+    
+    return info
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import mmap
+import pikepdf
+
+
+# How the engines read their source files
+INPUT_FILE = "file"            # a regular buffered file
+INPUT_MMAP = "mmap"            # memory-mapped, so seeks and reads are not syscalls
+INPUT_READAHEAD = "readahead"  # large sequential reads, for slow network mounts
+INPUT_MODES = (INPUT_FILE, INPUT_MMAP, INPUT_READAHEAD)
+
+# Buffer of read-ahead streams; PyPDF2 seeks back and forth a lot, and
+# most of those seeks then land inside the buffer
+READAHEAD_BUFFER_SIZE = 1024 * 1024
+
+# Opens the raw file under every input stream (swapped by the benchmarks
+# to count system calls)
+_open_raw = io.FileIO
+
+
+def open_input(path, input_mode=INPUT_FILE):
+    """Open a source PDF for reading and return a binary stream.
+    
+    The stream supports read, seek and tell and must be closed by the
+    caller. Empty files cannot be mapped, so they fall back to a regular
+    file in mmap mode.
+    """
+    if input_mode not in INPUT_MODES:
+        raise ValueError(f"Unknown input mode: {input_mode}")
+    
+    if input_mode == INPUT_MMAP:
+        with _open_raw(path) as raw:
+            try:
+                # The mapping stays valid after the file is closed
+                return mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                pass
+    
+    buffer_size = READAHEAD_BUFFER_SIZE if input_mode == INPUT_READAHEAD else io.DEFAULT_BUFFER_SIZE
+    return io.BufferedReader(_open_raw(path), buffer_size)
+
+
+def open_pikepdf(path, input_mode=INPUT_FILE):
+    """Open a source PDF with pikepdf in the given input mode.
+    
+    qpdf does its own file I/O: mmap mode uses its memory-mapped access,
+    and read-ahead mode reads the whole file up front with large
+    sequential reads.
+    """
+    if input_mode not in INPUT_MODES:
+        raise ValueError(f"Unknown input mode: {input_mode}")
+    
+    if input_mode == INPUT_MMAP:
+        return pikepdf.open(path, access_mode=pikepdf.AccessMode.mmap)
+    if input_mode == INPUT_READAHEAD:
+        with open_input(path, INPUT_READAHEAD) as stream:
+            return pikepdf.open(io.BytesIO(stream.read()))
+    return pikepdf.open(path)
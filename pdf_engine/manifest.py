@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import logging
+
+from .index import file_hash
+from .outputs import AtomicOutput
+
+
+# Bump when the manifest layout changes; older manifests are started afresh
+MANIFEST_VERSION = 1
+
+# Name of the split manifest kept in the output directory by default
+SPLIT_MANIFEST_NAME = ".split_manifest.json"
+
+# Name of the manifest kept with the cached segments of an incremental merge
+MERGE_MANIFEST_NAME = "manifest.json"
+
+logger = logging.getLogger(__name__)
+
+
+class _Journal:
+    """Append-only JSON lines file of (key, value) records.
+    
+    Each record is flushed to disk as it is added, so a crash loses at most
+    the record being written; a torn last line is ignored when the journal
+    is loaded. A value of None removes the key. Opening the journal
+    compacts it to one line per live key.
+    """
+    def __init__(self, path, kind):
+        self.path = path
+        self.kind = kind
+        self.entries = self._load()
+        self._rewrite()
+    
+    def _header(self):
+        return {"version": MANIFEST_VERSION, "kind": self.kind}
+    
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return {}
+        except (OSError, UnicodeDecodeError) as e:
+            # A manifest only saves work, so start again rather than fail the job
+            logger.warning("Ignoring unreadable manifest %s: %s", self.path, e)
+            return {}
+        
+        entries = {}
+        for line_number, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn write of the last record
+            if line_number == 0:
+                if record != self._header():
+                    return {}  # another kind of manifest, or an older layout
+            elif record.get("value") is None:
+                entries.pop(record["key"], None)
+            else:
+                entries[record["key"]] = record["value"]
+        return entries
+    
+    def _rewrite(self):
+        lines = [self._header()] + [{"key": key, "value": value} for key, value in self.entries.items()]
+        with AtomicOutput(self.path, fsync=True) as output:
+            output.write("".join(json.dumps(line) + "\n" for line in lines).encode('utf-8'))
+    
+    def put(self, key, value):
+        self.put_many([(key, value)])
+    
+    def put_many(self, records):
+        """Add (key, value) records with a single flush to disk"""
+        records = list(records)
+        if not records:
+            return
+        
+        for key, value in records:
+            if value is None:
+                self.entries.pop(key, None)
+            else:
+                self.entries[key] = value
+        
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps({"key": key, "value": value}) + "\n" for key, value in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def file_signature(path):
+    """Size and modification time of path, compared before hashing it"""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def file_signature_differs(signature, entry):
+    """True if a file_signature() does not match the one recorded in entry"""
+    return signature["size"] != entry["size"] or signature["mtime_ns"] != entry["mtime_ns"]
+
+
+def file_unchanged(path, entry):
+    """True if path still has the contents recorded in entry.
+    
+    entry holds "size", "mtime_ns" and "sha256" as recorded by
+    describe_file(). Matching size and mtime are trusted; a file that was
+    touched or copied is hashed and compared.
+    """
+    try:
+        signature = file_signature(path)
+    except OSError:
+        return False
+    if signature["size"] != entry["size"]:
+        return False
+    if signature["mtime_ns"] == entry["mtime_ns"]:
+        return True
+    return file_hash(path) == entry["sha256"]
+
+
+def describe_file(path):
+    """Signature and SHA-256 of path, as checked by file_unchanged()"""
+    return dict(file_signature(path), sha256=file_hash(path))
+
+
+def default_split_manifest_path(output_dir):
+    return os.path.join(output_dir, SPLIT_MANIFEST_NAME)
+
+
+class SplitManifest:
+    """Checkpoint of a batch split, appended to after every finished input.
+    
+    Records each input with its hash, the split options and the files it
+    produced with their hashes. A rerun of split_pdfs() with the same
+    manifest skips inputs whose source, options and outputs are all
+    unchanged and splits the rest, so an interrupted batch resumes where
+    it stopped. Inputs skipped during a run map to their outputs in resumed.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._journal = _Journal(path, "split")
+        self._entries = self._journal.entries
+        self.resumed = {}
+    
+    def completed_outputs(self, input_path, output_dir, options):
+        """Return the files a finished split of input_path produced, or None.
+        
+        None means the input still has to be split: it is not in the
+        manifest, the source or the options changed, or an output file is
+        missing or differs from what was written.
+        """
+        entry = self._entries.get(os.path.abspath(input_path))
+        if entry is None or entry["options"] != options:
+            return None
+        if entry["output_dir"] != os.path.abspath(output_dir):
+            return None
+        if not file_unchanged(input_path, entry["source"]):
+            return None
+        
+        output_paths = []
+        for name, output in entry["outputs"].items():
+            output_path = os.path.join(output_dir, name)
+            # Outputs are always hashed; a part damaged or replaced since is redone
+            if not os.path.exists(output_path) or file_hash(output_path) != output["sha256"]:
+                return None
+            output_paths.append(output_path)
+        return output_paths
+    
+    def record(self, input_path, output_dir, options, output_paths):
+        """Record a finished split of input_path in the manifest file"""
+        self._journal.put(os.path.abspath(input_path), {
+            "source": describe_file(input_path),
+            "options": options,
+            "output_dir": os.path.abspath(output_dir),
+            "outputs": {os.path.basename(path): {"sha256": file_hash(path)}
+                        for path in output_paths},
+        })
+    
+    def forget(self, input_path):
+        """Drop input_path, e.g. after its split failed"""
+        if os.path.abspath(input_path) in self._entries:
+            self._journal.put(os.path.abspath(input_path), None)
+
+
+class MergeManifest:
+    """Input hashes, cached segments and output layout of an incremental merge.
+    
+    Inputs are recorded with their size, mtime and SHA-256 so that an
+    unchanged input is not read again to hash it. Segments are merged
+    groups of inputs, named by the hashes of those inputs and stored as
+    PDFs next to the manifest. The output layout lists the segments the
+    output was built from, in order, so the next merge can update it.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._journal = _Journal(path, "merge")
+    
+    def input_hashes(self, paths):
+        """SHA-256 of every path, hashing only files that changed since last time"""
+        hashes = []
+        changed = []
+        for path in paths:
+            key = "input:" + os.path.abspath(path)
+            entry = self._journal.entries.get(key)
+            signature = file_signature(path)
+            
+            if entry is None or file_signature_differs(signature, entry):
+                entry = dict(signature, sha256=file_hash(path))
+                changed.append((key, entry))
+            hashes.append(entry["sha256"])
+        
+        self._journal.put_many(changed)
+        return hashes
+    
+    def segment_info(self, key, segment_path):
+        """(page_count, outline_items) of a cached segment, or None if it has to be built"""
+        entry = self._journal.entries.get("segment:" + key)
+        if entry is None:
+            return None
+        try:
+            if file_signature_differs(file_signature(segment_path), entry):
+                return None
+        except OSError:
+            return None
+        return entry["pages"], entry["outline_items"]
+    
+    def record_segment(self, key, segment_path, page_count, outline_items):
+        self._journal.put("segment:" + key, dict(file_signature(segment_path), pages=page_count,
+                                                 outline_items=outline_items))
+    
+    def output_layout(self, output_path):
+        """(segments, base_size) of the last output if it is still as written, else None.
+        
+        segments lists [key, page_count, outline_items] in page order and
+        base_size is the file size after the last full rewrite.
+        """
+        entry = self._journal.entries.get("output")
+        if entry is None or entry["path"] != os.path.abspath(output_path):
+            return None
+        try:
+            if file_signature_differs(file_signature(output_path), entry):
+                return None
+        except OSError:
+            return None
+        return entry["segments"], entry["base_size"]
+    
+    def record_output(self, output_path, segments, base_size):
+        self._journal.put("output", dict(file_signature(output_path), path=os.path.abspath(output_path),
+                                         segments=segments, base_size=base_size))
+    
+    def prune(self, input_paths, segment_keys, segment_dir):
+        """Forget inputs and delete segments that the last merge did not use"""
+        keep = {"output"}
+        keep.update("input:" + os.path.abspath(path) for path in input_paths)
+        keep.update("segment:" + key for key in segment_keys)
+        
+        stale = [key for key in self._journal.entries if key not in keep]
+        for key in stale:
+            if key.startswith("segment:"):
+                try:
+                    os.remove(os.path.join(segment_dir, key[len("segment:"):] + ".pdf"))
+                except OSError:
+                    pass
+        self._journal.put_many((key, None) for key in stale)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+from typing import Callable, Iterable, Optional
+import PyPDF2
+import pikepdf
+
+from .handles import DocumentPool, open_reader
+from .inputs import INPUT_FILE, open_pikepdf
+from .outputs import AtomicOutput, check_compression_level, save_pikepdf, write_pypdf2
+from .dedup import DedupResult, dedupe_pikepdf, dedupe_pypdf2_writer
+
+# Available merge engines
+ENGINE_PYPDF2 = "pypdf2"
+ENGINE_PIKEPDF = "pikepdf"
+MERGE_ENGINES = (ENGINE_PYPDF2, ENGINE_PIKEPDF)
+
+# qpdf reads stream data from the source files when the output is saved, so
+# the pikepdf engine keeps at most this many sources open at a time. Larger
+# merges are written in segments which are then joined.
+PIKEPDF_SEGMENT_SIZE = 256
+
+
+class MergeCancelled(Exception):
+    """Raised when a merge is cancelled through the should_cancel callback"""
+    pass
+
+
+class ProgressWriter:
+    """Writable file wrapper that reports the number of bytes written"""
+    # PDF writers issue many tiny writes, so only report every 256 KB
+    REPORT_INTERVAL = 256 * 1024
+    
+    def __init__(self, file_obj, on_write=None, should_cancel=None):
+        self.file_obj = file_obj
+        self.on_write = on_write
+        self.should_cancel = should_cancel
+        self.bytes_written = 0
+        self._last_reported = 0
+    
+    def write(self, data):
+        written = self.file_obj.write(data)
+        self.bytes_written += len(data)
+        
+        if self.bytes_written - self._last_reported >= self.REPORT_INTERVAL:
+            if self.should_cancel and self.should_cancel():
+                raise MergeCancelled()
+            self._last_reported = self.bytes_written
+            if self.on_write:
+                self.on_write(self.bytes_written)
+        return written
+    
+    def tell(self):
+        return self.file_obj.tell()
+    
+    def seek(self, offset, whence=0):
+        return self.file_obj.seek(offset, whence)
+    
+    def flush(self):
+        self.file_obj.flush()
+    
+    def writable(self):
+        return True
+
+
+def merge_pdfs(pdf_paths: Iterable[str], output_path: str, engine: str = ENGINE_PYPDF2,
+               on_pages: Optional[Callable[[int, int], None]] = None,
+               on_bytes: Optional[Callable[[int], None]] = None,
+               should_cancel: Optional[Callable[[], bool]] = None,
+               pool: Optional[DocumentPool] = None, input_mode: str = INPUT_FILE,
+               fsync: bool = False, on_written: Optional[Callable[[int, float], None]] = None,
+               dedupe: bool = False, on_deduped: Optional[Callable[[DedupResult], None]] = None,
+               compact: bool = False, compression_level: Optional[int] = None,
+               linearize: bool = False) -> int:
+    """Merge the given PDF files into output_path and return the page count.
+    
+    on_pages(pages_done, bytes_read) is called as source pages are appended,
+    on_bytes(bytes_written) while the output is written and
+    on_written(bytes_written, seconds) once it is in place. If
+    should_cancel() returns True the merge stops with MergeCancelled. The
+    output is written to a temporary file and renamed over output_path
+    (see pdf_engine.outputs), so a failed or cancelled merge leaves no
+    partial file; fsync=True flushes it to disk before the rename. The
+    PyPDF2 engine reuses parsed documents from pool (a DocumentPool) when
+    given. input_mode selects how sources are read (see
+    pdf_engine.inputs); a pool reads files in its own mode. With
+    dedupe=True identical streams, such as the fonts and images of
+    documents made from one template, are stored once (see
+    pdf_engine.dedup) and on_deduped(DedupResult) reports what was saved.
+    compact=True writes object streams and a cross-reference stream,
+    optionally recompressed at compression_level (which implies
+    compact), and linearize=True a
+    linearized file for fast first-page display over slow links (see
+    pdf_engine.outputs.save_pikepdf).
+    """
+    if engine not in MERGE_ENGINES:
+        raise ValueError(f"Unknown merge engine: {engine}")
+    check_compression_level(compression_level)
+    
+    if engine == ENGINE_PIKEPDF:
+        return _merge_with_pikepdf(pdf_paths, output_path, on_pages, on_bytes, should_cancel,
+                                   input_mode, fsync, on_written, dedupe, on_deduped, compact,
+                                   compression_level, linearize)
+    return _merge_with_pypdf2(pdf_paths, output_path, on_pages, on_bytes, should_cancel, pool,
+                              input_mode, fsync, on_written, dedupe, on_deduped, compact,
+                              compression_level, linearize)
+
+
+def _check_cancel(should_cancel):
+    if should_cancel and should_cancel():
+        raise MergeCancelled()
+
+
+def _write_output(output_path, write, on_bytes, should_cancel, fsync=False, on_written=None):
+    """Call write(stream) and atomically move the result to output_path"""
+    with AtomicOutput(output_path, fsync) as output:
+        write(ProgressWriter(output, on_bytes, should_cancel))
+    
+    if on_bytes:
+        on_bytes(output.bytes_written)
+    if on_written:
+        on_written(output.bytes_written, output.seconds)
+
+
+class _ProgressPdfWriter(PyPDF2.PdfWriter):
+    """PdfWriter that calls on_page() after each page it adds.
+    
+    PdfWriter.append adds the pages of a source one by one before copying
+    its outline, so this reports progress and checks for cancellation per
+    page rather than per file.
+    """
+    def __init__(self, on_page):
+        super().__init__()
+        self.on_page = on_page
+    
+    def add_page(self, page, excluded_keys=()):
+        page = super().add_page(page, excluded_keys)
+        self.on_page()
+        return page
+
+
+def _merge_with_pypdf2(pdf_paths, output_path, on_pages, on_bytes, should_cancel, pool,
+                       input_mode, fsync, on_written, dedupe=False, on_deduped=None,
+                       compact=False, compression_level=None, linearize=False):
+    """Merge with a PyPDF2.PdfWriter, which keeps every source in memory until write.
+    
+    PdfWriter.append takes the parsed readers as they are (PdfMerger copies
+    and parses every input again), so documents from pool are reused.
+    """
+    bytes_read = 0
+    
+    def on_page():
+        _check_cancel(should_cancel)
+        if on_pages:
+            on_pages(len(writer.pages), bytes_read)
+    
+    writer = _ProgressPdfWriter(on_page)
+    
+    # Add each PDF to the writer, reporting progress in pages
+    for pdf_path in pdf_paths:
+        _check_cancel(should_cancel)
+        
+        # Appending copies the pages and outline into the writer
+        with open_reader(pdf_path, pool, input_mode) as reader:
+            writer.append(reader)
+        
+        bytes_read += os.path.getsize(pdf_path)
+        if on_pages:
+            on_pages(len(writer.pages), bytes_read)
+    
+    _check_cancel(should_cancel)
+    page_count = len(writer.pages)
+    
+    if dedupe:
+        result = dedupe_pypdf2_writer(writer)
+        if on_deduped:
+            on_deduped(result)
+    
+    # Write merged PDF to file, reporting progress in bytes
+    def write(stream):
+        write_pypdf2(writer, stream, compact, compression_level, linearize)
+    
+    _write_output(output_path, write, on_bytes, should_cancel, fsync, on_written)
+    
+    return page_count
+
+
+def _merge_with_pikepdf(pdf_paths, output_path, on_pages, on_bytes, should_cancel, input_mode,
+                        fsync, on_written, dedupe=False, on_deduped=None, compact=False,
+                        compression_level=None, linearize=False):
+    """Merge with pikepdf/qpdf, holding at most one segment of sources open"""
+    pdf_paths = list(pdf_paths)
+    
+    # Small merges go straight to the output file
+    if len(pdf_paths) <= PIKEPDF_SEGMENT_SIZE:
+        return _append_and_save(pdf_paths, output_path, 0, 0, on_pages, on_bytes, should_cancel,
+                                input_mode, fsync, on_written, dedupe, on_deduped, compact,
+                                compression_level, linearize)
+    
+    # Segments are deduplicated as they are written and the join across
+    # them, and the savings of all passes are reported together
+    deduped = []
+    
+    # Large merges are written as intermediate segments next to the output so
+    # that each source can be closed once its segment has been saved
+    segment_dir = tempfile.mkdtemp(prefix="pdf_merge_", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        segment_paths = []
+        pages_done = 0
+        bytes_read = 0
+        
+        for start in range(0, len(pdf_paths), PIKEPDF_SEGMENT_SIZE):
+            batch = pdf_paths[start:start + PIKEPDF_SEGMENT_SIZE]
+            segment_path = os.path.join(segment_dir, f"segment_{len(segment_paths):05d}.pdf")
+            pages_done = _append_and_save(batch, segment_path, pages_done, bytes_read,
+                                          on_pages, None, should_cancel, input_mode,
+                                          dedupe=dedupe, on_deduped=deduped.append)
+            bytes_read += sum(os.path.getsize(path) for path in batch)
+            segment_paths.append(segment_path)
+        
+        # Join the local segments; page progress has already been reported.
+        # Only the output is compacted, the segments are read once more.
+        page_count = _append_and_save(segment_paths, output_path, 0, 0, None, on_bytes,
+                                      should_cancel, INPUT_FILE, fsync, on_written,
+                                      dedupe, deduped.append, compact, compression_level,
+                                      linearize)
+        if dedupe and on_deduped:
+            on_deduped(DedupResult(sum(result.streams_removed for result in deduped),
+                                   sum(result.bytes_saved for result in deduped)))
+        return page_count
+    
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+
+def _append_and_save(pdf_paths, output_path, pages_done, bytes_read, on_pages,
+                     on_bytes, should_cancel, input_mode, fsync=False, on_written=None,
+                     dedupe=False, on_deduped=None, compact=False, compression_level=None,
+                     linearize=False):
+    """Append all pages of pdf_paths to a new PDF, save it and close the sources"""
+    sources = []
+    
+    with pikepdf.new() as output_pdf:
+        try:
+            with output_pdf.open_outline() as output_outline:
+                for pdf_path in pdf_paths:
+                    _check_cancel(should_cancel)
+                    
+                    source = open_pikepdf(pdf_path, input_mode)
+                    sources.append(source)
+                    page_offset = len(output_pdf.pages)
+                    
+                    for page in source.pages:
+                        _check_cancel(should_cancel)
+                        output_pdf.pages.append(page)
+                        pages_done += 1
+                        if on_pages:
+                            on_pages(pages_done, bytes_read)
+                    
+                    _copy_outline(source, output_outline.root, page_offset)
+                    bytes_read += os.path.getsize(pdf_path)
+                    if on_pages:
+                        on_pages(pages_done, bytes_read)
+            
+            _check_cancel(should_cancel)
+            
+            if dedupe:
+                result = dedupe_pikepdf(output_pdf)
+                if on_deduped:
+                    on_deduped(result)
+            
+            def save(stream):
+                save_pikepdf(output_pdf, stream, compact, compression_level, linearize)
+            
+            # qpdf pulls the stream data from the still-open sources here
+            _write_output(output_path, save, on_bytes, should_cancel, fsync, on_written)
+        
+        finally:
+            for source in sources:
+                source.close()
+    
+    return pages_done
+
+
+def _copy_outline(source, target_items, page_offset):
+    """Copy the outline (bookmarks) of source, shifting page targets by page_offset"""
+    page_numbers = {page.obj.objgen: index for index, page in enumerate(source.pages)}
+    
+    try:
+        with source.open_outline() as source_outline:
+            _copy_outline_items(source, source_outline.root, target_items, page_numbers, page_offset)
+    except Exception:
+        # A damaged outline should not prevent the pages from being merged
+        pass
+
+
+def _copy_outline_items(source, items, target_items, page_numbers, page_offset):
+    for item in items:
+        page_index = _outline_page_index(source, item, page_numbers)
+        destination = page_offset + page_index if page_index is not None else None
+        
+        new_item = pikepdf.OutlineItem(item.title, destination)
+        _copy_outline_items(source, item.children, new_item.children, page_numbers, page_offset)
+        target_items.append(new_item)
+
+
+def _outline_page_index(source, item, page_numbers):
+    """Return the 0-based page an outline item points to, or None"""
+    destination = item.destination
+    if destination is None and item.action is not None:
+        if item.action.get('/S') == pikepdf.Name.GoTo:
+            destination = item.action.get('/D')
+    
+    # Named destinations are looked up in the document catalog
+    if isinstance(destination, (pikepdf.Name, pikepdf.String)):
+        destination = _resolve_named_destination(source, destination)
+    
+    if isinstance(destination, pikepdf.Array) and len(destination) > 0:
+        target = destination[0]
+        if isinstance(target, pikepdf.Dictionary):
+            return page_numbers.get(target.objgen)
+    return None
+
+
+def _resolve_named_destination(source, name):
+    try:
+        if isinstance(name, pikepdf.Name):
+            destination = source.Root.Dests[name]
+        else:
+            destination = pikepdf.NameTree(source.Root.Names.Dests)[str(name)]
+    except (AttributeError, KeyError, TypeError):
+        return None
+    
+    if isinstance(destination, pikepdf.Dictionary):
+        destination = destination.get('/D')
+    return destination
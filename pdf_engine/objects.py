@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Helpers for copying parsed PyPDF2 objects between documents."""
+
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+
+def resolve(obj):
+    """The object obj refers to, or obj itself if it is not a reference"""
+    return obj.get_object() if isinstance(obj, IndirectObject) else obj
+
+
+def clone_object(obj, reference):
+    """Copy of a parsed object with every indirect reference passed through reference()"""
+    if isinstance(obj, IndirectObject):
+        return reference(obj)
+    if isinstance(obj, StreamObject):
+        # The raw data is written as read, still encoded with its /Filter
+        clone = obj.__class__()
+        clone._data = obj._data
+        for key, value in dict.items(obj):
+            clone[key] = clone_object(value, reference)
+        return clone
+    if isinstance(obj, DictionaryObject):
+        return DictionaryObject({key: clone_object(value, reference) for key, value in dict.items(obj)})
+    if isinstance(obj, ArrayObject):
+        return ArrayObject(clone_object(value, reference) for value in obj)
+    return obj
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import time
+import uuid
+import threading
+import pikepdf
+
+
+# Buffer between the PDF writers and the file; PyPDF2 writes every object,
+# xref entry and stream separately, often only a few bytes at a time
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+# zlib levels accepted for compact outputs; None keeps qpdf's default level
+# and leaves streams that are already compressed as they are
+COMPRESSION_LEVELS = tuple(range(10))
+
+# qpdf's flate level is process-wide; -1 is zlib's default, which qpdf uses
+# unless it is changed
+_DEFAULT_FLATE_LEVEL = -1
+
+# Held while saving with qpdf, which compresses with the process-wide flate
+# level; pikepdf has no getter, so the level last set is tracked here
+_flate_lock = threading.Lock()
+_flate_level = _DEFAULT_FLATE_LEVEL
+
+
+def megabytes_per_second(byte_count, seconds):
+    """Throughput in MB/s, or 0.0 when no time was measured"""
+    if seconds <= 0:
+        return 0.0
+    return byte_count / (1024 * 1024) / seconds
+
+
+class AtomicOutput:
+    """Buffered binary stream that replaces path only when committed.
+    
+    Data goes to a hidden temporary file in the target directory, so a
+    crash or an error never leaves a truncated PDF at path and an existing
+    file there stays untouched until the new one is complete. commit()
+    renames the temporary file over path; with fsync=True the data and
+    the rename are flushed to disk first. Used as a context manager it
+    commits on success and discards the temporary file on any exception.
+    """
+    def __init__(self, path, fsync=False, buffer_size=OUTPUT_BUFFER_SIZE):
+        self.path = path
+        self.fsync = fsync
+        self.bytes_written = 0
+        self.seconds = 0.0
+        
+        directory, name = os.path.split(os.path.abspath(path))
+        self._directory = directory
+        # Same directory so the rename cannot cross file systems
+        self.temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.part")
+        
+        # 0o666 lets the umask decide the permissions, as open() would
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+        fd = os.open(self.temp_path, flags, 0o666)
+        self.file = io.BufferedWriter(io.FileIO(fd, 'wb'), buffer_size)
+        self._start = time.perf_counter()
+        
+        # PDF writers call write() for every few bytes, so hand them the
+        # buffered file's methods instead of going through a Python wrapper
+        self.write = self.file.write
+        self.tell = self.file.tell
+        self.seek = self.file.seek
+        self.flush = self.file.flush
+    
+    def writable(self):
+        return True
+    
+    @property
+    def mb_per_second(self):
+        return megabytes_per_second(self.bytes_written, self.seconds)
+    
+    def commit(self):
+        """Finish writing and move the file into place at path"""
+        try:
+            self.file.flush()
+            self.bytes_written = os.fstat(self.file.fileno()).st_size
+            if self.fsync:
+                os.fsync(self.file.fileno())
+            self.file.close()
+            os.replace(self.temp_path, self.path)
+        except BaseException:
+            self.discard()
+            raise
+        
+        if self.fsync:
+            _fsync_directory(self._directory)
+        self.seconds = time.perf_counter() - self._start
+    
+    def discard(self):
+        """Close and remove the temporary file, leaving path as it was"""
+        try:
+            self.file.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+
+def check_compression_level(compression_level):
+    """Raise ValueError unless compression_level is None or in COMPRESSION_LEVELS"""
+    if compression_level is not None and compression_level not in COMPRESSION_LEVELS:
+        raise ValueError(f"Compression level must be 0-9, not {compression_level}")
+
+
+def save_pikepdf(pdf, stream, compact=False, compression_level=None, linearize=False):
+    """Save a pikepdf.Pdf to stream, as a compact or linearized file if requested.
+    
+    Compact files pack objects into compressed object streams and use a
+    cross-reference stream instead of a table (PDF 1.5), which is much
+    smaller for documents with many small objects. compression_level
+    (see COMPRESSION_LEVELS) also recompresses every flate stream at that
+    level, trading write time for size. Linearized ("fast web view")
+    files start with the first page and hint tables, so a viewer reading
+    over a slow link can show page 1 before the rest has arrived.
+    A Pdf should only be saved once with linearize=True. A
+    compression_level implies compact, as it does on the command line.
+    
+    Saves from different threads take turns, so that one save's
+    compression level does not leak into another.
+    """
+    global _flate_level
+    check_compression_level(compression_level)
+    options = {"linearize": linearize}
+    if compact or compression_level is not None:
+        options["object_stream_mode"] = pikepdf.ObjectStreamMode.generate
+    
+    with _flate_lock:
+        if compression_level is None:
+            pdf.save(stream, **options)
+            return
+        
+        previous_level = _flate_level
+        pikepdf.settings.set_flate_compression_level(compression_level)
+        _flate_level = compression_level
+        try:
+            pdf.save(stream, recompress_flate=True, **options)
+        finally:
+            pikepdf.settings.set_flate_compression_level(previous_level)
+            _flate_level = previous_level
+
+
+def write_pypdf2(writer, stream, compact=False, compression_level=None, linearize=False):
+    """Write a PyPDF2.PdfWriter to stream, as a compact or linearized file if requested.
+    
+    PyPDF2 can only write plain files with cross-reference tables, so the
+    others are written to memory first and saved again with qpdf (see
+    save_pikepdf).
+    """
+    if not compact and compression_level is None and not linearize:
+        writer.write(stream)
+        return
+    
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    buffer.seek(0)
+    with pikepdf.open(buffer) as pdf:
+        save_pikepdf(pdf, stream, compact, compression_level, linearize)
+
+
+def _fsync_directory(directory):
+    # Makes the rename itself durable; directories cannot be opened on Windows
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Page range expressions such as "1-3, 7-end, -1, odd, 20-10:2".
+
+An expression is a comma-separated list of parts, selected in the order
+given; a page listed twice is selected twice. Each part is one of
+
+    7         a page; "end" is the last page, -1 the last page, -2 the one before
+    3-9       pages 3 to 9; "3..9" is the same and allows "1..-2"
+    9-3       pages 9 down to 3
+    5-  ..5   open ranges: page 5 to the end, the first page to page 5
+    all       every page; "even" and "odd" select the even or odd pages
+
+followed by any number of modifiers, applied from left to right:
+
+    :even :odd    keep the even or odd page numbers
+    :N            keep every Nth page of the part, starting with its first
+    :reverse      reverse the part
+
+so "end-1" and "all:reverse" both reverse the document and "1-20:2" is
+pages 1, 3, ..., 19. Pages beyond the document are left out, so one
+expression can be used for documents of different lengths. An expression
+is compiled once and resolved against a page count to a PageSelection of
+range objects, which takes the same memory for a million pages as for ten.
+"""
+
+import re
+import bisect
+import functools
+import itertools
+
+
+# A page bound: a number, negative from the end, or the last page
+_BOUND = r"(?:-?\d+|end)"
+
+# One part of an expression without its modifiers, with the bounds of a range
+# in "start" and "stop"
+_PART_RE = re.compile(rf"(?P<page>{_BOUND})|(?P<start>{_BOUND})?(?:-|\.\.)(?P<stop>{_BOUND})?",
+                      re.IGNORECASE)
+
+# Parts that select a fixed set of pages, as (start, stop, modifier)
+_KEYWORDS = {"all": ("1", "end", None), "even": ("1", "end", "even"), "odd": ("1", "end", "odd")}
+
+# Modifiers written as words, besides even, odd and a step
+_REVERSE = ("reverse", "rev")
+
+
+class InvalidPageRange(ValueError):
+    """Raised when a page range cannot be parsed or selects no pages of the document"""
+    pass
+
+
+class PageRanges:
+    """A compiled page range expression, independent of any document.
+    
+    Use compile_page_ranges() rather than creating one directly; resolve()
+    turns it into the pages of a document with page_count pages.
+    """
+    def __init__(self, text, parts):
+        self.text = text
+        self._parts = parts  # (start, stop, modifiers) with bounds as in _resolve_bound()
+    
+    def __repr__(self):
+        return f"PageRanges({self.text!r})"
+    
+    def resolve(self, page_count):
+        """Return the PageSelection this expression picks from page_count pages"""
+        intervals = []
+        for start, stop, modifiers in self._parts:
+            interval = _clip(_resolve_bound(start, page_count), _resolve_bound(stop, page_count),
+                             _is_forward(start, stop), page_count)
+            for modifier in modifiers:
+                interval = _apply_modifier(interval, modifier)
+            if interval:
+                intervals.append(interval)
+        return PageSelection(intervals)
+
+
+class PageSelection:
+    """Selected 1-based page numbers, in order, stored as range objects.
+    
+    Behaves as a read-only sequence of page numbers: len(), iteration,
+    indexing and "in" work without expanding the ranges. intervals holds
+    the ranges themselves.
+    """
+    def __init__(self, intervals):
+        self.intervals = tuple(intervals)
+        # Number of pages before each interval, for indexing
+        self._offsets = list(itertools.accumulate((len(interval) for interval in self.intervals),
+                                                  initial=0))
+    
+    def __len__(self):
+        return self._offsets[-1]
+    
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.intervals)
+    
+    def __contains__(self, page_number):
+        return any(page_number in interval for interval in self.intervals)
+    
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("page selection index out of range")
+        i = bisect.bisect_right(self._offsets, index) - 1
+        return self.intervals[i][index - self._offsets[i]]
+    
+    def __eq__(self, other):
+        if isinstance(other, PageSelection):
+            other = list(other)
+        return list(self) == other
+    
+    def __repr__(self):
+        return f"PageSelection({list(self.intervals)!r})"
+
+
+@functools.lru_cache(maxsize=64)
+def compile_page_ranges(text: str) -> PageRanges:
+    """Compile a page range expression into PageRanges.
+    
+    Raises InvalidPageRange naming the first part that is not a valid
+    page, range or modifier. Compiled expressions are cached, so a batch
+    that resolves the same text for every document parses it once.
+    """
+    parts = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue  # "1,2," and "1,,2" are accepted as before
+        
+        range_text, *modifiers = [token.strip().lower() for token in part.split(':')]
+        for modifier in modifiers:
+            _check_modifier(modifier, part)
+        
+        if range_text in _KEYWORDS:
+            start, stop, modifier = _KEYWORDS[range_text]
+            if modifier:
+                modifiers.insert(0, modifier)
+            parts.append((start, stop, tuple(modifiers)))
+            continue
+        
+        match = _PART_RE.fullmatch(range_text)
+        if match is None:
+            raise InvalidPageRange(f"Invalid page range: {part}")
+        if match["page"] is not None:
+            start = stop = match["page"].lower()
+        elif match["start"] is None and match["stop"] is None:
+            raise InvalidPageRange(f"Invalid page range: {part}")
+        else:
+            start = (match["start"] or "1").lower()
+            stop = (match["stop"] or "end").lower()
+        if any(bound != "end" and int(bound) == 0 for bound in (start, stop)):
+            raise InvalidPageRange(f"Invalid page range: {part} (pages are numbered from 1)")
+        parts.append((start, stop, tuple(modifiers)))
+    
+    return PageRanges(text, parts)
+
+
+def parse_page_ranges(range_str: str, max_pages: int) -> PageSelection:
+    """Parse a string of page ranges into the PageSelection of a max_pages document.
+    
+    Pages come in the order given, repeated if listed twice (see the
+    module docstring for the syntax). Pages beyond the document are left
+    out; an expression that cannot be parsed raises InvalidPageRange.
+    """
+    return compile_page_ranges(range_str).resolve(max_pages)
+
+
+def _check_modifier(modifier, part):
+    if modifier in ("even", "odd") or modifier in _REVERSE:
+        return
+    if not modifier.isdecimal() or int(modifier) < 1:
+        raise InvalidPageRange(f"Invalid page range modifier: {part}")
+
+
+def _resolve_bound(bound, page_count):
+    """Page number of a bound; may lie outside 1..page_count"""
+    if bound == "end":
+        return page_count
+    number = int(bound)
+    return page_count + 1 + number if number < 0 else number
+
+
+def _is_forward(start, stop):
+    """True if a range runs towards the end of any document, whatever its length.
+    
+    The direction is taken from the bounds as written: "7-end" runs forward
+    even in a 5-page document, where it selects nothing. Bounds counted
+    from the start come before bounds counted from the end ("end" is -1).
+    """
+    def key(bound):
+        number = -1 if bound == "end" else int(bound)
+        return (number < 0, number)
+    
+    return key(start) <= key(stop)
+
+
+def _clip(start, stop, forward, page_count):
+    """range of pages from start to stop inclusive, in the given direction, within the document"""
+    if forward:
+        return range(max(start, 1), min(stop, page_count) + 1)
+    return range(min(start, page_count), max(stop, 1) - 1, -1)
+
+
+def _apply_modifier(interval, modifier):
+    if modifier in _REVERSE:
+        return interval[::-1]
+    if modifier in ("even", "odd"):
+        remainder = 0 if modifier == "even" else 1
+        # Find the first page of that parity; with an odd step every other
+        # page has it, with an even step all pages or none do
+        for first, page in enumerate(interval[:2]):
+            if page % 2 == remainder:
+                return interval[first::2] if interval.step % 2 else interval[first:]
+        return interval[:0]
+    return interval[::int(modifier)]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+from typing import Optional, Tuple
+import fitz  # PyMuPDF
+
+
+# The viewers rasterize at twice the zoom level for sharper text
+SCREEN_SCALE = 2.0
+
+# Documents kept open by render_page_samples() in each worker process
+WORKER_DOCUMENT_LIMIT = 4
+_worker_documents = {}
+
+
+def open_document(path):
+    """Open a PDF for rendering and return the fitz document"""
+    return fitz.open(path)
+
+
+def render_page(page: fitz.Page, scale: float = 1.0, alpha: bool = False,
+                clip: Optional[Tuple[float, float, float, float]] = None) -> fitz.Pixmap:
+    """Rasterize a fitz page and return the fitz.Pixmap.
+    
+    A scale of 1.0 renders at 72 DPI. clip limits rendering to a rectangle
+    (x0, y0, x1, y1) in page points.
+    """
+    matrix = fitz.Matrix(scale, scale)
+    if clip is not None:
+        clip = fitz.Rect(clip)
+    return page.get_pixmap(matrix=matrix, alpha=alpha, clip=clip)
+
+
+def render_pages_to_png(input_path, output_dir, base_name, page_numbers=None, dpi=150):
+    """Render pages (1-based numbers, default all) of a PDF to PNG files"""
+    generated_files = []
+    
+    with fitz.open(input_path) as doc:
+        if page_numbers is None:
+            page_numbers = range(1, len(doc) + 1)
+        
+        page_format = f"{{:0{len(str(len(doc)))}d}}"  # Format with leading zeros
+        for page_num in page_numbers:
+            pix = render_page(doc[page_num - 1], dpi / 72.0)
+            output_path = os.path.join(output_dir, f"{base_name}_page{page_format.format(page_num)}.png")
+            pix.save(output_path)
+            generated_files.append(output_path)
+    
+    return generated_files
+
+
+def render_page_samples(path, page_index, scale, clip=None):
+    """Render a page (or a clip of it) of a PDF file and return (width, height, stride, samples).
+    
+    Meant to run in a worker process: only plain data crosses the process
+    boundary, and the last few documents stay open between calls.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime)
+    
+    doc = _worker_documents.get(key)
+    if doc is None:
+        if len(_worker_documents) >= WORKER_DOCUMENT_LIMIT:
+            _worker_documents.pop(next(iter(_worker_documents))).close()
+        doc = _worker_documents[key] = fitz.open(path)
+    
+    pix = render_page(doc[page_index], scale, clip=clip)
+    return pix.width, pix.height, pix.stride, pix.samples
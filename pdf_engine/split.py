@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterable, List, Optional
+import PyPDF2
+import pikepdf
+
+from .ranges import InvalidPageRange, parse_page_ranges
+from .extract import count_pages, extract_pages
+from .handles import DocumentPool, open_reader
+from .inputs import INPUT_FILE, open_pikepdf
+from .outputs import AtomicOutput, check_compression_level, save_pikepdf, write_pypdf2
+from .manifest import SplitManifest
+
+# Split modes
+SPLIT_RANGES = "ranges"
+SPLIT_EVERY_N = "every_n"
+SPLIT_INDIVIDUAL = "individual"
+SPLIT_MODES = (SPLIT_RANGES, SPLIT_EVERY_N, SPLIT_INDIVIDUAL)
+
+# Result of split_pdfs(); unpacks like a (success, files, errors) tuple
+SplitResult = namedtuple("SplitResult", ["success_count", "generated_files", "error_messages"])
+
+
+def output_base_name(base_name, input_path, total_files):
+    """Base name for the outputs of one input file in a batch"""
+    # If processing multiple files, use the original filename as part of output
+    if total_files > 1:
+        file_base_name = os.path.splitext(os.path.basename(input_path))[0]
+        return f"{base_name}_{file_base_name}"
+    return base_name
+
+
+def split_pdf(input_path: str, output_dir: str, base_name: str, mode: str, range_text: str = "",
+              pages_per_file: int = 1, pool: Optional[DocumentPool] = None,
+              input_mode: str = INPUT_FILE, fsync: bool = False, compact: bool = False,
+              compression_level: Optional[int] = None, linearize: bool = False) -> List[str]:
+    """Split one PDF file and return the list of files written.
+    
+    Range mode writes the selected pages to <base_name>.pdf, every-N mode
+    writes <base_name>_partNN.pdf files and individual mode writes one
+    <base_name>_pageNN.pdf per page. Ranges and every-N reuse the parsed
+    document from pool (a DocumentPool) when one is given; ranges only
+    read the selected pages (see extract_pages). input_mode
+    selects how the source is read (see pdf_engine.inputs). Each file is
+    written atomically through an AtomicOutput, flushed to disk before it
+    is renamed into place when fsync is True. compact, compression_level
+    and linearize select compact or linearized output files as for
+    merge_pdfs().
+    """
+    if mode not in SPLIT_MODES:
+        raise ValueError(f"Unknown split mode: {mode}")
+    check_compression_level(compression_level)
+    
+    if mode == SPLIT_INDIVIDUAL:
+        return burst_pdf(input_path, output_dir, base_name, input_mode, fsync, compact,
+                         compression_level, linearize)
+    
+    generated_files = []
+    
+    with open_reader(input_path, pool, input_mode) as pdf:
+        if mode == SPLIT_RANGES:
+            page_count = count_pages(pdf)
+            if not range_text:
+                range_text = "all"  # Default to all pages
+            
+            # Pages in the order given, as ranges rather than a list of every number
+            pages = parse_page_ranges(range_text, page_count)
+            if not pages:
+                raise InvalidPageRange(f"Page range {range_text} selects none of the "
+                                       f"{page_count} pages")
+            
+            # Create a single PDF with the selected pages
+            output_path = os.path.join(output_dir, f"{base_name}.pdf")
+            writer = extract_pages(pdf, pages)
+            
+            with AtomicOutput(output_path, fsync) as output_file:
+                write_pypdf2(writer, output_file, compact, compression_level, linearize)
+            
+            generated_files.append(output_path)
+        
+        else:
+            # Split by every N pages, formatting the part number with leading zeros based on total parts
+            page_count = len(pdf.pages)
+            total_parts = (page_count + pages_per_file - 1) // pages_per_file
+            part_format = f"{{:0{len(str(total_parts))}d}}"
+            
+            for part_index, start_page in enumerate(range(0, page_count, pages_per_file)):
+                end_page = min(start_page + pages_per_file, page_count)
+                part_num = part_format.format(part_index + 1)
+                
+                output_path = os.path.join(output_dir, f"{base_name}_part{part_num}.pdf")
+                writer = PyPDF2.PdfWriter()
+                
+                for page_num in range(start_page, end_page):
+                    writer.add_page(pdf.pages[page_num])
+                
+                with AtomicOutput(output_path, fsync) as output_file:
+                    write_pypdf2(writer, output_file, compact, compression_level, linearize)
+                
+                generated_files.append(output_path)
+    
+    return generated_files
+
+
+def burst_pdf(input_path, output_dir, base_name, input_mode=INPUT_FILE, fsync=False, compact=False,
+              compression_level=None, linearize=False):
+    """Write every page of a PDF to its own <base_name>_pageNN.pdf file.
+    
+    The source is parsed once with qpdf. Each page is copied into a new
+    document, and resources the page does not use are dropped. Documents
+    that share one resource dictionary across all pages would otherwise
+    repeat every font and image in every output file.
+    """
+    generated_files = []
+    
+    with open_pikepdf(input_path, input_mode) as source:
+        page_count = len(source.pages)
+        page_format = f"{{:0{len(str(page_count))}d}}"  # Format with leading zeros
+        
+        for page_num, page in enumerate(source.pages):
+            page_str = page_format.format(page_num + 1)
+            output_path = os.path.join(output_dir, f"{base_name}_page{page_str}.pdf")
+            
+            with pikepdf.new() as writer:
+                writer.pages.append(page)
+                writer.pages[0].remove_unreferenced_resources()
+                with AtomicOutput(output_path, fsync) as output_file:
+                    save_pikepdf(writer, output_file, compact, compression_level, linearize)
+            
+            generated_files.append(output_path)
+    
+    return generated_files
+
+
+def _describe_error(file_name, error):
+    """Error message shown for an input file that could not be split"""
+    if isinstance(error, InvalidPageRange):
+        return f"{file_name}: {error}"
+    return f"Error processing {file_name}: {str(error)}"
+
+
+def _job_options(job, options):
+    """Options of a split job that shape its outputs, as recorded in a SplitManifest"""
+    _, _, base_name, mode, range_text, pages_per_file = job
+    return {"base_name": base_name, "mode": mode, "range_text": range_text,
+            "pages_per_file": pages_per_file, "compact": options["compact"],
+            "compression_level": options["compression_level"], "linearize": options["linearize"]}
+
+
+def split_pdfs(input_paths: Iterable[str], output_dir: str, base_name: str, mode: str,
+               range_text: str = "", pages_per_file: int = 1,
+               on_file_done: Optional[Callable[[int, str], None]] = None, workers: int = 1,
+               pool: Optional[DocumentPool] = None, input_mode: str = INPUT_FILE,
+               fsync: bool = False, manifest: Optional[SplitManifest] = None,
+               compact: bool = False, compression_level: Optional[int] = None,
+               linearize: bool = False) -> SplitResult:
+    """Split a batch of PDF files.
+    
+    Returns a SplitResult. Errors in one file are recorded and the remaining
+    files are still processed. on_file_done(files_done, input_path) is
+    called after each input file. With workers > 1 the files are split in
+    parallel worker processes; results are still reported in input order.
+    Files split in this process reuse parsed documents from pool; sources
+    are read in input_mode (see pdf_engine.inputs) and outputs are flushed
+    to disk when fsync is True. With a manifest (a SplitManifest) every
+    finished input is checkpointed, and inputs an earlier run already split
+    are skipped and reported first. compact, compression_level and
+    linearize select compact or linearized output files as for
+    merge_pdfs().
+    """
+    input_paths = list(input_paths)
+    total_files = len(input_paths)
+    
+    # Per input file: list of generated files, or the exception raised
+    results = [None] * total_files
+    jobs = [(input_path, output_dir, output_base_name(base_name, input_path, total_files),
+             mode, range_text, pages_per_file) for input_path in input_paths]
+    options = {"input_mode": input_mode, "fsync": fsync, "compact": compact,
+               "compression_level": compression_level, "linearize": linearize}
+    files_done = 0
+    
+    def finish(i, result):
+        nonlocal files_done
+        results[i] = result
+        files_done += 1
+        
+        if manifest is not None:
+            if isinstance(result, Exception):
+                manifest.forget(input_paths[i])
+            else:
+                manifest.record(input_paths[i], output_dir, _job_options(jobs[i], options), result)
+        if on_file_done:
+            on_file_done(files_done, input_paths[i])
+    
+    # Inputs finished by an earlier run of the same job are not split again
+    pending = []
+    for i, job in enumerate(jobs):
+        resumed = None
+        if manifest is not None:
+            resumed = manifest.completed_outputs(input_paths[i], output_dir, _job_options(job, options))
+        if resumed is None:
+            pending.append(i)
+            continue
+        
+        manifest.resumed[input_paths[i]] = resumed
+        results[i] = resumed
+        files_done += 1
+        if on_file_done:
+            on_file_done(files_done, input_paths[i])
+    
+    if workers > 1 and len(pending) > 1:
+        # Forked workers could inherit locks held by other threads of the
+        # caller (the GUI's ingest threads, the index and the document pool)
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {executor.submit(split_pdf, *jobs[i], **options): i for i in pending}
+            
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                finish(futures[future], result)
+    else:
+        for i in pending:
+            try:
+                result = split_pdf(*jobs[i], pool=pool, **options)
+            except Exception as e:
+                result = e
+            finish(i, result)
+    
+    # Aggregate in input order
+    success_count = 0
+    generated_files = []
+    error_messages = []
+    
+    for input_path, result in zip(input_paths, results):
+        if isinstance(result, Exception):
+            error_messages.append(_describe_error(os.path.basename(input_path), result))
+        else:
+            generated_files.extend(result)
+            success_count += 1
+    
+    return SplitResult(success_count, generated_files, error_messages)
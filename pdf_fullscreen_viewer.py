@@ -7,12 +7,17 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QLabel, QVBoxLayout, QHBoxLay
                            QScrollArea, QFrame, QToolBar, QAction, QGraphicsOpacityEffect,
                            QToolButton, QPushButton, QSpinBox, QComboBox, QSizePolicy,
                            QApplication, QShortcut, QStyle)
-from PyQt5.QtCore import Qt, QSize, QTimer, QPropertyAnimation, QRect, QEasingCurve
+from PyQt5.QtCore import Qt, QSize, QTimer, QPropertyAnimation, QRect, QEasingCurve, pyqtSignal
 from PyQt5.QtGui import QPixmap, QImage, QColor, QFont, QKeySequence, QIcon
-import fitz  # PyMuPDF
-
 # Import common utilities
 from utils import PRIMARY_COLOR, BORDER_COLOR
+from pdf_engine import SCREEN_SCALE, open_document
+from page_renderer import get_cached_page_pixmap, get_page_pixmap, preview_scale, render_pool
+
+# Pages rendered ahead of the viewport in each scroll direction
+PREFETCH_PAGES = 2
+# Rendered pages further than this from the viewport are released
+EVICT_DISTANCE = 6
 
 class FloatingNavBar(QFrame):
     """Floating navigation bar for full-screen mode"""
@@ -197,7 +202,17 @@ class FloatingNavBar(QFrame):
                 child.setGeometry(0, 0, self.width(), self.height())
 
 class ContinuousScrollViewer(QScrollArea):
-    """Custom widget for continuous scrolling through PDF pages"""
+    """Custom widget for continuous scrolling through PDF pages.
+    
+    Every page gets a placeholder frame of its final size, so the scroll
+    range is right from the start; only pages near the viewport hold a
+    rendered pixmap.
+    """
+    # Emitted with the 0-based index when the current page changes
+    page_changed = pyqtSignal(int)
+    # Emitted when the set of pages inside the viewport changes
+    visible_pages_changed = pyqtSignal()
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         
@@ -257,8 +272,12 @@ class ContinuousScrollViewer(QScrollArea):
             }
         """)
         
-        # List to keep track of page labels
+        # Page frames, the labels showing each page, and the indexes of
+        # pages that currently hold a full-resolution or preview pixmap
         self.page_labels = []
+        self.page_images = []
+        self.rendered_pages = set()
+        self.preview_pages = set()
         self.current_page_idx = 0
         
         # Track which pages are visible
@@ -275,14 +294,30 @@ class ContinuousScrollViewer(QScrollArea):
             label.deleteLater()
         
         self.page_labels = []
+        self.page_images = []
+        self.rendered_pages = set()
+        self.preview_pages = set()
         self.visible_pages = set()
         
-    def add_page(self, pixmap, page_idx):
-        """Add a page to the viewer"""
-        # Create a QLabel to display the page
+    def set_page_sizes(self, sizes):
+        """Show one empty placeholder frame per page, sized (width, height) in pixels"""
+        if len(sizes) != len(self.page_labels):
+            self.clear_pages()
+            for page_idx in range(len(sizes)):
+                self.add_placeholder(page_idx)
+        
+        # Existing frames are reused when only the zoom level changed
+        for page_idx, (width, height) in enumerate(sizes):
+            self.clear_page_pixmap(page_idx)
+            self.page_images[page_idx].setFixedSize(width, height)
+        
+        self.visible_pages = set()
+    
+    def add_placeholder(self, page_idx):
+        """Add an empty page frame to the viewer"""
+        # Create a QLabel to display the page once it is rendered
         page_label = QLabel()
         page_label.setAlignment(Qt.AlignCenter)
-        page_label.setPixmap(pixmap)
         page_label.setProperty("page_idx", page_idx)
         
         # Add shadow effect to make the page look like it's floating
@@ -302,6 +337,36 @@ class ContinuousScrollViewer(QScrollArea):
         # Add to container layout
         self.container_layout.addWidget(page_frame)
         self.page_labels.append(page_frame)
+        self.page_images.append(page_label)
+    
+    def set_page_pixmap(self, page_idx, pixmap):
+        """Show a rendered page in its placeholder"""
+        self.page_images[page_idx].setScaledContents(False)
+        self.page_images[page_idx].setPixmap(pixmap)
+        self.rendered_pages.add(page_idx)
+        self.preview_pages.discard(page_idx)
+    
+    def set_page_preview(self, page_idx, pixmap):
+        """Show a low-resolution pass stretched over the page's placeholder"""
+        if page_idx in self.rendered_pages:
+            return
+        self.page_images[page_idx].setScaledContents(True)
+        self.page_images[page_idx].setPixmap(pixmap)
+        self.preview_pages.add(page_idx)
+    
+    def set_page_error(self, page_idx, message):
+        """Show an error in place of a page that could not be rendered"""
+        self.page_images[page_idx].setScaledContents(False)
+        self.page_images[page_idx].setText(message)
+        # Counted as rendered so it is not requested again until it scrolls away
+        self.rendered_pages.add(page_idx)
+        self.preview_pages.discard(page_idx)
+    
+    def clear_page_pixmap(self, page_idx):
+        """Release the rendered pixmap of a page, keeping its placeholder"""
+        self.page_images[page_idx].clear()
+        self.rendered_pages.discard(page_idx)
+        self.preview_pages.discard(page_idx)
     
     def scroll_to_page(self, page_idx):
         """Scroll to make the specified page visible"""
@@ -332,6 +397,12 @@ class ContinuousScrollViewer(QScrollArea):
         if current_visible != self.visible_pages:
             self.visible_pages = current_visible
             self.update_visible_page()
+            self.visible_pages_changed.emit()
+    
+    def resizeEvent(self, event):
+        """Re-check visible pages when the viewport size changes"""
+        super().resizeEvent(event)
+        self.check_visible_pages()
     
     def wheelEvent(self, event):
         """Handle mouse wheel events to detect page changes"""
@@ -350,9 +421,8 @@ class ContinuousScrollViewer(QScrollArea):
             current = min(self.visible_pages)
             if current != self.current_page_idx:
                 self.current_page_idx = current
-                # Call parent's method to update page number in UI
-                if hasattr(self.parent(), 'on_page_visible_changed'):
-                    self.parent().on_page_visible_changed(current)
+                # Let the full-screen viewer update the page number in the UI
+                self.page_changed.emit(current)
     
     def mouseDoubleClickEvent(self, event):
         """Handle double click events to exit fullscreen"""
@@ -380,11 +450,22 @@ class FullScreenPDFViewer(QMainWindow):
         self.nav_bar = None  # Initialize nav_bar attribute
         self.screen_size = QApplication.desktop().screenGeometry()
         
-        # Pre-calculate rendering dimensions to reduce lag
+        # Pre-calculate page dimensions (in points) for the placeholders
+        self.page_sizes = []
         if pdf_document:
-            self.page_sizes = []
             for i in range(self.total_pages):
-                self.page_sizes.append(pdf_document[i].rect.width)
+                rect = pdf_document[i].rect
+                self.page_sizes.append((rect.width, rect.height))
+        
+        # Renders near the viewport are done in small batches from a timer
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.timeout.connect(self.render_pending_pages)
+        
+        # Pages requested from the render workers, by cache key
+        self.pending_pages = {}
+        render_pool().page_ready.connect(self.on_page_ready)
+        render_pool().render_failed.connect(self.on_render_failed)
         
         # Initialize UI
         self.setup_ui()
@@ -411,6 +492,8 @@ class FullScreenPDFViewer(QMainWindow):
         
         # Create continuous scroll viewer
         self.scroll_viewer = ContinuousScrollViewer()
+        self.scroll_viewer.page_changed.connect(self.on_page_visible_changed)
+        self.scroll_viewer.visible_pages_changed.connect(self.schedule_render)
         main_layout.addWidget(self.scroll_viewer)
         
         # Create floating navigation bar
@@ -482,54 +565,128 @@ class FullScreenPDFViewer(QMainWindow):
             self.nav_bar.zoom_combo.setCurrentText("100%")
     
     def render_all_pages(self):
-        """Render all pages for continuous scrolling"""
+        """Lay out placeholders for all pages and render the ones in view"""
         if not self.doc:
             return
         
-        # Clear existing pages
-        self.scroll_viewer.clear_pages()
+        # Placeholders match the pixmap size produced at the current zoom
+        scale = SCREEN_SCALE * self.zoom_level
+        sizes = [(int(width * scale), int(height * scale)) for width, height in self.page_sizes]
+        self.scroll_viewer.set_page_sizes(sizes)
         
-        # Use progressive rendering to minimize lag
-        self.current_render_page = 0
-        self.render_next_page_batch()
+        # Scroll once the layout has positioned the new placeholders
+        QTimer.singleShot(0, self.restore_scroll_position)
+    
+    def restore_scroll_position(self):
+        """Scroll to the current page and render what is now visible"""
+        self.scroll_viewer.scroll_to_page(self.current_page)
+        self.scroll_viewer.check_visible_pages()
+        self.schedule_render()
+    
+    def schedule_render(self):
+        """Render pages near the viewport on the next timer tick"""
+        if not self.render_timer.isActive():
+            self.render_timer.start(10)  # Small delay for UI responsiveness
     
-    def render_next_page_batch(self):
-        """Render a small batch of pages to keep UI responsive"""
-        if not self.doc or self.current_render_page >= self.total_pages:
+    def pages_to_render(self):
+        """Page indexes to keep rendered, visible pages first"""
+        visible = self.scroll_viewer.visible_pages or {self.current_page}
+        first, last = min(visible), max(visible)
+        
+        pages = list(range(first, last + 1))
+        for distance in range(1, PREFETCH_PAGES + 1):
+            pages.extend(page_idx for page_idx in (last + distance, first - distance)
+                         if 0 <= page_idx < self.total_pages)
+        return pages, first, last
+    
+    def render_pending_pages(self):
+        """Request the missing pages near the viewport from the render workers"""
+        if not self.doc or not self.scroll_viewer.page_labels:
             return
         
-        # Render a small batch of pages (3 pages at a time)
-        batch_size = 3
-        end_page = min(self.current_render_page + batch_size, self.total_pages)
-        
-        for page_idx in range(self.current_render_page, end_page):
-            # Get the page
-            page = self.doc[page_idx]
+        pages, first, last = self.pages_to_render()
+        scale = SCREEN_SCALE * self.zoom_level
+        low_scale = preview_scale(scale)
+        pool = render_pool()
+        
+        # Quick low-resolution passes are queued ahead of all full renders
+        previews = {}
+        missing = []
+        rendered = 0
+        for page_idx in pages:
+            if page_idx in self.scroll_viewer.rendered_pages:
+                continue
             
-            # Render with appropriate zoom
-            matrix = fitz.Matrix(2 * self.zoom_level, 2 * self.zoom_level)
-            pix = page.get_pixmap(matrix=matrix, alpha=False)
+            # Pages in the shared cache are shown straight away
+            pixmap = get_cached_page_pixmap(self.doc, page_idx, scale)
+            if pixmap is not None:
+                self.scroll_viewer.set_page_pixmap(page_idx, pixmap)
+                continue
             
-            # Convert to QImage and QPixmap
-            img_data = pix.samples
-            qimg = QImage(img_data, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(qimg)
+            if page_idx not in self.scroll_viewer.preview_pages:
+                preview = get_cached_page_pixmap(self.doc, page_idx, low_scale)
+                if preview is not None:
+                    self.scroll_viewer.set_page_preview(page_idx, preview)
+                else:
+                    key = pool.request(self, self.doc, page_idx, low_scale)
+                    if key is not None:
+                        previews[key] = (page_idx, True)
+            missing.append(page_idx)
             
-            # Add to scroll viewer
-            self.scroll_viewer.add_page(pixmap, page_idx)
-        
-        # Update for next batch
-        self.current_render_page = end_page
+        wanted = dict(previews)
+        for page_idx in missing:
+            key = pool.request(self, self.doc, page_idx, scale)
+            if key is not None:
+                wanted[key] = (page_idx, False)
+                continue
+        
+            # Documents without a file behind them render on this thread,
+            # a small batch (3 pages) per timer tick
+            if rendered >= 3:
+                self.schedule_render()
+                break
+            self.scroll_viewer.set_page_pixmap(page_idx, get_page_pixmap(self.doc, page_idx, scale))
+            rendered += 1
+        
+        # Drop requests for pages that have scrolled away or were rendered
+        # at an earlier zoom level
+        pool.retain(self, wanted)
+        self.pending_pages = wanted
+        
+        # Release pages that have scrolled far out of view
+        for page_idx in list(self.scroll_viewer.rendered_pages | self.scroll_viewer.preview_pages):
+            if page_idx < first - EVICT_DISTANCE or page_idx > last + EVICT_DISTANCE:
+                self.scroll_viewer.clear_page_pixmap(page_idx)
+    
+    def on_page_ready(self, key, pixmap):
+        """Show a page rendered by the worker pool if it is still wanted"""
+        page_idx, is_preview = self.pending_pages.pop(key, (None, False))
+        if page_idx is None or page_idx >= len(self.scroll_viewer.page_images):
+            return
         
-        # If more pages to render, schedule next batch
-        if self.current_render_page < self.total_pages:
-            QTimer.singleShot(10, self.render_next_page_batch)  # Small delay for UI responsiveness
+        if is_preview:
+            self.scroll_viewer.set_page_preview(page_idx, pixmap)
         else:
-            # All pages rendered, ensure we're at the correct position
-            self.scroll_viewer.scroll_to_page(self.current_page)
+            self.scroll_viewer.set_page_pixmap(page_idx, pixmap)
             
-            # Force an update of visible pages after rendering completes
-            QTimer.singleShot(100, self.scroll_viewer.check_visible_pages)
+    def on_render_failed(self, key, message):
+        """Render a page on this thread if the worker pool could not"""
+        page_idx, is_preview = self.pending_pages.pop(key, (None, False))
+        if page_idx is None or is_preview or page_idx >= len(self.scroll_viewer.page_images):
+            return  # a failed preview is replaced by the full render
+        
+        try:
+            pixmap = get_page_pixmap(self.doc, page_idx, SCREEN_SCALE * self.zoom_level)
+        except Exception as e:
+            self.scroll_viewer.set_page_error(page_idx, f"Error rendering page {page_idx + 1}: {e}")
+            return
+        self.scroll_viewer.set_page_pixmap(page_idx, pixmap)
+    
+    def closeEvent(self, event):
+        """Drop outstanding render requests when the viewer closes"""
+        render_pool().cancel_all(self)
+        self.pending_pages = {}
+        super().closeEvent(event)
     
     def reposition_navbar(self):
         """Position the navbar at the bottom center of the screen"""
@@ -755,7 +912,7 @@ if __name__ == "__main__":
     # This is for testing only - normally this would be called from the main viewer
     # Open a test PDF if given as command line argument
     if len(sys.argv) > 1 and os.path.exists(sys.argv[1]):
-        doc = fitz.open(sys.argv[1])
+        doc = open_document(sys.argv[1])
         viewer = FullScreenPDFViewer(pdf_document=doc)
         viewer.show()
         sys.exit(app.exec_())
@@ -6,14 +6,11 @@ import sys
 import tempfile
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QListWidget, QPushButton, 
                             QVBoxLayout, QHBoxLayout, QFileDialog, QLabel, 
-                            QWidget, QMessageBox, QListWidgetItem, QAbstractItemView,
+                            QWidget, QMessageBox, QListWidgetItem, QAbstractItemView, QListView,
                             QGridLayout, QProgressBar, QFrame, QSplitter, QGraphicsDropShadowEffect,
-                            QCheckBox, QComboBox, QGroupBox, QFormLayout)
-from PyQt5.QtCore import Qt, QUrl, QSize, QPropertyAnimation, QEasingCurve
+                            QCheckBox, QComboBox, QGroupBox, QFormLayout, QStyle)
+from PyQt5.QtCore import Qt, QUrl, QSize, QPropertyAnimation, QEasingCurve, QThread, pyqtSignal
 from PyQt5.QtGui import QIcon, QDrag, QPixmap, QPainter, QColor, QFont, QCursor, QLinearGradient, QPalette
-import PyPDF2
-import pikepdf
-from pikepdf import Pdf
 
 # Define color constants
 PRIMARY_COLOR = "#1976D2"
@@ -30,6 +27,66 @@ BORDER_COLOR = "#E0E0E0"
 
 # Import common utilities
 from utils import (HeaderFrame, StyledButton, get_file_size_str, open_file)
+from pdf_engine import (ENGINE_PYPDF2, ENGINE_PIKEPDF, MergeCancelled, merge_pdfs,
+                        default_index, default_pool, megabytes_per_second)
+from file_ingest import IngestWorker, describe_failures
+
+# Item data holding the validation result: None while the file is being
+# checked, "" for a valid PDF, otherwise the error message
+VALIDATION_ROLE = Qt.UserRole + 2
+
+# Merge engines offered in the UI, as (label, engine name)
+MERGE_ENGINE_CHOICES = [
+    ("Standard (PyPDF2)", ENGINE_PYPDF2),
+    ("Low memory (pikepdf, for very large merges)", ENGINE_PIKEPDF),
+]
+
+
+class MergeWorker(QThread):
+    """Background thread that merges PDF files without blocking the UI"""
+    # Pages appended so far, bytes of source files consumed so far
+    pages_merged = pyqtSignal(int, 'qint64')
+    # Bytes of the merged output written so far
+    bytes_written = pyqtSignal('qint64')
+    # Size of the finished output and the seconds taken to write it
+    output_written = pyqtSignal('qint64', float)
+    # Duplicate streams dropped and the bytes that saved
+    deduplicated = pyqtSignal(int, 'qint64')
+    completed = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    
+    def __init__(self, pdf_paths, output_path, engine=ENGINE_PYPDF2, dedupe=False, parent=None):
+        super().__init__(parent)
+        self.pdf_paths = list(pdf_paths)
+        self.output_path = output_path
+        self.engine = engine
+        self.dedupe = dedupe
+        self._cancel_requested = False
+    
+    def cancel(self):
+        """Ask the worker to stop at the next page or write boundary"""
+        self._cancel_requested = True
+    
+    def is_cancel_requested(self):
+        return self._cancel_requested
+    
+    def run(self):
+        try:
+            merge_pdfs(self.pdf_paths, self.output_path, engine=self.engine,
+                       on_pages=self.pages_merged.emit,
+                       on_bytes=self.bytes_written.emit,
+                       should_cancel=self.is_cancel_requested,
+                       pool=default_pool(),
+                       on_written=self.output_written.emit,
+                       dedupe=self.dedupe,
+                       on_deduped=lambda result: self.deduplicated.emit(*result))
+            self.completed.emit(self.output_path)
+        except MergeCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+
 
 class PDFListWidget(QListWidget):
     def __init__(self, parent=None):
@@ -39,6 +96,10 @@ class PDFListWidget(QListWidget):
         self.setDragDropMode(QAbstractItemView.InternalMove)
         self.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.setAlternatingRowColors(True)
+        
+        # Lay out large lists in batches so the window stays responsive
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(200)
         self.setStyleSheet("""
             QListWidget {
                 background-color: #FFFFFF;
@@ -113,14 +174,10 @@ class PDFListWidget(QListWidget):
             event.setDropAction(Qt.CopyAction)
             event.accept()
             
-            pdf_files = []
-            for url in event.mimeData().urls():
-                file_path = url.toLocalFile()
-                if file_path.lower().endswith('.pdf'):
-                    pdf_files.append(file_path)
-            
-            if pdf_files:
-                self.parent().add_pdf_files(pdf_files)
+            # Folders are searched for PDFs by the window
+            paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+            if paths:
+                self.parent().add_pdf_files(paths)
         else:
             super().dropEvent(event)
 
@@ -129,6 +186,15 @@ class PDFMergerWindow(QMainWindow):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_window = parent
+        self.merge_worker = None
+        self.merge_input_bytes = 0
+        self.merge_write_rate = 0.0  # MB/s of the last merged output
+        self.merge_bytes_saved = 0  # bytes deduplication saved in the last merge
+        
+        # Files are listed as they are found and validated in the background
+        self.ingest_workers = []
+        self.pending_validation = {}  # path -> list items waiting for a badge
+        self.ingest_failures = []
         self.initUI()
 
     def initUI(self):
@@ -227,6 +293,72 @@ class PDFMergerWindow(QMainWindow):
         self.pdf_list = PDFListWidget(self)
         self.pdf_list.setMinimumHeight(350)
         main_layout.addWidget(self.pdf_list)
+        
+        # Options container
+        options_container = QFrame()
+        options_container.setStyleSheet("""
+            QFrame {
+                background-color: #FFFFFF;
+                border-radius: 10px;
+                padding: 15px;
+            }
+            QLabel {
+                font-weight: normal;
+                color: #455A64;
+            }
+            QComboBox {
+                border: 1px solid #E0E0E0;
+                border-radius: 4px;
+                padding: 5px;
+                min-height: 25px;
+            }
+            QComboBox:hover {
+                border: 1px solid #1976D2;
+            }
+        """)
+        
+        options_layout = QVBoxLayout(options_container)
+        
+        merge_group = QGroupBox("Merge Options")
+        merge_group.setStyleSheet("""
+            QGroupBox {
+                font-weight: bold;
+                color: #455A64;
+                border: 1px solid #E0E0E0;
+                border-radius: 6px;
+                margin-top: 12px;
+                padding-top: 15px;
+            }
+            QGroupBox::title {
+                subcontrol-origin: margin;
+                left: 10px;
+                padding: 0 5px;
+            }
+        """)
+        merge_form = QFormLayout(merge_group)
+        
+        # Merge engine selection
+        self.engine_combo = QComboBox()
+        for label, engine in MERGE_ENGINE_CHOICES:
+            self.engine_combo.addItem(label, engine)
+        merge_form.addRow("Merge engine:", self.engine_combo)
+        
+        # Documents made from one template embed the same fonts and logos
+        self.dedupe_check = QCheckBox("Store identical fonts and images only once")
+        self.dedupe_check.setToolTip("Makes merges of similar documents much smaller, "
+                                     "at the cost of a slower merge")
+        merge_form.addRow("", self.dedupe_check)
+        
+        options_layout.addWidget(merge_group)
+        
+        # Add shadow to options container
+        shadow = QGraphicsDropShadowEffect()
+        shadow.setBlurRadius(15)
+        shadow.setColor(QColor(SHADOW_COLOR))
+        shadow.setOffset(0, 2)
+        options_container.setGraphicsEffect(shadow)
+        
+        main_layout.addWidget(options_container)
 
         # Progress bar with modern styling
         self.progress_bar = QProgressBar()
@@ -329,6 +461,13 @@ class PDFMergerWindow(QMainWindow):
         self.merge_button.setMinimumWidth(180)
         buttons_layout.addWidget(self.merge_button)
         
+        # Cancel button, only visible while a merge is running
+        self.cancel_button = StyledButton('Cancel', DANGER_COLOR)
+        self.cancel_button.clicked.connect(self.cancel_merge)
+        self.cancel_button.setMinimumWidth(120)
+        self.cancel_button.setVisible(False)
+        buttons_layout.addWidget(self.cancel_button)
+        
         main_layout.addWidget(buttons_container)
         
         # Status bar
@@ -348,33 +487,84 @@ class PDFMergerWindow(QMainWindow):
             self.add_pdf_files(files)
 
     def add_pdf_files(self, file_paths):
+        """List PDFs from files and folders, checking them in the background"""
+        worker = IngestWorker(file_paths, self.check_pdf_file, self)
+        worker.files_found.connect(self.on_files_found)
+        worker.files_checked.connect(self.on_files_checked)
+        worker.finished.connect(self.on_ingest_finished)
+        self.ingest_workers.append(worker)
+        worker.start()
+        self.statusBar().showMessage('Adding files...')
+
+    def check_pdf_file(self, file_path):
+        """Validate a file, trusting the metadata index for files seen before"""
+        # A miss parses the file into the document pool, where the merge
+        # finds it, and indexes it so adding it again costs a lookup
+        default_index().get(file_path, default_pool())
+
+    def on_files_found(self, file_paths):
+        """List a batch of found files; they get a badge once checked"""
+        # Lay the batch out once rather than per item
+        self.pdf_list.setUpdatesEnabled(False)
         for file_path in file_paths:
-            if os.path.isfile(file_path) and file_path.lower().endswith('.pdf'):
-                try:
-                    # Try to open the PDF to validate it
-                    with open(file_path, 'rb') as f:
-                        PyPDF2.PdfReader(f)
+            # Create a nice-looking item for the list
+            item = QListWidgetItem()
+            file_name = os.path.basename(file_path)
+            file_size = get_file_size_str(file_path)
                     
-                    # Create a nice-looking item for the list
-                    item = QListWidgetItem()
-                    file_name = os.path.basename(file_path)
-                    file_size = get_file_size_str(file_path)
+            # Format the text with file name and size
+            item.setText(f"{file_name} ({file_size})")
+            item.setToolTip(f"Path: {file_path}\nSize: {file_size}\nChecking...")
+            item.setData(Qt.UserRole, file_path)
+            item.setData(VALIDATION_ROLE, None)
                     
-                    # Format the text with file name and size
-                    item.setText(f"{file_name} ({file_size})")
+            # Add a small description below the file name
+            item.setData(Qt.DisplayRole + 1, f"Size: {file_size}")
+            
+            self.pdf_list.addItem(item)
+            self.pending_validation.setdefault(file_path, []).append(item)
+        self.pdf_list.setUpdatesEnabled(True)
+        
+        self.statusBar().showMessage(f'Added {self.pdf_list.count()} file(s), checking...')
+        self.update_buttons_state()
+
+    def on_files_checked(self, results):
+        """Show the validation results of listed files as badges"""
+        for file_path, _, error in results:
+            if error:
+                self.ingest_failures.append((file_path, error))
+            
+            for item in self.pending_validation.pop(file_path, []):
+                file_size = get_file_size_str(file_path)
+                item.setData(VALIDATION_ROLE, error)
+                if error:
+                    item.setIcon(self.style().standardIcon(QStyle.SP_MessageBoxCritical))
+                    item.setForeground(QColor(DANGER_COLOR))
+                    item.setToolTip(f"Path: {file_path}\nSize: {file_size}\nNot a valid PDF: {error}")
+                else:
+                    item.setIcon(self.style().standardIcon(QStyle.SP_DialogApplyButton))
                     item.setToolTip(f"Path: {file_path}\nSize: {file_size}")
-                    item.setData(Qt.UserRole, file_path)
                     
-                    # Add a small description below the file name
-                    item.setData(Qt.DisplayRole + 1, f"Size: {file_size}")
+    def on_ingest_finished(self):
+        worker = self.sender()
+        if worker in self.ingest_workers:
+            self.ingest_workers.remove(worker)
+            worker.deleteLater()
+        if self.ingest_workers:
+            return
                     
-                    self.pdf_list.addItem(item)
+        # One summary for everything that failed since the last one
+        failures, self.ingest_failures = self.ingest_failures, []
+        self.statusBar().showMessage(f'{self.pdf_list.count()} file(s) in the list', 3000)
+        if failures:
+            QMessageBox.warning(self, "Invalid PDF",
+                                f"{len(failures)} file(s) are not valid PDFs and are marked "
+                                f"in the list:\n\n{describe_failures(failures)}")
                     
-                    self.statusBar().showMessage(f'Added: {file_name}', 3000)
-                except Exception as e:
-                    QMessageBox.warning(self, "Invalid PDF", f"Could not add {os.path.basename(file_path)}: {str(e)}")
-        
-        self.update_buttons_state()
+    def invalid_items(self):
+        """List items whose file failed validation"""
+        items = (self.pdf_list.item(i) for i in range(self.pdf_list.count()))
+        return [item for item in items if item.data(VALIDATION_ROLE)]
 
     def remove_selected(self):
         selected_items = self.pdf_list.selectedItems()
@@ -435,6 +625,9 @@ class PDFMergerWindow(QMainWindow):
             self.statusBar().showMessage('Moved file down', 2000)
 
     def update_buttons_state(self):
+        if self.merge_worker is not None:
+            return
+        
         has_items = self.pdf_list.count() > 0
         self.merge_button.setEnabled(has_items)
         self.remove_button.setEnabled(has_items)
@@ -446,7 +639,16 @@ class PDFMergerWindow(QMainWindow):
         self.down_button.setEnabled(current_row >= 0 and current_row < self.pdf_list.count() - 1)
 
     def merge_pdfs(self):
-        if self.pdf_list.count() == 0:
+        if self.pdf_list.count() == 0 or self.merge_worker is not None:
+            return
+        
+        invalid_items = self.invalid_items()
+        if invalid_items:
+            names = "\n".join(os.path.basename(item.data(Qt.UserRole)) for item in invalid_items[:10])
+            if len(invalid_items) > 10:
+                names += f"\n... and {len(invalid_items) - 10} more"
+            QMessageBox.warning(self, "Invalid PDF",
+                                f"Remove the files marked as invalid before merging:\n{names}")
             return
         
         # Ask user where to save the merged PDF
@@ -457,105 +659,167 @@ class PDFMergerWindow(QMainWindow):
         if not output_path.lower().endswith('.pdf'):
             output_path += '.pdf'
         
-        # Setup progress
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, self.pdf_list.count())
-        self.progress_bar.setValue(0)
+        pdf_paths = [self.pdf_list.item(i).data(Qt.UserRole) for i in range(self.pdf_list.count())]
         
-        try:
-            # Create PDF merger
-            pdf_merger = PyPDF2.PdfMerger()
+        # Progress is tracked in KB: the first half covers reading the sources,
+        # the second half covers writing the output (estimated as the input size)
+        self.merge_input_bytes = sum(os.path.getsize(path) for path in pdf_paths)
+        self.progress_bar.setRange(0, max(1, 2 * self.merge_input_bytes // 1024))
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.set_merging_state(True)
+        self.statusBar().showMessage('Reading PDF files...')
+        
+        # Run the merge in a background thread so the window stays responsive
+        engine = self.engine_combo.currentData()
+        self.merge_bytes_saved = 0
+        self.merge_worker = MergeWorker(pdf_paths, output_path, engine,
+                                        self.dedupe_check.isChecked(), self)
+        self.merge_worker.pages_merged.connect(self.on_pages_merged)
+        self.merge_worker.bytes_written.connect(self.on_bytes_written)
+        self.merge_worker.output_written.connect(self.on_output_written)
+        self.merge_worker.deduplicated.connect(self.on_deduplicated)
+        self.merge_worker.completed.connect(self.on_merge_completed)
+        self.merge_worker.failed.connect(self.on_merge_failed)
+        self.merge_worker.cancelled.connect(self.on_merge_cancelled)
+        self.merge_worker.finished.connect(self.on_merge_worker_finished)
+        self.merge_worker.start()
             
-            # Add each PDF to the merger
-            for i in range(self.pdf_list.count()):
-                item = self.pdf_list.item(i)
-                pdf_path = item.data(Qt.UserRole)
-                self.statusBar().showMessage(f'Processing: {os.path.basename(pdf_path)}')
+    def cancel_merge(self):
+        """Request cancellation of the running merge"""
+        if self.merge_worker is not None:
+            self.merge_worker.cancel()
+            self.cancel_button.setEnabled(False)
+            self.statusBar().showMessage('Cancelling merge...')
                 
-                with open(pdf_path, 'rb') as pdf_file:
-                    pdf_merger.append(pdf_file)
+    def set_merging_state(self, merging):
+        """Lock the file list and buttons while a merge is running"""
+        self.pdf_list.setEnabled(not merging)
+        self.add_button.setEnabled(not merging)
+        self.remove_button.setEnabled(not merging)
+        self.up_button.setEnabled(not merging)
+        self.down_button.setEnabled(not merging)
+        self.engine_combo.setEnabled(not merging)
+        self.dedupe_check.setEnabled(not merging)
+        self.merge_button.setVisible(not merging)
+        self.cancel_button.setVisible(merging)
+        self.cancel_button.setEnabled(merging)
                 
-                self.progress_bar.setValue(i + 1)
-                QApplication.processEvents()  # Keep UI responsive
+    def on_pages_merged(self, pages_done, bytes_read):
+        self.progress_bar.setValue(bytes_read // 1024)
+        self.statusBar().showMessage(f'Read {pages_done} pages')
             
-            # Write merged PDF to file
-            self.statusBar().showMessage(f'Saving merged PDF to {output_path}')
-            with open(output_path, 'wb') as output_file:
-                pdf_merger.write(output_file)
+    def on_bytes_written(self, bytes_written):
+        # Output can be larger than the inputs, so clamp to the bar maximum
+        value = (self.merge_input_bytes + bytes_written) // 1024
+        self.progress_bar.setValue(min(value, self.progress_bar.maximum()))
+        self.statusBar().showMessage(f'Writing merged PDF: {bytes_written / (1024 * 1024):.1f} MB written')
             
-            self.statusBar().showMessage('PDF files merged successfully!', 5000)
+    def on_output_written(self, bytes_written, seconds):
+        self.merge_write_rate = megabytes_per_second(bytes_written, seconds)
             
-            # Create a more modern success dialog
-            file_size = get_file_size_str(output_path)
+    def on_deduplicated(self, streams_removed, bytes_saved):
+        self.merge_bytes_saved = bytes_saved
             
-            msg_box = QMessageBox(self)
-            msg_box.setWindowTitle("Success")
-            msg_box.setText("PDF files merged successfully!")
-            msg_box.setInformativeText(f"Output file size: {file_size}\nDo you want to open the merged file?")
-            msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
-            msg_box.setDefaultButton(QMessageBox.Yes)
-            msg_box.setStyleSheet("""
-                QMessageBox {
-                    background-color: #FFFFFF;
-                }
-                QLabel {
-                    color: #455A64;
-                    font-size: 14px;
-                }
-                QPushButton {
-                    background-color: #4CAF50;
-                    color: white;
-                    border-radius: 4px;
-                    padding: 6px 12px;
-                    min-width: 80px;
-                }
-                QPushButton:hover {
-                    background-color: #43A047;
-                }
-                QPushButton:pressed {
-                    background-color: #388E3C;
-                }
-            """)
+    def on_merge_worker_finished(self):
+        self.merge_worker.deleteLater()
+        self.merge_worker = None
+        self.progress_bar.setVisible(False)
+        self.set_merging_state(False)
+        self.update_buttons_state()
             
-            if msg_box.exec_() == QMessageBox.Yes:
-                open_file(output_path)
+    def on_merge_cancelled(self):
+        self.statusBar().showMessage('Merge cancelled', 5000)
         
-        except Exception as e:
-            # Create a better error dialog
-            error_box = QMessageBox(self)
-            error_box.setWindowTitle("Error")
-            error_box.setText("Failed to merge PDFs")
-            error_box.setInformativeText(str(e))
-            error_box.setIcon(QMessageBox.Critical)
-            error_box.setStandardButtons(QMessageBox.Ok)
-            error_box.setStyleSheet("""
-                QMessageBox {
-                    background-color: #FFFFFF;
-                }
-                QLabel {
-                    color: #455A64;
-                    font-size: 14px;
-                }
-                QPushButton {
-                    background-color: #F44336;
-                    color: white;
-                    border-radius: 4px;
-                    padding: 6px 12px;
-                    min-width: 80px;
-                }
-                QPushButton:hover {
-                    background-color: #E53935;
-                }
-                QPushButton:pressed {
-                    background-color: #D32F2F;
-                }
-            """)
-            error_box.exec_()
+    def on_merge_completed(self, output_path):
+        self.progress_bar.setValue(self.progress_bar.maximum())
+        self.statusBar().showMessage(
+            f'PDF files merged successfully! (written at {self.merge_write_rate:.1f} MB/s)', 5000)
             
-            self.statusBar().showMessage('Error: Failed to merge PDFs', 5000)
+        # Create a more modern success dialog
+        file_size = get_file_size_str(output_path)
+        saved = ""
+        if self.merge_bytes_saved:
+            saved = f" ({self.merge_bytes_saved / (1024 * 1024):.1f} MB saved by sharing identical fonts and images)"
         
-        finally:
-            self.progress_bar.setVisible(False)
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("Success")
+        msg_box.setText("PDF files merged successfully!")
+        msg_box.setInformativeText(f"Output file size: {file_size}{saved}\nDo you want to open the merged file?")
+        msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        msg_box.setDefaultButton(QMessageBox.Yes)
+        msg_box.setStyleSheet("""
+            QMessageBox {
+                background-color: #FFFFFF;
+            }
+            QLabel {
+                color: #455A64;
+                font-size: 14px;
+            }
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                border-radius: 4px;
+                padding: 6px 12px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background-color: #43A047;
+            }
+            QPushButton:pressed {
+                background-color: #388E3C;
+            }
+        """)
+        
+        if msg_box.exec_() == QMessageBox.Yes:
+            open_file(output_path)
+    
+    def on_merge_failed(self, message):
+        # Create a better error dialog
+        error_box = QMessageBox(self)
+        error_box.setWindowTitle("Error")
+        error_box.setText("Failed to merge PDFs")
+        error_box.setInformativeText(message)
+        error_box.setIcon(QMessageBox.Critical)
+        error_box.setStandardButtons(QMessageBox.Ok)
+        error_box.setStyleSheet("""
+            QMessageBox {
+                background-color: #FFFFFF;
+            }
+            QLabel {
+                color: #455A64;
+                font-size: 14px;
+            }
+            QPushButton {
+                background-color: #F44336;
+                color: white;
+                border-radius: 4px;
+                padding: 6px 12px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background-color: #E53935;
+            }
+            QPushButton:pressed {
+                background-color: #D32F2F;
+            }
+        """)
+        error_box.exec_()
+        
+        self.statusBar().showMessage('Error: Failed to merge PDFs', 5000)
+    
+    def closeEvent(self, event):
+        """Stop a running merge or validation before the window goes away"""
+        if self.merge_worker is not None:
+            self.merge_worker.cancel()
+            self.merge_worker.wait()
+        for worker in self.ingest_workers:
+            worker.requestInterruption()
+            worker.wait()
+        
+        # Release the files kept open for reuse
+        default_pool().close_all()
+        event.accept()
 
 
 if __name__ == "__main__":
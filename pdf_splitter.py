@@ -6,19 +6,51 @@ import sys
 import tempfile
 from PyQt5.QtWidgets import (QMainWindow, QListWidget, QPushButton, 
                             QVBoxLayout, QHBoxLayout, QFileDialog, QLabel, 
-                            QWidget, QMessageBox, QListWidgetItem, QAbstractItemView,
+                            QWidget, QMessageBox, QListWidgetItem, QAbstractItemView, QListView,
                             QProgressBar, QFrame, QGraphicsDropShadowEffect,
                             QCheckBox, QComboBox, QFormLayout, QGroupBox, QApplication,
                             QSpinBox, QRadioButton, QButtonGroup, QLineEdit, QInputDialog)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QColor, QFont, QCursor
-import PyPDF2
 
 # Import common utilities
 from utils import (HeaderFrame, StyledButton, get_file_size_str, open_file,
                   PRIMARY_COLOR, SECONDARY_COLOR, SUCCESS_COLOR, DANGER_COLOR, 
                   WARNING_COLOR, LIGHT_BG_COLOR, DARK_TEXT_COLOR, LIGHT_TEXT_COLOR,
                   SHADOW_COLOR, BORDER_COLOR)
+from pdf_engine import (SPLIT_RANGES, SPLIT_EVERY_N, SPLIT_INDIVIDUAL,
+                        parse_page_ranges, split_pdfs, default_index, default_pool)
+from file_ingest import IngestWorker, describe_failures
+
+
+class SplitWorker(QThread):
+    """Background thread that splits a batch of PDF files without blocking the UI"""
+    # Input files finished so far and the path of the last one
+    file_done = pyqtSignal(int, str)
+    # The SplitResult of the whole batch
+    completed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, input_paths, output_dir, base_name, mode, range_text="", pages_per_file=1,
+                 workers=1, parent=None):
+        super().__init__(parent)
+        self.input_paths = list(input_paths)
+        self.output_dir = output_dir
+        self.base_name = base_name
+        self.mode = mode
+        self.range_text = range_text
+        self.pages_per_file = pages_per_file
+        self.workers = workers
+    
+    def run(self):
+        try:
+            result = split_pdfs(self.input_paths, self.output_dir, self.base_name, self.mode,
+                                range_text=self.range_text, pages_per_file=self.pages_per_file,
+                                on_file_done=self.file_done.emit, workers=self.workers,
+                                pool=default_pool())
+            self.completed.emit(result)
+        except Exception as e:
+            self.failed.emit(str(e))
 
 
 class PDFListWidget(QListWidget):
@@ -29,6 +61,10 @@ class PDFListWidget(QListWidget):
         self.setDragDropMode(QAbstractItemView.InternalMove)
         self.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.setAlternatingRowColors(True)
+        
+        # Lay out large lists in batches so the window stays responsive
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(200)
         self.setStyleSheet("""
             QListWidget {
                 background-color: #FFFFFF;
@@ -103,14 +139,10 @@ class PDFListWidget(QListWidget):
             event.setDropAction(Qt.CopyAction)
             event.accept()
             
-            pdf_files = []
-            for url in event.mimeData().urls():
-                file_path = url.toLocalFile()
-                if file_path.lower().endswith('.pdf'):
-                    pdf_files.append(file_path)
-            
-            if pdf_files:
-                self.parent().add_pdf_files(pdf_files)
+            # Folders are searched for PDFs by the window
+            paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+            if paths:
+                self.parent().add_pdf_files(paths)
         else:
             super().dropEvent(event)
 
@@ -119,6 +151,11 @@ class PDFSplitterWindow(QMainWindow):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_window = parent
+        
+        # Files are checked on a thread pool and listed in batches
+        self.ingest_workers = []
+        self.ingest_failures = []
+        self.split_worker = None
         self.initUI()
 
     def initUI(self):
@@ -288,7 +325,7 @@ class PDFSplitterWindow(QMainWindow):
         self.split_mode_group = QButtonGroup(self)
         
         # Split by ranges
-        self.radio_ranges = QRadioButton("Split by page ranges (e.g., 1-3,5,7-9)")
+        self.radio_ranges = QRadioButton("Split by page ranges (e.g., 1-3,5,7-end)")
         self.radio_ranges.setChecked(True)
         self.split_mode_group.addButton(self.radio_ranges, 1)
         
@@ -308,6 +345,12 @@ class PDFSplitterWindow(QMainWindow):
         self.range_label.setStyleSheet("font-weight: normal;")
         self.range_input = QLineEdit()
         self.range_input.setPlaceholderText("e.g., 1-3,5,7-9")
+        self.range_input.setToolTip(
+            "Pages are written in the order given.\n"
+            "end: last page, -1: last page, -2: the page before it\n"
+            "5-: page 5 to the end, ..5: first page to page 5, 9-3: pages 9 down to 3\n"
+            "all, even, odd: every page, the even or the odd pages\n"
+            "Modifiers: 1-20:2 every 2nd page, 1-10:odd, all:reverse")
         self.range_input.setStyleSheet("""
             border: 1px solid #E0E0E0;
             border-radius: 4px;
@@ -335,6 +378,27 @@ class PDFSplitterWindow(QMainWindow):
         
         split_layout.addWidget(self.radio_individual)
         
+        # Number of worker processes used when splitting several files
+        workers_layout = QHBoxLayout()
+        self.workers_label = QLabel("Files processed in parallel:")
+        self.workers_label.setStyleSheet("font-weight: normal;")
+        self.workers_input = QSpinBox()
+        self.workers_input.setMinimum(1)
+        self.workers_input.setMaximum(max(1, os.cpu_count() or 1))
+        # One by default: that reuses the documents already opened when the
+        # files were added, while worker processes have to parse them again
+        self.workers_input.setValue(1)
+        self.workers_input.setToolTip("1 splits the files one after another, reusing the documents "
+                                      "opened when they were added.\n"
+                                      "More splits that many files at once in separate processes, "
+                                      "which open each file again;\n"
+                                      "this is faster for many large files on a machine with "
+                                      "several CPUs.")
+        workers_layout.addWidget(self.workers_label)
+        workers_layout.addWidget(self.workers_input)
+        workers_layout.addStretch()
+        split_layout.addLayout(workers_layout)
+        
         # Connect radio buttons to enable/disable relevant inputs
         self.radio_ranges.toggled.connect(self.update_input_states)
         self.radio_every_n.toggled.connect(self.update_input_states)
@@ -466,33 +530,61 @@ class PDFSplitterWindow(QMainWindow):
             self.add_pdf_files(files)
 
     def add_pdf_files(self, file_paths):
-        for file_path in file_paths:
-            if os.path.isfile(file_path) and file_path.lower().endswith('.pdf'):
-                try:
-                    # Try to open the PDF to validate it and get page count
-                    with open(file_path, 'rb') as f:
-                        pdf = PyPDF2.PdfReader(f)
-                        page_count = len(pdf.pages)
+        """List PDFs from files and folders once they are checked in the background"""
+        # Page counts come from the metadata index, so files that were seen
+        # before are not parsed again; new files stay parsed in the document
+        # pool for the split
+        index = default_index()
+        pool = default_pool()
+        worker = IngestWorker(file_paths, lambda path: index.get(path, pool)["page_count"], self)
+        worker.files_checked.connect(self.on_files_checked)
+        worker.finished.connect(self.on_ingest_finished)
+        self.ingest_workers.append(worker)
+        worker.start()
+        self.statusBar().showMessage('Adding files...')
                     
-                    # Create a nice-looking item for the list
-                    item = QListWidgetItem()
-                    file_name = os.path.basename(file_path)
-                    file_size = get_file_size_str(file_path)
+    def on_files_checked(self, results):
+        """List a batch of checked files, keeping failures for the summary"""
+        # Lay the batch out once rather than per item
+        self.pdf_list.setUpdatesEnabled(False)
+        for file_path, page_count, error in results:
+            if error:
+                self.ingest_failures.append((file_path, error))
+                continue
                     
-                    # Format the text with file name, size, and page count
-                    item.setText(f"{file_name} ({file_size}, {page_count} pages)")
-                    item.setToolTip(f"Path: {file_path}\nSize: {file_size}\nPages: {page_count}")
-                    item.setData(Qt.UserRole, file_path)
-                    item.setData(Qt.UserRole + 1, page_count)
+            # Create a nice-looking item for the list
+            item = QListWidgetItem()
+            file_name = os.path.basename(file_path)
+            file_size = get_file_size_str(file_path)
                     
-                    self.pdf_list.addItem(item)
+            # Format the text with file name, size, and page count
+            item.setText(f"{file_name} ({file_size}, {page_count} pages)")
+            item.setToolTip(f"Path: {file_path}\nSize: {file_size}\nPages: {page_count}")
+            item.setData(Qt.UserRole, file_path)
+            item.setData(Qt.UserRole + 1, page_count)
                     
-                    self.statusBar().showMessage(f'Added: {file_name}', 3000)
-                except Exception as e:
-                    QMessageBox.warning(self, "Invalid PDF", f"Could not add {os.path.basename(file_path)}: {str(e)}")
+            self.pdf_list.addItem(item)
+        self.pdf_list.setUpdatesEnabled(True)
         
+        self.statusBar().showMessage(f'Added {self.pdf_list.count()} file(s)...')
         self.update_buttons_state()
 
+    def on_ingest_finished(self):
+        worker = self.sender()
+        if worker in self.ingest_workers:
+            self.ingest_workers.remove(worker)
+            worker.deleteLater()
+        if self.ingest_workers:
+            return
+        
+        # One summary for everything that failed since the last one
+        failures, self.ingest_failures = self.ingest_failures, []
+        self.statusBar().showMessage(f'{self.pdf_list.count()} file(s) in the list', 3000)
+        if failures:
+            QMessageBox.warning(self, "Invalid PDF",
+                                f"{len(failures)} file(s) could not be added:\n\n"
+                                f"{describe_failures(failures)}")
+
     def remove_selected(self):
         selected_items = self.pdf_list.selectedItems()
         if not selected_items:
@@ -537,37 +629,23 @@ class PDFSplitterWindow(QMainWindow):
 
     def update_buttons_state(self):
         has_items = self.pdf_list.count() > 0
-        self.split_button.setEnabled(has_items)
+        self.split_button.setEnabled(has_items and self.split_worker is None)
         self.remove_button.setEnabled(has_items and len(self.pdf_list.selectedItems()) > 0)
 
     def parse_page_ranges(self, range_str, max_pages):
-        """Parse a string of page ranges into a list of page numbers"""
-        pages = []
-        ranges = range_str.split(',')
-        
-        for r in ranges:
-            r = r.strip()
-            if '-' in r:
-                try:
-                    start, end = map(int, r.split('-'))
-                    if start < 1 or end > max_pages or start > end:
-                        continue
-                    pages.extend(range(start, end + 1))
-                except ValueError:
-                    continue
-            else:
-                try:
-                    page = int(r)
-                    if 1 <= page <= max_pages:
-                        pages.append(page)
-                except ValueError:
-                    continue
-        
-        # Remove duplicates and sort
-        return sorted(list(set(pages)))
+        """Parse a string of page ranges into the selected page numbers, in order"""
+        return parse_page_ranges(range_str, max_pages)
+        
+    def selected_split_mode(self):
+        """Return the split mode for the checked radio button"""
+        if self.radio_ranges.isChecked():
+            return SPLIT_RANGES
+        elif self.radio_every_n.isChecked():
+            return SPLIT_EVERY_N
+        return SPLIT_INDIVIDUAL
 
     def split_pdfs(self):
-        if self.pdf_list.count() == 0:
+        if self.pdf_list.count() == 0 or self.split_worker is not None:
             return
         
         # Get output directory and base filename
@@ -610,161 +688,99 @@ class PDFSplitterWindow(QMainWindow):
         
         self.statusBar().showMessage('Splitting PDFs...')
         
-        success_count = 0
-        error_messages = []
-        generated_files = []
-        
-        try:
-            for i in range(total_files):
-                item = self.pdf_list.item(i)
-                input_path = item.data(Qt.UserRole)
-                page_count = item.data(Qt.UserRole + 1)
-                file_name = os.path.basename(input_path)
-                file_base_name = os.path.splitext(file_name)[0]
+        input_paths = [self.pdf_list.item(i).data(Qt.UserRole) for i in range(total_files)]
+        
+        # Split on a worker thread so the window stays responsive
+        self.split_output_dir = output_dir
+        self.split_worker = SplitWorker(
+            input_paths, output_dir, base_name, self.selected_split_mode(),
+            range_text=self.range_input.text().strip(),
+            pages_per_file=self.n_pages_input.value(),
+            workers=self.workers_input.value(), parent=self)
+        self.split_worker.file_done.connect(self.on_file_done)
+        self.split_worker.completed.connect(self.on_split_completed)
+        self.split_worker.failed.connect(self.on_split_failed)
+        self.split_worker.finished.connect(self.on_split_worker_finished)
+        self.split_button.setEnabled(False)
+        self.split_worker.start()
                 
-                # If processing multiple files, use the original filename as part of output
-                if total_files > 1:
-                    current_base_name = f"{base_name}_{file_base_name}"
-                else:
-                    current_base_name = base_name
+    def on_file_done(self, files_done, input_path):
+        self.statusBar().showMessage(f'Processed: {os.path.basename(input_path)}')
+        self.progress_bar.setValue(files_done)
                 
-                self.statusBar().showMessage(f'Processing: {file_name}')
+    def on_split_completed(self, result):
+        success_count, generated_files, error_messages = result
+        output_dir = self.split_output_dir
                 
-                try:
-                    # Open the PDF file
-                    with open(input_path, 'rb') as f:
-                        pdf = PyPDF2.PdfReader(f)
+        # Show success message
+        num_files_generated = len(generated_files)
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("Split Complete")
                         
-                        # Get pages based on split mode
-                        if self.radio_ranges.isChecked():
-                            # Split by ranges
-                            range_text = self.range_input.text().strip()
-                            if not range_text:
-                                range_text = f"1-{page_count}"  # Default to all pages
-                            
-                            pages = self.parse_page_ranges(range_text, page_count)
-                            
-                            if not pages:
-                                error_messages.append(f"Invalid page range for {file_name}")
-                                continue
-                            
-                            # Create a single PDF with the selected pages
-                            output_path = os.path.join(output_dir, f"{current_base_name}.pdf")
-                            writer = PyPDF2.PdfWriter()
+        if success_count > 0:
+            msg_box.setText(f"Successfully split {success_count} PDFs into {num_files_generated} files!")
+            if error_messages:
+                msg_box.setInformativeText(f"There were {len(error_messages)} errors. See details for more information.\n\nWould you like to open the output folder?")
+            else:
+                msg_box.setInformativeText(f"Files saved to: {output_dir}\n\nWould you like to open the output folder?")
+        else:
+            msg_box.setText("Failed to split any files.")
+            msg_box.setInformativeText("Check the details for error information.")
                             
-                            for page_num in pages:
-                                writer.add_page(pdf.pages[page_num - 1])  # PyPDF2 uses 0-based indexing
+        if error_messages:
+            msg_box.setDetailedText("\n".join(error_messages))
                             
-                            with open(output_path, 'wb') as output_file:
-                                writer.write(output_file)
+        msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        msg_box.setDefaultButton(QMessageBox.Yes)
+        msg_box.setStyleSheet("""
+            QMessageBox {
+                background-color: #FFFFFF;
+            }
+            QLabel {
+                color: #455A64;
+                font-size: 14px;
+            }
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                border-radius: 4px;
+                padding: 6px 12px;
+                min-width: 80px;
+            }
+            QPushButton:hover {
+                background-color: #43A047;
+            }
+            QPushButton:pressed {
+                background-color: #388E3C;
+            }
+        """)
                             
-                            generated_files.append(output_path)
-                            success_count += 1
+        if msg_box.exec_() == QMessageBox.Yes and success_count > 0:
+            open_file(output_dir)
                             
-                        elif self.radio_every_n.isChecked():
-                            # Split by every N pages
-                            n_pages = self.n_pages_input.value()
+        self.statusBar().showMessage(f'Split complete: {success_count} PDFs into {num_files_generated} files', 5000)
                             
-                            file_count = 0
-                            for start_page in range(0, page_count, n_pages):
-                                end_page = min(start_page + n_pages, page_count)
-                                file_count += 1
-                                
-                                # Format part number with leading zeros based on total parts
-                                total_parts = (page_count + n_pages - 1) // n_pages
-                                part_format = f"{{:0{len(str(total_parts))}d}}"
-                                part_num = part_format.format(file_count)
-                                
-                                output_path = os.path.join(output_dir, f"{current_base_name}_part{part_num}.pdf")
-                                writer = PyPDF2.PdfWriter()
-                                
-                                for page_num in range(start_page, end_page):
-                                    writer.add_page(pdf.pages[page_num])
-                                
-                                with open(output_path, 'wb') as output_file:
-                                    writer.write(output_file)
-                                
-                                generated_files.append(output_path)
+    def on_split_failed(self, message):
+        QMessageBox.critical(self, "Error", f"An error occurred while splitting PDFs: {message}")
+        self.statusBar().showMessage('Error: Failed to split PDFs', 5000)
                             
-                            success_count += 1
-                                
-                        else:  # self.radio_individual.isChecked()
-                            # Split into individual pages
-                            page_format = f"{{:0{len(str(page_count))}d}}"  # Format with leading zeros
+    def on_split_worker_finished(self):
+        self.split_worker.deleteLater()
+        self.split_worker = None
+        self.progress_bar.setVisible(False)
+        self.update_buttons_state()
                             
-                            for page_num in range(page_count):
-                                page_str = page_format.format(page_num + 1)
-                                output_path = os.path.join(output_dir, f"{current_base_name}_page{page_str}.pdf")
-                                writer = PyPDF2.PdfWriter()
-                                writer.add_page(pdf.pages[page_num])
-                                
-                                with open(output_path, 'wb') as output_file:
-                                    writer.write(output_file)
-                                
-                                generated_files.append(output_path)
+    def closeEvent(self, event):
+        """Stop adding files and finish a running split before the window goes away"""
+        if self.split_worker is not None:
+            self.split_worker.wait()
+        for worker in self.ingest_workers:
+            worker.requestInterruption()
+            worker.wait()
                             
-                            success_count += 1
-                    
-                except Exception as e:
-                    error_messages.append(f"Error processing {file_name}: {str(e)}")
-                
-                self.progress_bar.setValue(i + 1)
-                QApplication.processEvents()  # Keep UI responsive
-            
-            # Show success message
-            msg_box = QMessageBox(self)
-            msg_box.setWindowTitle("Split Complete")
-            
-            if success_count > 0:
-                num_files_generated = len(generated_files)
-                msg_box.setText(f"Successfully split {success_count} PDFs into {num_files_generated} files!")
-                if error_messages:
-                    msg_box.setInformativeText(f"There were {len(error_messages)} errors. See details for more information.\n\nWould you like to open the output folder?")
-                else:
-                    msg_box.setInformativeText(f"Files saved to: {output_dir}\n\nWould you like to open the output folder?")
-            else:
-                msg_box.setText("Failed to split any files.")
-                msg_box.setInformativeText("Check the details for error information.")
-                
-            if error_messages:
-                msg_box.setDetailedText("\n".join(error_messages))
-                
-            msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
-            msg_box.setDefaultButton(QMessageBox.Yes)
-            msg_box.setStyleSheet("""
-                QMessageBox {
-                    background-color: #FFFFFF;
-                }
-                QLabel {
-                    color: #455A64;
-                    font-size: 14px;
-                }
-                QPushButton {
-                    background-color: #4CAF50;
-                    color: white;
-                    border-radius: 4px;
-                    padding: 6px 12px;
-                    min-width: 80px;
-                }
-                QPushButton:hover {
-                    background-color: #43A047;
-                }
-                QPushButton:pressed {
-                    background-color: #388E3C;
-                }
-            """)
-            
-            if msg_box.exec_() == QMessageBox.Yes and success_count > 0:
-                open_file(output_dir)
-                
-            self.statusBar().showMessage(f'Split complete: {success_count} PDFs into {num_files_generated} files', 5000)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An error occurred while splitting PDFs: {str(e)}")
-            self.statusBar().showMessage('Error: Failed to split PDFs', 5000)
-            
-        finally:
-            self.progress_bar.setVisible(False)
+        # Release the files kept open for reuse
+        default_pool().close_all()
+        event.accept()
 
 
 if __name__ == "__main__":
@@ -10,20 +10,132 @@ from PyQt5.QtWidgets import (QMainWindow, QPushButton, QVBoxLayout, QHBoxLayout,
                             QLabel, QWidget, QFileDialog, QScrollArea, QFrame, 
                             QGraphicsDropShadowEffect, QToolBar, QAction, QSpinBox,
                             QComboBox, QMessageBox, QSplitter, QApplication, QSizePolicy, QShortcut)
-from PyQt5.QtCore import Qt, QUrl, QSize, QBuffer, QTimer
-from PyQt5.QtGui import QColor, QFont, QCursor, QPixmap, QImage
+from PyQt5.QtCore import Qt, QUrl, QSize, QBuffer, QTimer, QRect, QRectF
+from PyQt5.QtGui import QColor, QFont, QCursor, QPixmap, QImage, QPainter
 from PyQt5.QtPrintSupport import QPrinter, QPrintDialog
-import fitz  # PyMuPDF
-
 # Import common utilities
 from utils import (HeaderFrame, StyledButton, open_file, 
                   PRIMARY_COLOR, SECONDARY_COLOR, SUCCESS_COLOR, DANGER_COLOR,
                   WARNING_COLOR, LIGHT_BG_COLOR, DARK_TEXT_COLOR, LIGHT_TEXT_COLOR,
                   SHADOW_COLOR, BORDER_COLOR)
+from pdf_engine import SCREEN_SCALE, open_document
+from page_renderer import (get_cached_page_pixmap, get_page_pixmap, page_pixel_size,
+                           preview_scale, needs_tiling, overview_scale, tile_rect,
+                           tiles_in_rect, page_cache, page_cache_key, render_pool)
 
 # Import the full-screen viewer
 from pdf_fullscreen_viewer import FullScreenPDFViewer
 
+class TiledPageWidget(QWidget):
+    """Shows a page too large for one pixmap as tiles rendered on demand.
+    
+    Only tiles overlapping the visible area are requested, and they live in
+    the shared page cache, so memory follows the viewport size rather than
+    the page area at the current zoom.
+    """
+    def __init__(self, doc, page_idx, scale, parent=None):
+        super().__init__(parent)
+        self.doc = doc
+        self.page_idx = page_idx
+        self.scale = scale
+        self.page_size = page_pixel_size(doc, page_idx, scale)
+        self.setFixedSize(*self.page_size)
+        
+        # Tile keys extend the page's key, worked out once for painting
+        self.page_key = page_cache_key(doc, page_idx, scale)
+        
+        # Tiles requested from the render workers, by cache key
+        self.pending_tiles = {}
+        render_pool().page_ready.connect(self.on_page_ready)
+        render_pool().render_failed.connect(self.on_render_failed)
+        
+        # A small render of the whole page stands in for missing tiles
+        self.overview_scale = overview_scale(doc, page_idx, scale)
+        self.overview = get_cached_page_pixmap(doc, page_idx, self.overview_scale)
+        self.overview_key = None
+        if self.overview is None:
+            self.overview_key = render_pool().request(self, doc, page_idx, self.overview_scale)
+    
+    def release(self):
+        """Drop outstanding tile requests before the widget is discarded"""
+        render_pool().cancel_all(self)
+        render_pool().page_ready.disconnect(self.on_page_ready)
+        render_pool().render_failed.disconnect(self.on_render_failed)
+        self.pending_tiles = {}
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        exposed = event.rect()
+        painter.fillRect(exposed, Qt.white)
+        
+        for tile in tiles_in_rect(exposed.x(), exposed.y(), exposed.width(), exposed.height(),
+                                  self.page_size):
+            x, y, width, height = tile_rect(tile, self.page_size)
+            pixmap = page_cache.get(self.page_key + (tile,))
+            if pixmap is not None:
+                painter.drawPixmap(x, y, pixmap)
+            elif self.overview is not None:
+                ratio = self.overview_scale / self.scale
+                painter.drawPixmap(QRectF(x, y, width, height), self.overview,
+                                   QRectF(x * ratio, y * ratio, width * ratio, height * ratio))
+        painter.end()
+        
+        self.request_visible_tiles()
+    
+    def request_visible_tiles(self):
+        """Queue the missing tiles in view and drop requests for the rest"""
+        visible = self.visibleRegion().boundingRect()
+        pool = render_pool()
+        
+        wanted = {}
+        if not visible.isEmpty():
+            for tile in tiles_in_rect(visible.x(), visible.y(), visible.width(), visible.height(),
+                                      self.page_size):
+                if self.page_key + (tile,) not in page_cache:
+                    key = pool.request(self, self.doc, self.page_idx, self.scale, tile)
+                    if key is not None:
+                        wanted[key] = tile
+        
+        if self.overview_key is not None:
+            wanted[self.overview_key] = None
+        pool.retain(self, wanted)
+        self.pending_tiles = wanted
+    
+    def on_page_ready(self, key, pixmap):
+        """Paint a tile or the overview once the render workers deliver it"""
+        if key == self.overview_key:
+            self.overview = pixmap
+            self.overview_key = None
+            self.update()
+        elif key in self.pending_tiles:
+            x, y, width, height = tile_rect(self.pending_tiles.pop(key), self.page_size)
+            self.update(QRect(x, y, width, height))
+    
+    def on_render_failed(self, key, message):
+        """Forget a failed tile; it is requested again when it is next painted"""
+        if key == self.overview_key:
+            self.overview_key = None
+        self.pending_tiles.pop(key, None)
+
+
+class PreviewPageWidget(QWidget):
+    """Shows a low-resolution pass at the page's full size until the full render arrives.
+    
+    The pixmap is stretched while painting, so no full-size copy of it is
+    made on the GUI thread.
+    """
+    def __init__(self, pixmap, page_size, parent=None):
+        super().__init__(parent)
+        self.pixmap = pixmap
+        self.setFixedSize(*page_size)
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.drawPixmap(self.rect(), self.pixmap)
+        painter.end()
+
+
 class PDFImageView(QScrollArea):
     """Custom widget to display PDF pages as images with scrolling"""
     def __init__(self, parent=None):
@@ -86,11 +198,39 @@ class PDFImageView(QScrollArea):
     
     def display_pdf_page(self, pixmap):
         """Display a PDF page using a QPixmap"""
+        self.show_page_widget(self.image_label)
         self.image_label.setPixmap(pixmap)
         self.image_label.adjustSize()
 
+    def display_preview(self, pixmap, page_size):
+        """Display a low-resolution pass stretched to page_size (width, height) in pixels"""
+        self.image_label.clear()
+        self.show_page_widget(PreviewPageWidget(pixmap, page_size))
+    
+    def display_tiled_page(self, doc, page_idx, scale):
+        """Display a page too large for one pixmap as tiles of the visible area"""
+        self.image_label.clear()
+        self.show_page_widget(TiledPageWidget(doc, page_idx, scale))
+    
+    def release_tiled_page(self):
+        """Discard a tiled page, e.g. before its document is closed"""
+        self.show_page_widget(self.image_label)
+    
+    def show_page_widget(self, widget):
+        """Put widget in the scroll area, keeping the image label for reuse"""
+        if self.widget() is widget:
+            return
+        
+        previous = self.takeWidget()
+        if isinstance(previous, TiledPageWidget):
+            previous.release()
+        if previous is not None and previous is not self.image_label:
+            previous.deleteLater()
+        self.setWidget(widget)
+    
     def set_placeholder(self, message="No PDF file loaded"):
         """Show a placeholder message when no PDF is loaded"""
+        self.show_page_widget(self.image_label)
         self.image_label.clear()
         self.image_label.setText(message)
         self.image_label.setStyleSheet("""
@@ -127,7 +267,13 @@ class PDFViewerWindow(QMainWindow):
         self.total_pages = 0
         self.doc = None
         self.fullscreen_viewer = None
+        self.pending_render_key = None
+        self.pending_preview_key = None
         self.initUI()
+        
+        # Pages are rasterized in worker processes so the window stays responsive
+        render_pool().page_ready.connect(self.on_page_ready)
+        render_pool().render_failed.connect(self.on_render_failed)
 
     def initUI(self):
         self.setWindowTitle('PDF Viewer - Ultimate PDF Tools')
@@ -397,6 +543,11 @@ class PDFViewerWindow(QMainWindow):
 
     def close_current_document(self):
         """Close the current document and clean up resources"""
+        render_pool().cancel_all(self)
+        self.pending_render_key = None
+        self.pending_preview_key = None
+        self.pdf_view.release_tiled_page()
+        
         if self.doc:
             self.doc.close()
             self.doc = None
@@ -425,7 +576,7 @@ class PDFViewerWindow(QMainWindow):
             self.temp_dir = tempfile.mkdtemp(prefix="pdf_viewer_")
             
             # Open the PDF with PyMuPDF
-            self.doc = fitz.open(file_path)
+            self.doc = open_document(file_path)
             self.total_pages = len(self.doc)
             
             if self.total_pages == 0:
@@ -480,32 +631,93 @@ class PDFViewerWindow(QMainWindow):
             return
         
         try:
-            # Get the current page
-            page = self.doc[self.current_page]
-            
-            # Render page to an image with zoom factor
-            matrix = fitz.Matrix(2 * self.zoom_level, 2 * self.zoom_level)  # Scale factor for better quality
-            pix = page.get_pixmap(matrix=matrix, alpha=False)
-            
-            # Convert PyMuPDF pixmap to QImage
-            img_data = pix.samples
-            qimg = QImage(img_data, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
-            
-            # Convert QImage to QPixmap for display
-            pixmap = QPixmap.fromImage(qimg)
-            
-            # Display the pixmap in our custom viewer
-            self.pdf_view.display_pdf_page(pixmap)
+            scale = SCREEN_SCALE * self.zoom_level
             
             # Update page navigation controls
             self.prev_action.setEnabled(self.current_page > 0)
             self.next_action.setEnabled(self.current_page < self.total_pages - 1)
             
-            # Update status bar
-            self.statusBar().showMessage(f'Page {self.current_page + 1} of {self.total_pages}')
+            # Very large renders are split into tiles of the visible area
+            if needs_tiling(self.doc, self.current_page, scale):
+                render_pool().cancel_all(self)
+                self.pending_render_key = None
+                self.pending_preview_key = None
+                self.pdf_view.display_tiled_page(self.doc, self.current_page, scale)
+                self.statusBar().showMessage(f'Page {self.current_page + 1} of {self.total_pages}')
+                return
+            
+            # Show a cached render straight away
+            pixmap = get_cached_page_pixmap(self.doc, self.current_page, scale)
+            if pixmap is None:
+                # Otherwise ask the workers for a quick low-resolution pass
+                # followed by the full render; this supersedes any page
+                # requested earlier, so holding down a key only renders the
+                # page it stops on
+                pool = render_pool()
+                low_scale = preview_scale(scale)
+                preview = get_cached_page_pixmap(self.doc, self.current_page, low_scale)
+                preview_key = None
+                if preview is None:
+                    preview_key = pool.request(self, self.doc, self.current_page, low_scale)
+                key = pool.request(self, self.doc, self.current_page, scale)
+                pool.retain(self, [k for k in (preview_key, key) if k])
+                self.pending_preview_key = preview_key
+                self.pending_render_key = key
+                
+                if key is not None:
+                    if preview is not None:
+                        self.show_preview(preview)
+                    self.statusBar().showMessage(f'Rendering page {self.current_page + 1} of {self.total_pages}...')
+                    return
+                
+                # Documents without a file behind them render on this thread
+                pixmap = get_page_pixmap(self.doc, self.current_page, scale)
+            
+            self.show_rendered_page(pixmap)
             
         except Exception as e:
             QMessageBox.warning(self, "Rendering Error", f"Error rendering page: {str(e)}")
+    
+    def show_rendered_page(self, pixmap):
+        """Display a rendered page and report the position in the status bar"""
+        self.pending_render_key = None
+        self.pending_preview_key = None
+        
+        # Display the pixmap in our custom viewer
+        self.pdf_view.display_pdf_page(pixmap)
+        
+        # Update status bar
+        self.statusBar().showMessage(f'Page {self.current_page + 1} of {self.total_pages}')
+    
+    def show_preview(self, pixmap):
+        """Display a low-resolution pass stretched to the page's full size"""
+        self.pdf_view.display_preview(
+            pixmap, page_pixel_size(self.doc, self.current_page, SCREEN_SCALE * self.zoom_level))
+    
+    def on_page_ready(self, key, pixmap):
+        """Show a page rendered by the worker pool if it is still the one wanted"""
+        if key == self.pending_render_key:
+            self.show_rendered_page(pixmap)
+        elif key == self.pending_preview_key:
+            self.pending_preview_key = None
+            self.show_preview(pixmap)
+    
+    def on_render_failed(self, key, message):
+        """Render the current page on this thread if the worker pool could not"""
+        if key == self.pending_preview_key:
+            self.pending_preview_key = None  # the full render is still on its way
+        elif key == self.pending_render_key:
+            render_pool().cancel_all(self)
+            try:
+                pixmap = get_page_pixmap(self.doc, self.current_page,
+                                         SCREEN_SCALE * self.zoom_level)
+            except Exception as e:
+                self.pending_render_key = None
+                self.pending_preview_key = None
+                self.statusBar().showMessage(f'Could not render page {self.current_page + 1}')
+                QMessageBox.warning(self, "Rendering Error", f"Error rendering page: {str(e)}")
+                return
+            self.show_rendered_page(pixmap)
 
     def prev_page(self):
         """Go to the previous page"""
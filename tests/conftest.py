@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import pikepdf
+import pytest
+
+# The tests import pdf_engine from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_blank_pdf(path, page_count):
+    """Write a PDF of page_count blank pages and return its path"""
+    with pikepdf.new() as pdf:
+        for _ in range(page_count):
+            pdf.add_blank_page()
+        pdf.save(path)
+    return str(path)
+
+
+def write_numbered_pdf(path, page_count, first=1):
+    """Write a PDF whose pages are told apart by their width and return its path.
+    
+    Page number n is 100 + n points wide; page_numbers() reads the numbers
+    back.
+    """
+    with pikepdf.new() as pdf:
+        for number in range(first, first + page_count):
+            pdf.add_blank_page(page_size=(100 + number, 792))
+        # The same pages give the same bytes, and the same hash, in every run
+        pdf.save(path, deterministic_id=True)
+    return str(path)
+
+
+def page_numbers(path):
+    """The numbers of the pages of a PDF written by write_numbered_pdf()"""
+    with pikepdf.open(path) as pdf:
+        return [int(page.mediabox[2]) - 100 for page in pdf.pages]
+
+
+@pytest.fixture
+def blank_pdf(tmp_path):
+    """Factory writing blank PDFs of a given length into tmp_path"""
+    def make(page_count, name=None):
+        return write_blank_pdf(tmp_path / (name or f"blank{page_count}.pdf"), page_count)
+    return make
+
+
+@pytest.fixture
+def numbered_pdf(tmp_path):
+    """Factory writing numbered PDFs (see write_numbered_pdf) into tmp_path"""
+    def make(page_count, first=1, name=None):
+        return write_numbered_pdf(tmp_path / (name or f"numbered{first}_{page_count}.pdf"),
+                                  page_count, first)
+    return make
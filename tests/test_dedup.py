@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pikepdf
+import pytest
+
+from pdf_engine import ENGINE_PIKEPDF, ENGINE_PYPDF2, merge_pdfs
+
+
+def write_form_pdf(path, data):
+    """Write a one-page PDF whose page draws a form XObject holding data"""
+    with pikepdf.new() as pdf:
+        pdf.add_blank_page()
+        form = pikepdf.Stream(pdf, data)
+        form.Type = pikepdf.Name.XObject
+        form.Subtype = pikepdf.Name.Form
+        form.BBox = [0, 0, 10, 10]
+        pdf.pages[0].Resources = pikepdf.Dictionary(XObject=pikepdf.Dictionary(Fm0=form))
+        pdf.pages[0].Contents = pdf.make_stream(b"/Fm0 Do")
+        pdf.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PYPDF2, ENGINE_PIKEPDF])
+def test_identical_streams_are_stored_once(engine, tmp_path):
+    form = b"0 0 10 10 re f " * 1000
+    paths = [write_form_pdf(tmp_path / f"in{i}.pdf", form) for i in range(3)]
+    paths.append(write_form_pdf(tmp_path / "other.pdf", b"0 0 5 5 re f " * 1000))
+    results = []
+    
+    merge_pdfs(paths, str(tmp_path / "out.pdf"), engine=engine, dedupe=True,
+               on_deduped=results.append)
+    
+    # The three equal forms collapse to one, the four equal page contents too
+    assert results[0].streams_removed == 5
+    assert results[0].bytes_saved > 0
+    with pikepdf.open(tmp_path / "out.pdf") as pdf:
+        forms = {page.Resources.XObject.Fm0.objgen for page in pdf.pages}
+        assert len(pdf.pages) == 4 and len(forms) == 2
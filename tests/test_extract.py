@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pikepdf
+import PyPDF2
+import pytest
+from pikepdf import Array, Dictionary, Name
+
+from conftest import page_numbers
+from pdf_engine import count_pages, extract_pages
+
+
+def write_nested_pdf(path):
+    """Write 4 pages in two page tree nodes that hold their MediaBox, with links.
+    
+    Page n's content is "% page n"; pages 1-2 are 201 points wide and
+    pages 3-4 202. Page 1 links to pages 2 and 4.
+    """
+    with pikepdf.new() as pdf:
+        root = pdf.Root.Pages
+        nodes = []
+        pages = []
+        for width in (201, 202):
+            node = pdf.make_indirect(Dictionary(Type=Name.Pages, MediaBox=Array([0, 0, width, 792]),
+                                                Kids=Array([]), Count=2, Parent=root))
+            for _ in range(2):
+                page = pdf.make_indirect(Dictionary(
+                    Type=Name.Page, Parent=node,
+                    Contents=pdf.make_stream(f"% page {len(pages) + 1}".encode())))
+                node.Kids.append(page)
+                pages.append(page)
+            nodes.append(node)
+        root.Kids = Array(nodes)
+        root.Count = 4
+        
+        pages[0].Annots = Array([
+            pdf.make_indirect(Dictionary(Type=Name.Annot, Subtype=Name.Link,
+                                         Rect=Array([0, 0, 10, 10]),
+                                         Dest=Array([target, Name.Fit])))
+            for target in (pages[1], pages[3])])
+        pdf.save(path)
+    return str(path)
+
+
+def extract_to_file(source, page_list, path):
+    with open(source, 'rb') as f:
+        writer = extract_pages(PyPDF2.PdfReader(f), page_list)
+        with open(path, 'wb') as out:
+            writer.write(out)
+    return str(path)
+
+
+def page_contents(path):
+    with pikepdf.open(path) as pdf:
+        return [page.Contents.read_bytes().decode() for page in pdf.pages]
+
+
+def test_pages_come_in_the_order_given(numbered_pdf, tmp_path):
+    output_path = extract_to_file(numbered_pdf(5), [4, 2, 5], tmp_path / "out.pdf")
+    
+    assert [4, 2, 5] == page_numbers(output_path)
+
+
+def test_repeated_page_is_copied_twice(numbered_pdf, tmp_path):
+    output_path = extract_to_file(numbered_pdf(3), [2, 1, 2], tmp_path / "out.pdf")
+    
+    assert [2, 1, 2] == page_numbers(output_path)
+    with pikepdf.open(output_path) as pdf:
+        assert pdf.pages[0].objgen != pdf.pages[2].objgen
+
+
+def test_pages_keep_attributes_inherited_from_the_tree(tmp_path):
+    source = write_nested_pdf(tmp_path / "nested.pdf")
+    output_path = extract_to_file(source, [3, 1], tmp_path / "out.pdf")
+    
+    assert ["% page 3", "% page 1"] == page_contents(output_path)
+    assert [102, 101] == page_numbers(output_path)
+
+
+def test_links_to_pages_left_out_become_null(tmp_path):
+    source = write_nested_pdf(tmp_path / "nested.pdf")
+    output_path = extract_to_file(source, [1, 2], tmp_path / "out.pdf")
+    
+    with pikepdf.open(output_path) as pdf:
+        to_second, to_fourth = (annot.Dest[0] for annot in pdf.pages[0].Annots)
+        assert to_second.objgen == pdf.pages[1].objgen
+        assert to_fourth is None
+
+
+def test_count_pages_and_range_check(tmp_path):
+    source = write_nested_pdf(tmp_path / "nested.pdf")
+    with open(source, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        assert 4 == count_pages(reader)
+        with pytest.raises(IndexError):
+            extract_pages(reader, [1, 5])
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+
+import pikepdf
+import pytest
+
+from conftest import page_numbers
+from pdf_engine import ENGINE_PIKEPDF, ENGINE_PYPDF2, incremental, merge_pdfs, merge_pdfs_incremental
+
+
+@pytest.fixture(autouse=True)
+def small_segments(monkeypatch):
+    # Segments of at most two files, so a few inputs make several segments
+    monkeypatch.setattr(incremental, "INCREMENTAL_SEGMENT_MAX", 2)
+
+
+@pytest.fixture
+def inputs(numbered_pdf):
+    return [numbered_pdf(2, first=10 * i, name=f"in{i}.pdf") for i in range(1, 7)]
+
+
+def assert_same_as_full_merge(paths, output_path, tmp_path):
+    full_path = str(tmp_path / "full.pdf")
+    merge_pdfs(paths, full_path)
+    assert page_numbers(full_path) == page_numbers(output_path)
+    with pikepdf.open(output_path) as pdf:
+        assert [] == pdf.check()
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PYPDF2, ENGINE_PIKEPDF])
+def test_edited_input_is_appended_as_an_update(engine, inputs, numbered_pdf, tmp_path):
+    output_path = str(tmp_path / "binder.pdf")
+    first = merge_pdfs_incremental(inputs, output_path, engine=engine)
+    assert not first.updated_in_place and first.segments_reused == 0
+    size = os.path.getsize(output_path)
+    
+    numbered_pdf(3, first=90, name="in6.pdf")
+    result = merge_pdfs_incremental(inputs, output_path, engine=engine)
+    
+    assert result.updated_in_place
+    assert result.segments_reused > 0 and result.segments_built == 1
+    assert 13 == result.page_count
+    assert os.path.getsize(output_path) > size
+    assert_same_as_full_merge(inputs, output_path, tmp_path)
+
+
+def test_inserted_input(inputs, numbered_pdf, tmp_path):
+    output_path = str(tmp_path / "binder.pdf")
+    merge_pdfs_incremental(inputs, output_path)
+    
+    inputs.insert(4, numbered_pdf(1, first=80, name="inserted.pdf"))
+    result = merge_pdfs_incremental(inputs, output_path)
+    
+    assert result.updated_in_place and result.segments_reused > 0
+    assert 13 == result.page_count
+    assert_same_as_full_merge(inputs, output_path, tmp_path)
+
+
+@pytest.mark.parametrize("removed", [0, 2, 5])
+def test_removed_input(removed, inputs, tmp_path):
+    output_path = str(tmp_path / "binder.pdf")
+    merge_pdfs_incremental(inputs, output_path)
+    
+    del inputs[removed]
+    result = merge_pdfs_incremental(inputs, output_path)
+    
+    assert 10 == result.page_count
+    if removed == 5:
+        # Only the last segment changed
+        assert result.updated_in_place and result.segments_reused > 0
+    assert_same_as_full_merge(inputs, output_path, tmp_path)
+
+
+def test_repeated_updates_stay_correct(inputs, numbered_pdf, tmp_path):
+    output_path = str(tmp_path / "binder.pdf")
+    merge_pdfs_incremental(inputs, output_path)
+    
+    # Later runs update the file or, once it has grown enough, rewrite it
+    for i in range(1, 7):
+        numbered_pdf(3, first=100 + 10 * i, name=f"in{i}.pdf")
+        merge_pdfs_incremental(inputs, output_path)
+        assert_same_as_full_merge(inputs, output_path, tmp_path)
+
+
+def test_unchanged_inputs_reuse_every_segment(inputs, tmp_path):
+    output_path = str(tmp_path / "binder.pdf")
+    first = merge_pdfs_incremental(inputs, output_path)
+    
+    result = merge_pdfs_incremental(inputs, output_path)
+    
+    assert 0 == result.segments_built
+    assert first.segments_built == result.segments_reused
+    assert_same_as_full_merge(inputs, output_path, tmp_path)
+
+
+def test_replaced_output_is_written_afresh(inputs, numbered_pdf, tmp_path):
+    output_path = str(tmp_path / "binder.pdf")
+    merge_pdfs_incremental(inputs, output_path)
+    numbered_pdf(1, name="binder.pdf")
+    
+    numbered_pdf(3, first=90, name="in6.pdf")
+    result = merge_pdfs_incremental(inputs, output_path)
+    
+    assert not result.updated_in_place and result.segments_reused > 0
+    assert_same_as_full_merge(inputs, output_path, tmp_path)
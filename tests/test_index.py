@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+
+import pytest
+
+from pdf_engine import MetadataIndex
+
+
+@pytest.fixture
+def index():
+    index = MetadataIndex(":memory:")
+    yield index
+    index.close()
+
+
+def test_get_indexes_a_file_on_a_miss(index, blank_pdf):
+    path = blank_pdf(3)
+    assert index.lookup(path) is None
+    
+    assert 3 == index.get(path)["page_count"]
+    assert 3 == index.lookup(path)["page_count"]
+
+
+def test_stat_equal_readd_is_a_hit(index, blank_pdf, tmp_path):
+    path = blank_pdf(3)
+    stat = os.stat(path)
+    index.get(path)
+    
+    # Replace the file by a copy with the same size and modification time
+    copy = shutil.copy(path, tmp_path / "copy.pdf")
+    os.replace(copy, path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    
+    assert index.lookup(path) is not None
+
+
+def test_changed_file_is_a_miss(index, blank_pdf, tmp_path):
+    path = blank_pdf(3)
+    index.get(path)
+    
+    blank_pdf(5, name=os.path.basename(path))
+    
+    assert index.lookup(path) is None
+    assert 5 == index.get(path)["page_count"]
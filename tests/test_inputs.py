@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from conftest import page_numbers
+from pdf_engine import (ENGINE_PIKEPDF, ENGINE_PYPDF2, INPUT_MODES, INPUT_MMAP, SPLIT_EVERY_N,
+                        SPLIT_INDIVIDUAL, SPLIT_RANGES, DocumentPool, merge_pdfs, open_input,
+                        split_pdf)
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PYPDF2, ENGINE_PIKEPDF])
+@pytest.mark.parametrize("input_mode", INPUT_MODES)
+def test_merge_is_the_same_in_every_mode(engine, input_mode, numbered_pdf, tmp_path):
+    paths = [numbered_pdf(3), numbered_pdf(2, first=10)]
+    output_path = str(tmp_path / "out.pdf")
+    
+    merge_pdfs(paths, output_path, engine=engine, input_mode=input_mode)
+    
+    assert [1, 2, 3, 10, 11] == page_numbers(output_path)
+
+
+def test_pool_reads_in_its_mode(numbered_pdf, tmp_path):
+    pool = DocumentPool(input_mode=INPUT_MMAP)
+    output_path = str(tmp_path / "out.pdf")
+    
+    merge_pdfs([numbered_pdf(3)], output_path, pool=pool)
+    
+    assert [1, 2, 3] == page_numbers(output_path)
+
+
+@pytest.mark.parametrize("input_mode", INPUT_MODES)
+@pytest.mark.parametrize("mode, options, expected", [
+    (SPLIT_RANGES, {"range_text": "4-2"}, [[4, 3, 2]]),
+    (SPLIT_EVERY_N, {"pages_per_file": 2}, [[1, 2], [3, 4]]),
+    (SPLIT_INDIVIDUAL, {}, [[1], [2], [3], [4]]),
+])
+def test_split_is_the_same_in_every_mode(input_mode, mode, options, expected, numbered_pdf,
+                                         tmp_path):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    
+    files = split_pdf(numbered_pdf(4), str(output_dir), "part", mode, input_mode=input_mode,
+                      **options)
+    
+    assert expected == [page_numbers(path) for path in sorted(files)]
+
+
+def test_empty_file_can_be_opened_in_mmap_mode(tmp_path):
+    path = tmp_path / "empty.pdf"
+    path.write_bytes(b"")
+    with open_input(str(path), INPUT_MMAP) as stream:
+        assert b"" == stream.read()
+
+
+def test_unknown_mode_is_rejected(blank_pdf):
+    with pytest.raises(ValueError):
+        open_input(blank_pdf(1), "carrier-pigeon")
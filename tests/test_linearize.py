@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import fitz
+import pytest
+
+from pdf_engine import ENGINE_PIKEPDF, ENGINE_PYPDF2, check_linearization, get_pdf_info, merge_pdfs
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PYPDF2, ENGINE_PIKEPDF])
+def test_linearized_merge_passes_the_check(engine, blank_pdf, tmp_path):
+    output_path = str(tmp_path / "out.pdf")
+    merge_pdfs([blank_pdf(2), blank_pdf(3)], output_path, engine=engine, linearize=True)
+    
+    assert check_linearization(output_path, page_count=5) == []
+    assert get_pdf_info(output_path)["linearized"]
+
+
+def test_plain_merge_is_not_linearized(blank_pdf, tmp_path):
+    output_path = str(tmp_path / "out.pdf")
+    merge_pdfs([blank_pdf(2)], output_path)
+    
+    assert check_linearization(output_path) is None
+
+
+def test_incremental_update_breaks_linearization(blank_pdf, tmp_path):
+    output_path = str(tmp_path / "out.pdf")
+    merge_pdfs([blank_pdf(2)], output_path, linearize=True)
+    
+    with fitz.open(output_path) as doc:
+        doc.set_metadata({"title": "Updated"})
+        doc.save(output_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+    
+    problems = check_linearization(output_path)
+    assert problems and "/L is" in problems[0]
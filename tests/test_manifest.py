@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from conftest import page_numbers
+from pdf_engine import (SPLIT_EVERY_N, SPLIT_RANGES, SplitManifest, default_split_manifest_path,
+                        split_pdfs)
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    return str(output_dir)
+
+
+def run_split(paths, output_dir, **options):
+    """Split paths every 2 pages with a fresh SplitManifest, as a rerun would"""
+    manifest = SplitManifest(default_split_manifest_path(output_dir))
+    options.setdefault("pages_per_file", 2)
+    result = split_pdfs(paths, output_dir, "part", SPLIT_EVERY_N, manifest=manifest, **options)
+    return result, manifest
+
+
+def test_rerun_skips_finished_inputs(numbered_pdf, output_dir):
+    paths = [numbered_pdf(4), numbered_pdf(3, first=10)]
+    first, _ = run_split(paths, output_dir)
+    mtimes = {path: os.stat(path).st_mtime_ns for path in first.generated_files}
+    
+    second, manifest = run_split(paths, output_dir)
+    
+    assert set(paths) == set(manifest.resumed)
+    assert first == second
+    assert mtimes == {path: os.stat(path).st_mtime_ns for path in second.generated_files}
+
+
+def test_interrupted_batch_resumes_with_the_rest(numbered_pdf, output_dir):
+    paths = [numbered_pdf(4), numbered_pdf(3, first=10), numbered_pdf(2, first=20)]
+    
+    def stop(files_done, input_path):
+        raise KeyboardInterrupt
+    
+    with pytest.raises(KeyboardInterrupt):
+        run_split(paths, output_dir, on_file_done=stop)
+    
+    result, manifest = run_split(paths, output_dir)
+    
+    assert [paths[0]] == list(manifest.resumed)
+    assert 3 == result.success_count
+    assert [[1, 2], [3, 4], [10, 11], [12], [20, 21]] == [page_numbers(path) for path
+                                                          in result.generated_files]
+
+
+def test_deleted_output_is_redone(numbered_pdf, output_dir):
+    paths = [numbered_pdf(4), numbered_pdf(3, first=10)]
+    first, _ = run_split(paths, output_dir)
+    deleted = first.generated_files[-1]
+    os.remove(deleted)
+    
+    second, manifest = run_split(paths, output_dir)
+    
+    assert [paths[0]] == list(manifest.resumed)
+    assert [12] == page_numbers(deleted)
+    assert first.generated_files == second.generated_files
+
+
+def test_changed_input_or_options_are_redone(numbered_pdf, output_dir):
+    paths = [numbered_pdf(4), numbered_pdf(3, first=10)]
+    run_split(paths, output_dir)
+    numbered_pdf(5, first=10, name=os.path.basename(paths[1]))
+    
+    _, manifest = run_split(paths, output_dir)
+    assert [paths[0]] == list(manifest.resumed)
+    
+    _, manifest = run_split(paths, output_dir, pages_per_file=3)
+    assert {} == manifest.resumed
+
+
+def test_failed_input_is_not_recorded(numbered_pdf, output_dir):
+    paths = [numbered_pdf(1), numbered_pdf(4, first=10)]
+    manifest = SplitManifest(default_split_manifest_path(output_dir))
+    result = split_pdfs(paths, output_dir, "part", SPLIT_RANGES, range_text="2-3",
+                        manifest=manifest)
+    assert 1 == result.success_count
+    
+    manifest = SplitManifest(default_split_manifest_path(output_dir))
+    split_pdfs(paths, output_dir, "part", SPLIT_RANGES, range_text="2-3", manifest=manifest)
+    
+    assert [paths[1]] == list(manifest.resumed)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from pdf_engine import ENGINE_PIKEPDF, ENGINE_PYPDF2, MergeCancelled, merge_pdfs
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PYPDF2, ENGINE_PIKEPDF])
+def test_progress_is_reported_per_page(engine, blank_pdf, tmp_path):
+    pages_done = []
+    merge_pdfs([blank_pdf(3), blank_pdf(2)], str(tmp_path / "out.pdf"), engine=engine,
+               on_pages=lambda pages, bytes_read: pages_done.append(pages))
+    assert [1, 2, 3, 4, 5] == sorted(set(pages_done))
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PYPDF2, ENGINE_PIKEPDF])
+def test_cancel_stops_within_a_file(engine, blank_pdf, tmp_path):
+    pages_done = []
+    output_path = tmp_path / "out.pdf"
+    with pytest.raises(MergeCancelled):
+        merge_pdfs([blank_pdf(20)], str(output_path), engine=engine,
+                   on_pages=lambda pages, bytes_read: pages_done.append(pages),
+                   should_cancel=lambda: len(pages_done) >= 3)
+    assert max(pages_done) < 20
+    assert not os.path.exists(output_path)
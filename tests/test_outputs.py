@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+
+import pikepdf
+import pytest
+
+from conftest import page_numbers
+from pdf_engine import ENGINE_PIKEPDF, ENGINE_PYPDF2, AtomicOutput, merge_pdfs
+from pdf_engine import outputs
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PYPDF2, ENGINE_PIKEPDF])
+def test_compression_level_implies_compact(engine, blank_pdf, tmp_path):
+    output_path = tmp_path / "out.pdf"
+    merge_pdfs([blank_pdf(3)], str(output_path), engine=engine, compression_level=9)
+    
+    assert b"/ObjStm" in output_path.read_bytes()
+
+
+def test_concurrent_saves_keep_their_own_level(tmp_path):
+    source = str(tmp_path / "source.pdf")
+    with pikepdf.new() as pdf:
+        for i in range(20):
+            pdf.add_blank_page()
+            pdf.pages[i].Contents = pdf.make_stream(b"0 0 m 10 10 l S " * 2000)
+        pdf.save(source)
+    errors = []
+    
+    def merge(level):
+        try:
+            for i in range(5):
+                merge_pdfs([source], str(tmp_path / f"out{level}_{i}.pdf"), engine=ENGINE_PIKEPDF,
+                           compression_level=level)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=merge, args=(level,)) for level in (0, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    # Every output matches the level it asked for, not the other thread's
+    assert errors == []
+    sizes = {level: {path.stat().st_size for path in tmp_path.glob(f"out{level}_*.pdf")}
+             for level in (0, 9)}
+    assert len(sizes[0]) == 1 and len(sizes[9]) == 1
+    assert sizes[0].pop() > sizes[9].pop()
+
+
+def test_atomic_output_replaces_the_file_on_commit(tmp_path):
+    path = tmp_path / "out.pdf"
+    path.write_bytes(b"old")
+    
+    with AtomicOutput(str(path)) as output:
+        output.write(b"new contents")
+        assert b"old" == path.read_bytes()
+    
+    assert b"new contents" == path.read_bytes()
+    assert len(b"new contents") == output.bytes_written
+    assert ["out.pdf"] == os.listdir(tmp_path)
+
+
+def test_atomic_output_leaves_no_part_file_on_failure(tmp_path):
+    path = tmp_path / "out.pdf"
+    path.write_bytes(b"old")
+    
+    with pytest.raises(RuntimeError):
+        with AtomicOutput(str(path)) as output:
+            output.write(b"partial")
+            raise RuntimeError("writer failed")
+    
+    assert b"old" == path.read_bytes()
+    assert ["out.pdf"] == os.listdir(tmp_path)
+
+
+def test_atomic_output_fsyncs_the_file_before_the_rename(monkeypatch, tmp_path):
+    path = tmp_path / "out.pdf"
+    synced = []
+    real_fsync = os.fsync
+    
+    def fsync(fd):
+        synced.append(path.exists())
+        real_fsync(fd)
+    
+    monkeypatch.setattr(outputs.os, "fsync", fsync)
+    with AtomicOutput(str(path), fsync=True) as output:
+        output.write(b"data")
+    
+    # The file before it is renamed, then (where supported) its directory
+    assert synced and synced[0] is False
+    assert b"data" == path.read_bytes()
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PYPDF2, ENGINE_PIKEPDF])
+def test_failed_merge_keeps_the_previous_output(engine, numbered_pdf, tmp_path):
+    output_path = str(tmp_path / "out.pdf")
+    merge_pdfs([numbered_pdf(2)], output_path, engine=engine, fsync=True)
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.4 not really")
+    
+    with pytest.raises(Exception):
+        merge_pdfs([numbered_pdf(3, first=10), str(broken)], output_path, engine=engine)
+    
+    assert [1, 2] == page_numbers(output_path)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+
+from pdf_engine import DocumentPool, ENGINE_PYPDF2, merge_pdfs
+
+
+def test_reader_is_reused(blank_pdf):
+    pool = DocumentPool()
+    path = blank_pdf(3)
+    with pool.reader(path) as first:
+        pass
+    with pool.reader(path) as second:
+        assert 3 == len(second.pages)
+    
+    assert first is second
+    assert 1 == len(pool)
+
+
+def test_changed_file_is_parsed_again(blank_pdf):
+    pool = DocumentPool()
+    path = blank_pdf(3)
+    with pool.reader(path) as first:
+        pass
+    
+    blank_pdf(5, name=os.path.basename(path))
+    with pool.reader(path) as second:
+        assert 5 == len(second.pages)
+    
+    assert first is not second
+    assert 1 == len(pool)
+
+
+def test_least_recently_used_is_evicted(blank_pdf):
+    pool = DocumentPool(max_open=2)
+    paths = [blank_pdf(1, name=f"{i}.pdf") for i in range(3)]
+    readers = {}
+    for path in paths[:2] + paths[:1] + paths[2:]:
+        with pool.reader(path) as reader:
+            readers.setdefault(path, reader)
+    
+    assert 2 == len(pool)
+    with pool.reader(paths[0]) as reader:
+        assert reader is readers[paths[0]]
+    with pool.reader(paths[1]) as reader:
+        assert reader is not readers[paths[1]]
+
+
+def test_documents_in_use_are_not_evicted(blank_pdf):
+    pool = DocumentPool(max_open=1)
+    first, second = blank_pdf(1, name="a.pdf"), blank_pdf(2, name="b.pdf")
+    with pool.reader(first) as reader:
+        with pool.reader(second):
+            assert 2 == len(pool)
+        assert 1 == len(reader.pages)
+    
+    assert 1 == len(pool)
+
+
+def test_merge_reuses_pooled_documents(blank_pdf, tmp_path):
+    pool = DocumentPool()
+    paths = [blank_pdf(2), blank_pdf(3)]
+    readers = []
+    for path in paths:
+        with pool.reader(path) as reader:
+            readers.append(reader)
+    
+    page_count = merge_pdfs(paths, str(tmp_path / "out.pdf"), engine=ENGINE_PYPDF2, pool=pool)
+    
+    assert 5 == page_count
+    for path, reader in zip(paths, readers):
+        with pool.reader(path) as pooled:
+            assert pooled is reader
+    pool.close_all()
+    assert 0 == len(pool)
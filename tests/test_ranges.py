@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from pdf_engine import InvalidPageRange, SPLIT_RANGES, parse_page_ranges, split_pdf, split_pdfs
+
+
+@pytest.mark.parametrize("text, page_count, expected", [
+    ("1-3,5,7-9", 10, [1, 2, 3, 5, 7, 8, 9]),
+    ("3,3,1", 10, [3, 3, 1]),
+    ("end", 10, [10]),
+    ("-2", 10, [9]),
+    ("5-", 10, [5, 6, 7, 8, 9, 10]),
+    ("..3", 10, [1, 2, 3]),
+    ("9-3", 10, [9, 8, 7, 6, 5, 4, 3]),
+    ("end-1", 4, [4, 3, 2, 1]),
+    ("1..-2", 5, [1, 2, 3, 4]),
+    ("even", 7, [2, 4, 6]),
+    ("1-20:2", 10, [1, 3, 5, 7, 9]),
+    ("1-10:odd:reverse", 10, [9, 7, 5, 3, 1]),
+    ("20-1:5", 10, [10, 5]),
+    ("1-100", 3, [1, 2, 3]),
+])
+def test_parse_page_ranges(text, page_count, expected):
+    assert list(parse_page_ranges(text, page_count)) == expected
+
+
+@pytest.mark.parametrize("text, page_count", [
+    ("7-end", 5),
+    ("10-", 5),
+    ("2-end:reverse", 1),
+    ("3--1", 2),
+    ("50", 10),
+])
+def test_forward_range_past_the_last_page_selects_nothing(text, page_count):
+    assert list(parse_page_ranges(text, page_count)) == []
+
+
+@pytest.mark.parametrize("text", ["0", "a", "1-2-3", "-", "..", "1:0", "1:x"])
+def test_invalid_expressions_raise(text):
+    with pytest.raises(InvalidPageRange):
+        parse_page_ranges(text, 10)
+
+
+def test_large_selection_is_not_expanded():
+    pages = parse_page_ranges("1-end,end-1", 10 ** 9)
+    assert len(pages) == 2 * 10 ** 9
+    assert pages[0] == 1 and pages[10 ** 9] == 10 ** 9 and pages[-1] == 1
+    assert len(pages.intervals) == 2
+
+
+def test_split_of_short_file_reports_empty_selection(blank_pdf, tmp_path):
+    path = blank_pdf(1)
+    with pytest.raises(InvalidPageRange):
+        split_pdf(path, str(tmp_path), "out", SPLIT_RANGES, range_text="2-end:reverse")
+
+
+def test_batch_split_skips_files_too_short_for_range(blank_pdf, tmp_path):
+    paths = [blank_pdf(1), blank_pdf(5)]
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    
+    success_count, generated_files, error_messages = split_pdfs(
+        paths, str(output_dir), "part", SPLIT_RANGES, range_text="2-end:reverse")
+    
+    assert success_count == 1
+    assert [os.path.basename(path) for path in generated_files] == ["part_blank5.pdf"]
+    assert len(error_messages) == 1 and "blank1.pdf" in error_messages[0]
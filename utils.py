@@ -5,7 +5,7 @@ import os
 import sys
 from PyQt5.QtWidgets import (QPushButton, QFrame, QGraphicsDropShadowEffect)
 from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QIcon, QColor, QCursor, QLinearGradient
+from PyQt5.QtGui import QIcon, QColor, QCursor, QLinearGradient, QImage, QPixmap
 
 # Define color constants
 PRIMARY_COLOR = "#1976D2"
@@ -129,6 +129,40 @@ def get_file_size_str(file_path):
         return "Unknown size"
 
 
+def fitz_pixmap_to_qimage(pix):
+    """Wrap the samples of a PyMuPDF pixmap in a QImage without copying them.
+    
+    The QImage reads the pixmap's own memory through samples_mv, so it keeps
+    a reference to pix for as long as it is alive.
+    """
+    image_format = QImage.Format_RGBA8888 if pix.alpha else QImage.Format_RGB888
+    qimg = QImage(pix.samples_mv, pix.width, pix.height, pix.stride, image_format)
+    qimg.fitz_pixmap = pix
+    return qimg
+
+
+def samples_to_qimage(samples, width, height, stride):
+    """Wrap RGB samples rendered in another process in a QImage without copying them.
+    
+    samples is the bytes object a render worker returned; like
+    fitz_pixmap_to_qimage, the QImage keeps a reference to it so that the
+    memory it reads stays alive until QPixmap.fromImage makes its copy.
+    """
+    qimg = QImage(samples, width, height, stride, QImage.Format_RGB888)
+    qimg.samples = samples
+    return qimg
+
+
+def fitz_pixmap_to_qpixmap(pix):
+    """Convert a PyMuPDF pixmap to a QPixmap.
+    
+    The only copy is Qt converting the samples to its native pixmap format.
+    The QPixmap owns that copy, so pix can be freed afterwards; converting
+    with Qt.NoFormatConversion would share pix's memory instead.
+    """
+    return QPixmap.fromImage(fitz_pixmap_to_qimage(pix))
+
+
 def open_file(file_path):
     """Open the file using the default system application"""
     if sys.platform == 'win32':